@@ -0,0 +1,194 @@
+"""小文件基准测试：在大量小文件（StreamingAssets 式）的目录上比较各复制路径的 文件/s
+
+用法：
+    python benchmarks/bench_small_files.py                          # 50000 个 ≤16KB 的文件，临时目录
+    python benchmarks/bench_small_files.py --dir /dev/shm --runs 5 --json result.json
+
+比较的路径（都是目标为空目录的完整复制）：
+    legacy     最初界面中的逐个文件复制：listdir + isdir + relpath + shutil.copy2，每个文件刷新一次界面（见 --ui）
+    per-file   同步引擎逐个文件提交给线程池，经 copy_backends.copy_file 复制
+    batched    同步引擎当前的做法：同一目录的小文件成批处理，经 copy_backends.copy_small 复制
+每种路径运行 --runs 次取中位数，各路径轮流运行（legacy、per-file、batched、legacy……），
+磁盘状态随时间的变化对各路径的影响大致相同；运行前清空目标目录并 os.sync()，结果仍受磁盘回写影响，
+--dir 指向 tmpfs（/dev/shm）时更能反映每个文件的 CPU 开销。
+
+--ui 决定 legacy 每个文件的界面刷新（最初界面中 current_file_label.config + update_idletasks）：
+    tk    与最初界面相同的 800x60 进度窗口与 ttk.Label，需要显示器
+    tcl   没有显示器时只经 Tcl 解释器执行同样的 set + update idletasks，不含重绘，legacy 的耗时偏低
+    none  不刷新
+    auto  （默认）有显示器时为 tk，否则为 tcl；结果中的 "ui" 字段记录实际使用的方式
+"""
+import argparse
+import json
+import os
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import copy_backends  # noqa: E402
+import sync_engine  # noqa: E402
+
+PATHS = ("legacy", "per-file", "batched")
+UI_MODES = ("auto", "tk", "tcl", "none")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="比较小文件的各复制路径")
+    parser.add_argument("--dir", help="测试目录（默认系统临时目录）")
+    parser.add_argument("--files", type=int, default=50000, help="小文件数量")
+    parser.add_argument("--max-kb", type=int, default=16, help="小文件最大大小（KB）")
+    parser.add_argument("--per-dir", type=int, default=100, help="每个目录中的文件数")
+    parser.add_argument("--workers", type=int, default=sync_engine.DEFAULT_WORKERS, help="复制线程数")
+    parser.add_argument("--runs", type=int, default=3, help="每种路径的运行次数")
+    parser.add_argument("--paths", default=",".join(PATHS), help="要测试的路径，逗号分隔")
+    parser.add_argument("--seed", type=int, default=1, help="随机种子")
+    parser.add_argument("--ui", choices=UI_MODES, default="auto", help="legacy 每个文件的界面刷新方式")
+    parser.add_argument("--json", help="结果保存为 JSON")
+    return parser.parse_args(argv)
+
+
+def generate_tree(src, args):
+    rng = random.Random(args.seed)
+    for i in range(args.files):
+        folder = os.path.join(src, f"Pack_{i // args.per_dir % 20:02d}", f"dir_{i // args.per_dir}")
+        if i % args.per_dir == 0:
+            os.makedirs(folder, exist_ok=True)
+        size = rng.randint(0, args.max_kb * 1024)
+        with open(os.path.join(folder, f"asset_{i}.bytes"), 'wb') as f:
+            f.write(rng.getrandbits(size * 8).to_bytes(size, 'little') if size else b'')
+
+
+class LegacyUI:
+    """最初界面中每复制一个文件执行的刷新：current_file_label.config(text=...) + master.update_idletasks()"""
+
+    def __init__(self, mode):
+        self.mode, self.root, self.label, self.interp = "none", None, None, None
+        if mode == "none":
+            return
+        try:
+            import tkinter as tk
+            from tkinter import ttk
+        except ImportError as e:
+            raise SystemExit(f"--ui {mode} 需要 Tkinter: {e}")
+        if mode in ("auto", "tk"):
+            try:
+                self.root = tk.Tk()
+            except tk.TclError as e:  # 没有显示器
+                if mode == "tk":
+                    raise SystemExit(f"--ui tk 需要显示器: {e}")
+            else:
+                self.mode = "tk"
+                self.root.withdraw()
+                # 与最初的进度窗口相同
+                window = tk.Toplevel(self.root)
+                window.title("同步进度")
+                window.geometry("800x60")
+                self.label = ttk.Label(window, text="当前文件路径：")
+                self.label.pack(fill=tk.X, padx=5)
+                self.root.update()
+                return
+        self.mode, self.interp = "tcl", tk.Tcl()
+
+    def update(self, relative_path):
+        text = f"当前文件路径：{relative_path}"
+        if self.label is not None:
+            self.label.config(text=text)
+            self.root.update_idletasks()
+        elif self.interp is not None:
+            self.interp.call("set", "current_file", text)
+            self.interp.call("update", "idletasks")
+
+    def close(self):
+        if self.root is not None:
+            self.root.destroy()
+
+
+def copy_legacy(src, dst, data_path, ui):
+    """与最初界面中的 copy_contents_with_progress 相同的逐个文件复制，每个文件经 ui 刷新一次界面"""
+    os.makedirs(dst, exist_ok=True)
+    count = 0
+    for item in os.listdir(src):
+        src_path, dst_path = os.path.join(src, item), os.path.join(dst, item)
+        relative_path = os.path.relpath(src_path, data_path)
+        if os.path.isdir(src_path):
+            count += copy_legacy(src_path, dst_path, data_path, ui)
+        else:
+            shutil.copy2(src_path, dst_path)
+            count += 1
+            ui.update(relative_path)
+    return count
+
+
+def run_engine(src, dst, workers, batched):
+    tasks = [{"name": "assets", "src": src, "dst": dst, "mode": "default", "subdir_vars": {}}]
+    small_size, batch_files = copy_backends.SMALL_FILE_SIZE, sync_engine.SMALL_BATCH_FILES
+    if not batched:
+        # 关掉小文件路径与分批，即改动前的逐个文件复制
+        copy_backends.SMALL_FILE_SIZE, sync_engine.SMALL_BATCH_FILES = -1, 1
+    try:
+        return sync_engine.run_sync(tasks, workers=workers).copied
+    finally:
+        copy_backends.SMALL_FILE_SIZE, sync_engine.SMALL_BATCH_FILES = small_size, batch_files
+
+
+def run_once(path, src, dst, workers, ui):
+    shutil.rmtree(dst, ignore_errors=True)
+    if hasattr(os, "sync"):
+        os.sync()
+    start = time.perf_counter()
+    if path == "legacy":
+        count = copy_legacy(src, dst, os.path.dirname(src), ui)
+    else:
+        count = run_engine(src, dst, workers, path == "batched")
+    return count, time.perf_counter() - start
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    root = tempfile.mkdtemp(prefix="automove_small_", dir=args.dir)
+    try:
+        src, dst = os.path.join(root, "src"), os.path.join(root, "dst")
+        start = time.perf_counter()
+        generate_tree(src, args)
+        print(f"生成 {args.files} 个小文件用时 {time.perf_counter() - start:.1f}s: {root}")
+
+        paths = [path.strip() for path in args.paths.split(",")]
+        rates = {path: [] for path in paths}
+        ui = LegacyUI(args.ui if "legacy" in paths else "none")
+        try:
+            for _ in range(args.runs):
+                for path in paths:
+                    count, seconds = run_once(path, src, dst, args.workers, ui)
+                    if count != args.files:
+                        raise RuntimeError(f"{path} 只复制了 {count} 个文件")
+                    rates[path].append(count / seconds)
+        finally:
+            ui.close()
+        if "legacy" in paths:
+            print(f"legacy 界面刷新: {ui.mode}" + ("（无显示器，不含重绘，legacy 偏快）" if ui.mode == "tcl" else ""))
+        results = {}
+        for path in paths:
+            results[path] = {"files_per_s": round(statistics.median(rates[path]), 1),
+                             "runs": [round(r, 1) for r in rates[path]]}
+            print(f"{path:<9} {results[path]['files_per_s']:>10.1f} 文件/s  "
+                  f"（{'，'.join(f'{r:.0f}' for r in rates[path])}）")
+        if "legacy" in results:
+            for path in results:
+                results[path]["vs_legacy"] = round(results[path]["files_per_s"] / results["legacy"]["files_per_s"], 2)
+            print("相对 legacy：" + "  ".join(f"{path} {value['vs_legacy']}x" for path, value in results.items()))
+
+        if args.json:
+            with open(args.json, 'w', encoding='utf-8') as f:
+                json.dump({"params": vars(args), "ui": ui.mode, "results": results}, f, ensure_ascii=False, indent=2)
+        return 0
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
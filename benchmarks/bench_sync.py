@@ -0,0 +1,265 @@
+"""同步基准测试：生成模拟 Unity 导出的 Data 目录，分阶段测量各模式的同步耗时
+
+用法：
+    python benchmarks/bench_sync.py                    # 默认规模，结果写入 benchmarks/results/
+    python benchmarks/bench_sync.py --quick            # 小规模，快速检查
+    python benchmarks/bench_sync.py --tiny-files 50000 --huge-mb 256 --drop-caches --out result.json
+
+生成的目录结构：
+    unityLibrary/src/main/assets   大量小文件（按 --top-dirs 个顶层文件夹、--depth 层深度分布），
+                                   每隔 --deselect-every 个顶层文件夹取消勾选，模拟混合的子文件夹选择
+    unityLibrary/src/main/jniLibs  少量大 .so 文件
+    unityLibrary/libs              jar/aar，AS 工程中预先放入其中一部分旧文件供 libs 模式同步
+
+每种模式依次执行：
+    cold    目标目录为初始状态（default 模式为空目录），可加 --drop-caches 清空系统页缓存（需 root）
+    warm    紧接着再同步一次，源目录没有变化
+    update  修改约 1% 的小文件和一个大文件后再同步
+每次记录 scan / clean / copy（libs 模式记为 libs-sync）各阶段耗时与复制统计，结果保存为 JSON 便于前后对比。
+吞吐（files_per_s / mb_per_s）按实际复制的文件数与写入的字节数计算；源目录清单的总量另记为 source_files / source_bytes。
+只依赖标准库与 sync_engine，可在无显示环境的 Linux 上运行。
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import sync_engine  # noqa: E402
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="模拟 Unity 导出目录的同步基准测试")
+    parser.add_argument("--dir", help="生成测试数据的目录（默认系统临时目录）")
+    parser.add_argument("--tiny-files", type=int, default=20000, help="assets 中小文件数量")
+    parser.add_argument("--tiny-max-kb", type=int, default=16, help="小文件最大大小（KB）")
+    parser.add_argument("--top-dirs", type=int, default=12, help="assets 顶层子文件夹数量")
+    parser.add_argument("--depth", type=int, default=5, help="小文件所在目录的最大嵌套深度")
+    parser.add_argument("--deselect-every", type=int, default=4, help="每隔几个顶层子文件夹取消勾选一个，0 表示全选")
+    parser.add_argument("--huge-files", type=int, default=3, help="jniLibs 中大文件数量")
+    parser.add_argument("--huge-mb", type=int, default=64, help="单个大文件大小（MB）")
+    parser.add_argument("--libs-files", type=int, default=200, help="libs 中文件数量")
+    parser.add_argument("--workers", type=int, default=sync_engine.DEFAULT_WORKERS, help="复制线程数")
+    parser.add_argument("--modes", default="default,libs", help="要测试的模式，逗号分隔")
+    parser.add_argument("--seed", type=int, default=1, help="随机种子，相同参数生成相同的目录")
+    parser.add_argument("--drop-caches", action="store_true", help="cold 运行前清空系统页缓存（Linux，需 root）")
+    parser.add_argument("--quick", action="store_true", help="小规模快速运行")
+    parser.add_argument("--out", help="结果 JSON 路径（默认 benchmarks/results/bench_sync_<时间>.json）")
+    parser.add_argument("--keep", action="store_true", help="保留生成的测试目录")
+    args = parser.parse_args(argv)
+    if args.quick:
+        args.tiny_files, args.huge_files, args.huge_mb, args.libs_files = 2000, 2, 8, 40
+    return args
+
+
+def write_random(path, size, rng):
+    with open(path, 'wb') as f:
+        f.write(rng.getrandbits(size * 8).to_bytes(size, 'little') if size else b'')
+
+
+def write_huge(path, size_mb, rng):
+    block = rng.getrandbits(8 * 1024 * 1024).to_bytes(1024 * 1024, 'little')
+    with open(path, 'wb') as f:
+        for i in range(size_mb):
+            f.write(bytes([i % 256]) + block[1:])
+
+
+def generate_tree(root, args):
+    """生成模拟的 Unity 导出目录与 AS 工程，返回 (data_path, as_path, assets子文件夹选择)"""
+    rng = random.Random(args.seed)
+    data_path = os.path.join(root, "Data")
+    as_path = os.path.join(root, "AS")
+    assets = os.path.join(data_path, "unityLibrary", "src", "main", "assets")
+
+    top_dirs = [f"Pack_{i:02d}" for i in range(args.top_dirs)]
+    for i in range(args.tiny_files):
+        parts = [top_dirs[i % len(top_dirs)]]
+        for level in range(rng.randint(0, args.depth - 1)):
+            parts.append(f"d{level}_{rng.randint(0, 3)}")
+        folder = os.path.join(assets, *parts)
+        os.makedirs(folder, exist_ok=True)
+        write_random(os.path.join(folder, f"asset_{i}.bytes"), rng.randint(64, args.tiny_max_kb * 1024), rng)
+
+    jni = os.path.join(data_path, "unityLibrary", "src", "main", "jniLibs", "arm64-v8a")
+    os.makedirs(jni, exist_ok=True)
+    for i in range(args.huge_files):
+        write_huge(os.path.join(jni, f"lib_{i}.so"), args.huge_mb, rng)
+
+    libs = os.path.join(data_path, "unityLibrary", "libs")
+    as_libs = os.path.join(as_path, "app", "libs", "main")
+    for i in range(args.libs_files):
+        folder = os.path.join(libs, f"group_{i % 5}")
+        os.makedirs(folder, exist_ok=True)
+        name = f"lib_{i}.{'aar' if i % 3 else 'jar'}"
+        write_random(os.path.join(folder, name), rng.randint(4 * 1024, 512 * 1024), rng)
+
+    selections = {}
+    if args.deselect_every:
+        selections = {name: i % args.deselect_every != 0 for i, name in enumerate(top_dirs)}
+    return data_path, as_path, selections, as_libs
+
+
+def reset_libs_destination(data_path, as_libs):
+    """libs 模式的目标：放入约一半的源文件，内容为旧版本"""
+    shutil.rmtree(as_libs, ignore_errors=True)
+    src_libs = os.path.join(data_path, "unityLibrary", "libs")
+    for i, (root, _, files) in enumerate(os.walk(src_libs)):
+        for j, name in enumerate(sorted(files)):
+            if (i + j) % 2:
+                continue
+            folder = os.path.join(as_libs, os.path.relpath(root, src_libs))
+            os.makedirs(folder, exist_ok=True)
+            with open(os.path.join(folder, name), 'wb') as f:
+                f.write(b"stale")
+
+
+def build_tasks(mode, data_path, as_path, selections):
+    path_config = [dict(item) for item in sync_engine.DEFAULT_PATH_CONFIG]
+    names = [item["name"] for item in path_config if item["mode"] == mode]
+    scheme = {
+        "data_path": data_path,
+        "as_path": as_path,
+        "selections": {name: True for name in names},
+        "subdir_selections": {"assets": selections},
+    }
+    return sync_engine.build_tasks(path_config, scheme)
+
+
+def touch_changes(data_path, rng):
+    """修改约 1% 的小文件和一个大文件，模拟一次增量导出"""
+    assets = os.path.join(data_path, "unityLibrary", "src", "main", "assets")
+    files = [os.path.join(root, name) for root, _, names in os.walk(assets) for name in names]
+    for path in rng.sample(files, max(1, len(files) // 100)):
+        write_random(path, rng.randint(64, 4096), rng)
+    jni = os.path.join(data_path, "unityLibrary", "src", "main", "jniLibs", "arm64-v8a")
+    for name in sorted(os.listdir(jni))[:1]:
+        with open(os.path.join(jni, name), 'r+b') as f:
+            f.write(os.urandom(4096))
+
+
+def drop_caches():
+    """清空 Linux 页缓存，失败（非 root 或非 Linux）时返回 False"""
+    try:
+        os.sync()
+        with open("/proc/sys/vm/drop_caches", 'w') as f:
+            f.write("3\n")
+        return True
+    except OSError:
+        return False
+
+
+def run_once(mode, run, data_path, as_path, selections, workers):
+    tasks = build_tasks(mode, data_path, as_path, selections)
+    timer = BenchTimer()
+    start = time.perf_counter()
+    stats = sync_engine.run_sync(tasks, workers=workers, timer=timer)
+    total = time.perf_counter() - start
+
+    phases = dict(timer.phases)
+    if mode == "libs":
+        phases["libs-sync"] = phases.pop("copy", 0.0)
+    return {
+        "mode": mode,
+        "run": run,
+        "seconds": round(total, 4),
+        "phases": {name: round(value, 4) for name, value in phases.items()},
+        "source_files": sum(task["manifest"].total_files for task in tasks),
+        "source_bytes": sum(task["manifest"].total_bytes for task in tasks),
+        "copied_files": stats.copied,
+        "copied_bytes": timer.copied_bytes,
+        "files_per_s": round(stats.copied / total, 1) if total else None,
+        "mb_per_s": round(timer.copied_bytes / 1024 / 1024 / total, 1) if total else None,
+        "stats": stats.as_dict(),
+    }
+
+
+class BenchTimer(sync_engine.PhaseTimer):
+    """在阶段耗时之外累计 copy 阶段实际写入的字节数"""
+
+    def __init__(self):
+        super().__init__()
+        self.copied_bytes = 0
+        self._lock = threading.Lock()
+
+    def record(self, task, phase, seconds, files=0, size=0):
+        if phase == "copy":
+            with self._lock:
+                self.copied_bytes += size
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.dir:
+        os.makedirs(args.dir, exist_ok=True)
+    root = tempfile.mkdtemp(prefix="automove_bench_", dir=args.dir)
+    rng = random.Random(args.seed + 1)
+    results = []
+    try:
+        start = time.perf_counter()
+        data_path, as_path, selections, as_libs = generate_tree(root, args)
+        print(f"生成测试目录用时 {time.perf_counter() - start:.1f}s: {root}")
+
+        for mode in args.modes.split(","):
+            mode = mode.strip()
+            if mode == "default":
+                shutil.rmtree(os.path.join(as_path, "app", "src"), ignore_errors=True)
+            elif mode == "libs":
+                reset_libs_destination(data_path, as_libs)
+
+            for run in ("cold", "warm", "update"):
+                if run == "update":
+                    touch_changes(data_path, rng)
+                dropped = drop_caches() if run == "cold" and args.drop_caches else False
+                result = run_once(mode, run, data_path, as_path, selections, args.workers)
+                result["caches_dropped"] = dropped
+                results.append(result)
+                phases = "  ".join(f"{name}={value:.3f}s" for name, value in result["phases"].items())
+                print(f"{mode:<8} {run:<6} {result['seconds']:>8.3f}s  {phases}  "
+                      f"复制 {result['files_per_s']} 文件/s  {result['mb_per_s']} MB/s  "
+                      f"（{result['copied_files']}/{result['source_files']} 个文件）跳过 {result['stats']['skipped']} "
+                      f"删除 {result['stats']['deleted']}")
+
+        report = {
+            "created": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "revision": git_revision(),
+            "platform": platform.platform(),
+            "python": platform.python_version(),
+            "params": {key: value for key, value in vars(args).items() if key not in ("out", "dir", "keep")},
+            "results": results,
+        }
+        out = args.out
+        if not out:
+            os.makedirs(RESULTS_DIR, exist_ok=True)
+            out = os.path.join(RESULTS_DIR, time.strftime("bench_sync_%Y%m%d_%H%M%S.json"))
+        with open(out, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"结果已保存到 {out}")
+        return 0
+    finally:
+        if not args.keep:
+            shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
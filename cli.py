@@ -0,0 +1,334 @@
+"""命令行/批处理入口：无需图形界面，按已保存的方案执行同步
+
+用法示例：
+    python cli.py 渠道A 渠道B
+    python cli.py --list
+    python cli.py 渠道A --config-dir D:/AutoMove/Data --workers 8
+    python cli.py 渠道A --watch         # 先同步一次，之后持续监视 Data，Ctrl+C 退出
+    python cli.py 渠道A --verify        # 同步后逐个校验目标文件与源文件的内容（--verify size 只比较大小）
+    python cli.py 渠道A --dry-run       # 只列出将要复制/覆盖/删除的文件与预计耗时，不改动磁盘
+    python cli.py 渠道A --snapshot      # 同步前为AS工程中的目标目录建立硬链接快照
+    python cli.py 渠道A --restore       # 把渠道A的目标目录恢复为最近的快照（--restore <快照ID> 指定快照）
+
+指定多个方案时合并为一次同步：共享的源目录只扫描一次、源文件只读取一次，
+目标目录互不重叠的方案并行执行。
+结果以 JSON 输出到标准输出，任一方案失败（含单个文件复制失败、校验发现不一致）时退出码非零。
+每次运行的分阶段耗时报告写入 Data/logs（见 sync_report.py），路径包含在输出的 "report" 字段中；
+报告保存失败（如 Data/logs 不可写）时 "report" 为 null，原因在 "report_error" 字段中，不影响退出码。
+同步过程记录在 Data/sync_journal.jsonl（见 sync_journal.py），被中断后再次执行相同方案时从中断处继续，
+续传跳过的文件数在输出的 "resumed" 字段中。
+--watch 时每同步完一批输出一行 JSON（变化路径数、耗时、统计或错误）。
+本模块不导入 tkinter，可在无显示环境（CI 容器）中直接运行。
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import sync_engine
+import scan_cache
+import object_store
+import delta_copy
+import sync_rules
+import sync_report
+import sync_journal
+import sync_verify
+import snapshots
+import sync_plan
+import sync_job
+import sync_watch
+
+EXIT_OK = 0
+EXIT_FAILED = 1
+EXIT_USAGE = 2
+EXIT_INTERRUPTED = 130
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="安卓TEST：Data资源同步工具（命令行模式）")
+    parser.add_argument("schemes", nargs="*", help="要执行的方案名称，可指定多个，合并为一次同步")
+    parser.add_argument("--config-dir", default="Data", help="schemes.json 与 path_config.json 所在目录（默认 Data）")
+    parser.add_argument("--list", action="store_true", help="列出已保存的方案后退出")
+    parser.add_argument("--workers", type=int, help="复制线程数，默认使用方案中保存的值")
+    parser.add_argument("--hash", dest="use_hash", action="store_true", default=None,
+                        help="比对内容哈希，默认使用方案中保存的值")
+    parser.add_argument("--scan-cache", action="store_true", default=None,
+                        help="沿用 Data 扫描缓存中的文件属性（见 scan_cache.py），默认使用方案中保存的值")
+    parser.add_argument("--store", action="store_true", default=None,
+                        help="目标文件硬链接到 Data/objects 去重对象库（见 object_store.py），默认使用方案中保存的值")
+    parser.add_argument("--delta", action="store_true", default=None,
+                        help="已存在的大文件只重写变化的块（见 delta_copy.py），默认使用方案中保存的值")
+    parser.add_argument("--delta-min-size", help="块级更新的最小文件大小，如 64MB（默认使用方案中保存的值）")
+    parser.add_argument("--store-gc", action="store_true", help="清理对象库中已没有目标引用的对象后退出")
+    parser.add_argument("--verify", nargs="?", const="hash", choices=sync_verify.VERIFY_MODES,
+                        help="同步后校验目标文件：hash（默认）比较内容哈希，size 只比较大小（见 sync_verify.py），"
+                             "默认使用方案中保存的值")
+    parser.add_argument("--snapshot", action="store_true", default=None,
+                        help="同步前为目标目录建立硬链接快照（见 snapshots.py），默认使用方案中保存的值")
+    parser.add_argument("--list-snapshots", action="store_true", help="列出已有的快照后退出")
+    parser.add_argument("--restore", nargs="?", const="latest", metavar="快照ID",
+                        help="把目标目录恢复为指定快照（默认最近的一个）后退出；方案名称写在 --restore 之前时只恢复这些方案的目标目录")
+    parser.add_argument("--no-report", action="store_true", help="不写入 Data/logs 运行报告")
+    parser.add_argument("--no-journal", action="store_true",
+                        help="不记录同步日志，被中断后下次同步不续传（见 sync_journal.py）")
+    parser.add_argument("--profile", action="store_true", default=None,
+                        help="用 cProfile 分析本次同步，结果保存在报告旁（也可设置环境变量 AUTOMOVE_PROFILE=1）")
+    parser.add_argument("--dry-run", action="store_true",
+                        help="只生成同步计划（见 sync_plan.py）：列出将要执行的操作、总量与预计耗时，不改动磁盘")
+    parser.add_argument("--watch", action="store_true", help="同步后持续监视 Data 目录，只同步变化的文件")
+    parser.add_argument("--debounce", type=float, default=sync_watch.DEFAULT_DEBOUNCE,
+                        help="监视模式下变化停止多少秒后开始同步（默认 %(default)s）")
+    parser.add_argument("--poll", action="store_true", help="监视模式不使用 inotify，改为定时扫描")
+    parser.add_argument("-v", "--verbose", action="store_true", help="在标准错误输出中打印执行过程")
+    return parser.parse_args(argv)
+
+
+def build_scheme_tasks(names, schemes, path_config):
+    """生成多个方案的同步项（带 "scheme" 字段），返回 (同步项列表, 每个方案的结果字典)"""
+    results = {name: {"scheme": name, "ok": False} for name in names}
+    tasks = []
+    for name in names:
+        try:
+            scheme_tasks = sync_engine.build_tasks(path_config, schemes[name])
+            sync_engine.check_sources(scheme_tasks)
+        except Exception as e:
+            # 单个方案配置有误不影响其他方案
+            results[name]["error"] = str(e)
+            continue
+        for task in scheme_tasks:
+            task["scheme"] = name
+        results[name]["entries"] = [task["name"] for task in scheme_tasks]
+        tasks.extend(scheme_tasks)
+    return tasks, results
+
+
+def _option(first, args, attr, key, default):
+    value = getattr(args, attr)
+    return first.get(key, default) if value is None else value
+
+
+def sync_options(first, args):
+    """多个方案使用同一份同步设置，取第一个方案中保存的值，命令行参数优先
+
+    返回 run_sync 的关键字参数：use_hash、workers，以及按设置打开的扫描缓存、对象库、块哈希缓存与同步日志。
+    """
+    workers = args.workers or first.get("workers", sync_engine.DEFAULT_WORKERS)
+    use_cache = _option(first, args, "scan_cache", "scan_cache", False)
+    use_store = _option(first, args, "store", "object_store", False)
+    use_delta = _option(first, args, "delta", "delta_copy", False)
+    min_size = sync_rules.parse_size(_option(first, args, "delta_min_size", "delta_min_size",
+                                             delta_copy.DEFAULT_MIN_SIZE))
+    return {
+        "use_hash": _option(first, args, "use_hash", "use_hash", False),
+        "workers": max(1, workers),
+        "cache": scan_cache.open_cache(args.config_dir) if use_cache else None,
+        "store": object_store.open_store(args.config_dir) if use_store else None,
+        "delta": delta_copy.open_copier(args.config_dir, min_size) if use_delta else None,
+        "journal": None if args.no_journal else sync_journal.open_journal(args.config_dir),
+    }
+
+
+def verify_mode(first, args):
+    """同步后校验方式，方案中保存的 "verify" 为 true 时按内容哈希校验，未开启时返回 None"""
+    value = _option(first, args, "verify", "verify", None)
+    return "hash" if value is True else value or None
+
+
+def run_schemes(names, schemes, path_config, args):
+    """把多个方案合并为一次同步执行，返回 (每个方案的结果字典列表, 汇总信息)
+
+    汇总信息包含 elapsed（耗时）、report（报告路径）、resumed（续传跳过的文件数）与 snapshot（同步前快照的 ID）。
+    """
+    tasks, results = build_scheme_tasks(names, schemes, path_config)
+    options = sync_options(schemes[names[0]], args)
+    cache, store, delta = options["cache"], options["store"], options["delta"]
+    mode = verify_mode(schemes[names[0]], args)
+    if mode is not None and cache is None:
+        # 未开启扫描缓存时也借用其中记录的源文件哈希，下次校验只需读取目标
+        options["digest_cache"] = scan_cache.open_cache(args.config_dir)
+    if _option(schemes[names[0]], args, "snapshot", "snapshot", False):
+        options["snapshot_store"] = snapshots.open_snapshots(args.config_dir, schemes[names[0]])
+    job = None
+
+    def on_event(event):
+        if not args.verbose:
+            return
+        if event[0] == "scanned":
+            print(f"扫描完成：{event[1]} 个文件，{sync_engine.format_size(event[2])}", file=sys.stderr)
+        elif event[0] == "snapshot":
+            print(f"同步前快照：{event[1]}", file=sys.stderr)
+
+    report = sync_report.RunReport()
+    log_dir = sync_report.log_dir_for(args.config_dir)
+    start = time.monotonic()
+    try:
+        job = sync_job.run_job(tasks, verify=mode, emit=on_event, report=report, log_dir=log_dir,
+                               profile=args.profile, **options)
+        verify = job.verify
+        if args.verbose:
+            if job.resumed:
+                print(f"续传：跳过上次已完成的 {job.resumed} 个文件", file=sys.stderr)
+            if store is not None:
+                print(f"对象库：计算哈希 {store.hashed} 个文件，新增对象 {store.stored} 个", file=sys.stderr)
+            if delta is not None:
+                print(f"块级更新：共 {delta.blocks_total} 块，重写 {delta.blocks_written} 块", file=sys.stderr)
+            if cache is not None:
+                print(f"扫描缓存：命中 {cache.hits} 个目录，重新扫描 {cache.misses} 个目录", file=sys.stderr)
+        by_scheme = sync_engine.stats_by_scheme(tasks)
+        for name, result in results.items():
+            if "error" in result:
+                continue
+            scheme_stats = by_scheme.get(name, sync_engine.SyncStats())
+            result["stats"] = scheme_stats.as_dict()
+            result["ok"] = not scheme_stats.errors
+            if verify is not None:
+                result["mismatches"] = [
+                    {"path": path, "reason": reason} for scheme, _, path, reason in verify.mismatches if scheme == name
+                ]
+                result["ok"] = result["ok"] and not result["mismatches"]
+    except Exception as e:
+        for task in tasks:
+            results[task["scheme"]]["error"] = str(e)
+    elapsed = round(time.monotonic() - start, 3)
+    report.finish(*(job.stats, job.verify) if job is not None else ())
+    report_path = report_error = None
+    if not args.no_report:
+        try:
+            report_path = report.save(log_dir)
+        except OSError as e:
+            report_error = str(e)
+    if args.verbose:
+        print(f"同步结束，耗时 {elapsed} 秒", file=sys.stderr)
+        print(report.summary(), file=sys.stderr)
+    return list(results.values()), {
+        "elapsed": elapsed,
+        "report": report_path,
+        "report_error": report_error,
+        "resumed": job.resumed if job is not None else 0,
+        "snapshot": job.snapshot.id if job is not None and job.snapshot is not None else None,
+    }
+
+
+def plan_schemes(names, schemes, path_config, args):
+    """预演：扫描并生成同步计划，返回输出的结果字典"""
+    tasks, results = build_scheme_tasks(names, schemes, path_config)
+    errors = {name: result["error"] for name, result in results.items() if "error" in result}
+    options = sync_options(schemes[names[0]], args)
+    cache = options["cache"]
+    try:
+        plan = sync_plan.build_plan(tasks, options["use_hash"], cache, log_dir=sync_report.log_dir_for(args.config_dir))
+    except Exception as e:
+        return {"ok": False, "dry_run": True, "error": str(e)}
+    if cache is not None:
+        cache.save()
+    if args.verbose:
+        print(plan.summary(), file=sys.stderr)
+    return {"ok": not errors, "dry_run": True, "errors": errors, "plan": plan.as_dict()}
+
+
+def restore_snapshot(names, schemes, args):
+    """把目标目录恢复为快照，返回输出的结果字典"""
+    store = snapshots.open_snapshots(args.config_dir, schemes[names[0]] if names else None)
+    start = time.monotonic()
+    try:
+        snapshot = store.get(args.restore)
+        stats = store.restore(snapshot, names, workers=max(1, args.workers or sync_engine.DEFAULT_WORKERS))
+    except KeyError as e:
+        return {"ok": False, "error": e.args[0]}
+    except OSError as e:
+        return {"ok": False, "error": str(e)}
+    return {
+        "ok": not stats.errors,
+        "snapshot": snapshot.id,
+        "elapsed": round(time.monotonic() - start, 3),
+        "stats": stats.as_dict(),
+    }
+
+
+def watch_schemes(names, schemes, path_config, args):
+    """监视模式：先完整同步一次，之后每批变化输出一行 JSON，直到 Ctrl+C"""
+    tasks, results = build_scheme_tasks(names, schemes, path_config)
+    for result in results.values():
+        if "error" in result:
+            print(f"方案 {result['scheme']} 无法监视: {result['error']}", file=sys.stderr)
+    options = sync_options(schemes[names[0]], args)
+    # 监视模式按变化的路径扫描，不使用扫描缓存；每批都很小，不记录同步日志
+    options.pop("cache")
+    options.pop("journal")
+
+    def on_batch(stats, changed, seconds, error):
+        print(json.dumps({
+            "changes": changed,
+            "elapsed": round(seconds, 3),
+            "stats": stats.as_dict() if stats is not None else None,
+            "error": error,
+        }, ensure_ascii=False), flush=True)
+
+    if args.verbose:
+        mode = "轮询" if args.poll or not sync_watch.HAS_INOTIFY else "inotify"
+        print(f"开始监视（{mode}），按 Ctrl+C 退出", file=sys.stderr)
+    sync_watch.watch(tasks, debounce=args.debounce, on_batch=on_batch, polling=args.poll, **options)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    schemes = sync_engine.load_schemes(os.path.join(args.config_dir, "schemes.json"))
+    path_config = sync_engine.load_path_config(os.path.join(args.config_dir, "path_config.json"))
+
+    if args.list:
+        print(json.dumps(list(schemes.keys()), ensure_ascii=False))
+        return EXIT_OK
+
+    if args.store_gc:
+        store = object_store.open_store(args.config_dir)
+        removed, freed = store.gc()
+        objects, size = store.usage()
+        print(json.dumps({"removed": removed, "freed": freed, "objects": objects, "bytes": size}, ensure_ascii=False))
+        return EXIT_OK
+
+    missing = [name for name in args.schemes if name not in schemes]
+    if args.list_snapshots:
+        store = snapshots.open_snapshots(args.config_dir, schemes.get(args.schemes[0]) if args.schemes else None)
+        print(json.dumps([snapshot.as_dict() for snapshot in store.list()], ensure_ascii=False, indent=2))
+        return EXIT_OK
+
+    if args.restore:
+        if missing:
+            print(f"方案不存在: {', '.join(missing)}", file=sys.stderr)
+            return EXIT_USAGE
+        result = restore_snapshot(list(dict.fromkeys(args.schemes)), schemes, args)
+        print(json.dumps(result, ensure_ascii=False, indent=2))
+        return EXIT_OK if result["ok"] else EXIT_FAILED
+
+    if not args.schemes:
+        print("请指定至少一个方案名称（--list 查看已保存的方案）", file=sys.stderr)
+        return EXIT_USAGE
+    if missing:
+        print(f"方案不存在: {', '.join(missing)}", file=sys.stderr)
+        return EXIT_USAGE
+
+    # 去重并保持顺序
+    names = list(dict.fromkeys(args.schemes))
+    if args.dry_run:
+        result = plan_schemes(names, schemes, path_config, args)
+        print(json.dumps(result, ensure_ascii=False, indent=2))
+        return EXIT_OK if result["ok"] else EXIT_FAILED
+    if args.watch:
+        try:
+            watch_schemes(names, schemes, path_config, args)
+        except KeyboardInterrupt:
+            pass
+        return EXIT_OK
+    try:
+        results, summary = run_schemes(names, schemes, path_config, args)
+    except KeyboardInterrupt:
+        return EXIT_INTERRUPTED
+
+    ok = all(result["ok"] for result in results)
+    print(json.dumps({"ok": ok, **summary, "results": results}, ensure_ascii=False, indent=2))
+    return EXIT_OK if ok else EXIT_FAILED
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -4,6 +4,26 @@ from tqdm import tqdm
 import os
 import shutil
 import json
+import queue
+import threading
+import time
+
+import sync_engine
+import copy_backends
+import scan_cache
+import object_store
+import delta_copy
+import sync_journal
+import snapshots
+import sync_plan
+import sync_job
+import sync_rules
+import sync_report
+import sync_watch
+from subdir_browser import SubdirBrowser
+
+# 进度刷新间隔（毫秒），后台同步的进度事件按此频率汇总到界面
+PROGRESS_INTERVAL_MS = 100
 
 class FileSyncApp:
     def __init__(self, master):
@@ -23,6 +43,13 @@ class FileSyncApp:
         self.current_scheme = "默认"
         self.config_file = os.path.join("Data", "schemes.json")
         self.path_config_file = os.path.join("Data", "path_config.json")
+        # Data目录扫描缓存，切换方案、勾选子文件夹与同步时共用
+        self.scan_cache = scan_cache.open_cache("Data")
+        # 去重对象库（Data/objects），勾选“去重对象库”后首次同步时再打开
+        self.object_store = None
+        # 大文件块哈希缓存（Data/block_cache.json），勾选“大文件块级更新”后首次同步时再打开
+        self.delta_copier = None
+        master.protocol("WM_DELETE_WINDOW", self.on_close)
 
         # 加载配置
         self.load_schemes()
@@ -106,29 +133,83 @@ class FileSyncApp:
             )
             cb.pack(anchor="w")
             
-            # 创建子文件夹显示区域
-            config["subdir_frame"] = ttk.Frame(cell_frame)
-            config["subdir_tree"] = ttk.Treeview(config["subdir_frame"], 
-                                                height=4, 
-                                                show="headings",
-                                                columns=("check", "name"),
-                                                selectmode="none")
-            scroll = ttk.Scrollbar(config["subdir_frame"], 
-                                    orient="vertical",
-                                    command=config["subdir_tree"].yview)
-            config["subdir_tree"].configure(yscrollcommand=scroll.set)
-            
-            # 添加列
-            config["subdir_tree"].column("check", width=20, anchor="w")
-            config["subdir_tree"].column("name", width=200, anchor="w")
-            config["subdir_tree"].heading("check", text="")
-            config["subdir_tree"].heading("name", text="子文件夹名称")
-            
-            scroll.pack(side="right", fill="y")
-            config["subdir_tree"].pack(side="left", fill="both", expand=True)
-            
-            # 初始化隐藏
-            config["subdir_frame"].pack_forget()
+            # 创建子文件夹显示区域：勾选状态直接写入 subdir_vars，显示时才列出子文件夹
+            config["subdir_browser"] = SubdirBrowser(cell_frame, self.scan_cache, config["subdir_vars"])
+            config["subdir_frame"] = config["subdir_browser"].frame
+
+        # 同步选项
+        option_frame = ttk.LabelFrame(main_frame, text="同步选项", padding=10)
+        option_frame.pack(fill=tk.X, pady=5)
+
+        # 增量比对方式：默认按大小+修改时间，勾选后额外比对内容哈希
+        self.use_hash_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(
+            option_frame,
+            text="内容哈希比对",
+            variable=self.use_hash_var
+        ).pack(side=tk.LEFT, padx=5)
+
+        # 同步时沿用扫描缓存中的文件属性（原地改写的文件可能识别不到，见 scan_cache.py）
+        self.scan_cache_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(
+            option_frame,
+            text="扫描缓存",
+            variable=self.scan_cache_var
+        ).pack(side=tk.LEFT, padx=5)
+
+        # 目标文件硬链接到内容寻址的对象库，多个渠道共用的资源只存一份（见 object_store.py）
+        self.store_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(
+            option_frame,
+            text="去重对象库",
+            variable=self.store_var
+        ).pack(side=tk.LEFT, padx=5)
+
+        # 已存在的大文件只重写变化的块，阈值为方案中的 delta_min_size（默认64MB，见 delta_copy.py）
+        self.delta_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(
+            option_frame,
+            text="大文件块级更新",
+            variable=self.delta_var
+        ).pack(side=tk.LEFT, padx=5)
+
+        # 同步完成后逐个比较目标与源文件的大小与内容哈希，找出缺失、截断或过期的文件（见 sync_verify.py）
+        self.verify_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(
+            option_frame,
+            text="同步后校验",
+            variable=self.verify_var
+        ).pack(side=tk.LEFT, padx=5)
+
+        # 改动AS工程之前为目标目录建立硬链接快照，导入出错时可“回滚”（见 snapshots.py）
+        self.snapshot_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(
+            option_frame,
+            text="同步前快照",
+            variable=self.snapshot_var
+        ).pack(side=tk.LEFT, padx=5)
+
+        # 复制方式（同步项在 path_config.json 中单独配置 copy_backend 时以同步项为准）
+        ttk.Label(option_frame, text="复制方式:").pack(side=tk.LEFT, padx=(5, 0))
+        self.backend_combo = ttk.Combobox(
+            option_frame,
+            values=copy_backends.BACKENDS,
+            state="readonly",
+            width=14
+        )
+        self.backend_combo.set(copy_backends.DEFAULT_BACKEND)
+        self.backend_combo.pack(side=tk.LEFT, padx=5)
+
+        # 并行复制线程数
+        ttk.Label(option_frame, text="线程数:").pack(side=tk.LEFT, padx=(5, 0))
+        self.workers_var = tk.IntVar(value=sync_engine.DEFAULT_WORKERS)
+        ttk.Spinbox(
+            option_frame,
+            from_=1,
+            to=32,
+            width=4,
+            textvariable=self.workers_var
+        ).pack(side=tk.LEFT, padx=5)
 
         # 操作按钮
         btn_frame = ttk.Frame(main_frame)
@@ -137,6 +218,23 @@ class FileSyncApp:
         self.sync_btn = ttk.Button(btn_frame, text="开始导入", command=self.start_sync)
         self.sync_btn.pack(side=tk.LEFT, padx=5)
 
+        # 预览：先列出将要复制/覆盖/删除的文件与预计耗时，确认后按同一计划执行
+        self.preview_btn = ttk.Button(btn_frame, text="预览…", command=self.start_preview)
+        self.preview_btn.pack(side=tk.LEFT, padx=5)
+
+        self.batch_btn = ttk.Button(btn_frame, text="批量导入", command=self.open_batch_dialog)
+        self.batch_btn.pack(side=tk.LEFT, padx=5)
+
+        # 监视模式：Data 有变化时自动同步变化的文件
+        self.watch_btn = ttk.Button(btn_frame, text="开始监视", command=self.toggle_watch)
+        self.watch_btn.pack(side=tk.LEFT, padx=5)
+        self.watch_thread = None
+
+        self.rollback_btn = ttk.Button(btn_frame, text="回滚…", command=self.open_rollback_dialog)
+        self.rollback_btn.pack(side=tk.LEFT, padx=5)
+        self.watch_label = ttk.Label(main_frame, text="")
+        self.watch_label.pack(fill=tk.X)
+
 
     def load_schemes(self):
         """加载保存的方案"""
@@ -166,12 +264,20 @@ class FileSyncApp:
         config = {
             "data_path": self.data_entry.get(),
             "as_path": self.as_entry.get(),
+            "use_hash": self.use_hash_var.get(),
+            "workers": self.get_workers(),
+            "copy_backend": self.backend_combo.get(),
+            "scan_cache": self.scan_cache_var.get(),
+            "object_store": self.store_var.get(),
+            "delta_copy": self.delta_var.get(),
+            "verify": self.verify_var.get(),
+            "snapshot": self.snapshot_var.get(),
             "selections": {
                 cfg["name"]: cfg["var"].get() for cfg in self.path_config
             },
             "subdir_selections": {
-                cfg["name"]: {subdir_name: subdir_var.get() for subdir_name, subdir_var in cfg["subdir_vars"].items()}
-                for cfg in self.path_config if "subdir_vars" in cfg
+                cfg["name"]: dict(cfg["subdir_vars"])
+                for cfg in self.path_config if cfg["subdir_vars"]
             }
         }
         
@@ -192,7 +298,6 @@ class FileSyncApp:
 
     def load_scheme(self, event=None):
         """加载选定方案"""
-        print("load_scheme--------------------")
         scheme_combo = self.scheme_combo.get()
         if not scheme_combo or scheme_combo not in self.schemes:
             return
@@ -205,6 +310,15 @@ class FileSyncApp:
         
         self.as_entry.delete(0, tk.END)
         self.as_entry.insert(0, config["as_path"])
+
+        self.use_hash_var.set(config.get("use_hash", False))
+        self.workers_var.set(config.get("workers", sync_engine.DEFAULT_WORKERS))
+        self.backend_combo.set(config.get("copy_backend", copy_backends.DEFAULT_BACKEND))
+        self.scan_cache_var.set(config.get("scan_cache", False))
+        self.store_var.set(config.get("object_store", False))
+        self.delta_var.set(config.get("delta_copy", False))
+        self.verify_var.set(config.get("verify", False))
+        self.snapshot_var.set(config.get("snapshot", False))
         
         # 更新复选框状态
         try:
@@ -212,14 +326,8 @@ class FileSyncApp:
                 main_var = config["selections"].get(cfg["name"], False)
                 cfg["var"].set(main_var)
                 
-                # 恢复子文件夹选择状态
-                subdir_selections = config.get("subdir_selections", {}).get(cfg["name"], {})
-                for subdir, value in subdir_selections.items():
-                    if subdir in cfg["subdir_vars"]:
-                        cfg["subdir_vars"][subdir].set(value)
-                            
-                    # 重新加载子文件夹到TreeView
-                    self.load_subdirs(cfg)
+                # 恢复子文件夹选择状态：只替换选择字典，不重新列出目录
+                cfg["subdir_browser"].set_selection(config.get("subdir_selections", {}).get(cfg["name"], {}))
 
                 # 如果配置项被选中且配置项有子文件夹，则显示子文件夹
                 if cfg["var"].get() and cfg.get("isShow", False):
@@ -230,8 +338,79 @@ class FileSyncApp:
         self.current_scheme = scheme_combo
 
     def start_sync(self):
+        self.run_in_background(self.build_current_tasks(), self.data_entry.get())
+
+    def start_preview(self):
+        """在后台线程扫描并生成同步计划（不改动磁盘），完成后显示计划"""
+        tasks = self.build_current_tasks()
+        cache = self.scan_cache if self.scan_cache_var.get() else None
+        self.set_buttons_state("disabled")
+        self.plan_queue = queue.Queue()
+
+        def worker():
+            try:
+                plan = sync_plan.build_plan(tasks, self.use_hash_var.get(), cache,
+                                            log_dir=sync_report.log_dir_for("Data"))
+                if cache is not None:
+                    cache.save()
+                self.plan_queue.put(("plan", plan))
+            except Exception as e:
+                self.plan_queue.put(("error", str(e)))
+
+        threading.Thread(target=worker, daemon=True).start()
+        self.master.after(PROGRESS_INTERVAL_MS, self.poll_plan)
+
+    def poll_plan(self):
+        try:
+            event = self.plan_queue.get_nowait()
+        except queue.Empty:
+            self.master.after(PROGRESS_INTERVAL_MS, self.poll_plan)
+            return
+        self.set_buttons_state("normal")
+        if event[0] == "error":
+            messagebox.showerror("错误", f"生成同步计划失败: {event[1]}")
+        else:
+            self.show_plan_dialog(event[1], self.data_entry.get())
+
+    def show_plan_dialog(self, plan, data_path):
+        """显示同步计划：各操作的总量、预计耗时与将要改动的文件，确认后执行同一计划"""
+        dialog = tk.Toplevel(self.master)
+        dialog.title("同步计划")
+        dialog.geometry("900x500")
+
+        ttk.Label(dialog, text=plan.summary(), justify=tk.LEFT).pack(anchor="w", padx=10, pady=5)
+        tree = ttk.Treeview(dialog, columns=("action", "entry", "path", "size"), show="headings")
+        for column, text, width in (("action", "操作", 60), ("entry", "同步项", 120), ("path", "目标文件", 560),
+                                    ("size", "大小", 90)):
+            tree.heading(column, text=text)
+            tree.column(column, width=width, stretch=column == "path")
+        changes = plan.changes
+        for op in changes[:sync_plan.MAX_LISTED]:
+            tree.insert("", tk.END, values=(sync_plan.ACTION_NAMES[op.action], op.task["name"], op.dst,
+                                            sync_engine.format_size(op.size)))
+        tree.pack(fill=tk.BOTH, expand=True, padx=10)
+        if len(changes) > sync_plan.MAX_LISTED:
+            ttk.Label(dialog, text=f"只列出前 {sync_plan.MAX_LISTED} 项，共 {len(changes)} 项").pack(anchor="w", padx=10)
+
+        def execute():
+            dialog.destroy()
+            self.run_in_background(plan.tasks, data_path, plan=plan)
+
+        buttons = ttk.Frame(dialog)
+        buttons.pack(pady=10)
+        ttk.Button(buttons, text="按此计划导入", command=execute).pack(side=tk.LEFT, padx=5)
+        ttk.Button(buttons, text="关闭", command=dialog.destroy).pack(side=tk.LEFT, padx=5)
+
+    def set_buttons_state(self, state):
+        for button in (self.sync_btn, self.preview_btn, self.batch_btn, self.watch_btn, self.rollback_btn):
+            button.config(state=state)
+
+    def build_current_tasks(self):
+        """按界面上当前的路径与勾选状态生成同步项"""
         data_path = self.data_entry.get()
         as_path = self.as_entry.get()
+        # 记下方案名（与批量导入、命令行一致）：快照中的目标目录可被 cli.py <方案> --restore 找到
+        scheme = self.scheme_combo.get().strip()
         
         # 构建完整路径
         processed_config = []
@@ -239,161 +418,403 @@ class FileSyncApp:
             if config["var"].get():  # 只处理选中的路径
                 src = os.path.join(data_path, *config["src_rel"])
                 dst = os.path.join(as_path, *config["dst_rel"])
-                subdir_vars = config.get("subdir_vars", None)
+                # 复制一份，同步过程中界面上的勾选改动不影响本次同步
+                subdir_vars = dict(config["subdir_vars"])
                 processed_config.append({
+                    "name": config["name"],
+                    "scheme": scheme if scheme in self.schemes else None,
                     "src": src,
                     "dst": dst,
                     "mode": config["mode"],
-                    "subdir_vars": subdir_vars
+                    "subdir_vars": subdir_vars,
+                    "rules": config.get("rules"),
+                    "copy_backend": config.get("copy_backend") or self.backend_combo.get()
                 })
+        return processed_config
 
-        # 计算总的文件数
-        total_files = sum(self.count_selected_files(config["src"], config["subdir_vars"]) for config in processed_config)
+    def open_batch_dialog(self):
+        """选择多个已保存的方案，合并为一次同步"""
+        if not self.schemes:
+            messagebox.showwarning("提示", "没有已保存的方案")
+            return
+        dialog = tk.Toplevel(self.master)
+        dialog.title("批量导入")
+        dialog.geometry("300x360")
+
+        ttk.Label(dialog, text="选择要一起导入的方案（可多选）:").pack(anchor="w", padx=10, pady=5)
+        listbox = tk.Listbox(dialog, selectmode=tk.MULTIPLE, exportselection=False)
+        for name in self.schemes:
+            listbox.insert(tk.END, name)
+        listbox.pack(fill=tk.BOTH, expand=True, padx=10)
+
+        def confirm():
+            names = [listbox.get(i) for i in listbox.curselection()]
+            if not names:
+                messagebox.showwarning("提示", "请至少选择一个方案", parent=dialog)
+                return
+            dialog.destroy()
+            self.start_batch_sync(names)
+
+        ttk.Button(dialog, text="开始导入", command=confirm).pack(pady=10)
+
+    def start_batch_sync(self, names):
+        """多个方案合并同步：共享的源目录只扫描、读取一次，目标不重叠的方案并行写入"""
+        tasks = []
+        for name in names:
+            for task in sync_engine.build_tasks(self.path_config, self.schemes[name]):
+                task["scheme"] = name
+                tasks.append(task)
+        self.run_in_background(tasks, None)
+
+    def run_in_background(self, tasks, data_path, restoring=False, plan=None):
+        """打开进度窗口并在后台线程执行同步；data_path 用于显示相对路径，可为 None
+
+        restoring 为 True 时是从快照恢复：按同步项自身的设置直接同步，不使用界面上的各项同步选项。
+        plan 为“预览”生成的 sync_plan.SyncPlan 时直接执行该计划，不再扫描。
+        """
+        use_hash = self.use_hash_var.get() and not restoring
+        workers = self.get_workers()
+        if restoring:
+            cache = store = delta = snapshot_store = self.sync_journal = None
+            verify = False
+        else:
+            cache = self.scan_cache if self.scan_cache_var.get() else None
+            store = self.get_store()
+            delta = self.get_delta()
+            verify = self.verify_var.get()
+            snapshot_store = self.get_snapshots() if self.snapshot_var.get() else None
+            # 每次同步重新读取日志：上一次被取消或程序被关闭时从中断处继续（见 sync_journal.py）
+            self.sync_journal = sync_journal.open_journal("Data")
+
+        self.open_progress_window()
+        self.set_buttons_state("disabled")
+
+        # 同步在后台线程执行，进度事件经队列由界面线程定时取出
+        self.progress_queue = queue.Queue()
+        self.cancel_event = threading.Event()
+        self.sync_report = sync_report.RunReport()
+        self.sync_state = {
+            "data_path": data_path,
+            "tasks": tasks,
+            "files": 0,
+            "bytes": 0,
+            "total_files": 0,
+            "total_bytes": 0,
+            "current": "",
+            "verifying": False,
+            "snapshot": None,
+            "restoring": restoring,
+            "start": time.monotonic(),
+        }
+        options = dict(
+            use_hash=use_hash,
+            workers=workers,
+            cache=cache,
+            store=store,
+            delta=delta,
+            journal=self.sync_journal,
+            # 扫描缓存总是用来记住源文件哈希，下次校验只需读取目标
+            verify="hash" if verify else None,
+            digest_cache=self.scan_cache if verify else None,
+            snapshot_store=snapshot_store,
+            plan=plan
+        )
+        self.sync_thread = threading.Thread(target=self.sync_worker, args=(tasks, options), daemon=True)
+        self.sync_thread.start()
+        self.master.after(PROGRESS_INTERVAL_MS, self.poll_progress)
 
+    def sync_worker(self, tasks, options):
+        """后台线程：执行同步任务（见 sync_job.py），进度事件经队列交给主线程"""
+        events = self.progress_queue
+        try:
+            result = sync_job.run_job(tasks, emit=events.put, cancel=self.cancel_event, report=self.sync_report,
+                                      log_dir=sync_report.log_dir_for("Data"), **options)
+            events.put(("done", result))
+        except sync_engine.SyncCancelled:
+            events.put(("cancelled",))
+        except Exception as e:
+            events.put(("error", str(e)))
 
-        # 打开进度条窗口
+    def open_progress_window(self):
+        """打开进度窗口：进度条、文件/字节/剩余时间、当前文件与取消按钮"""
         self.progress_window = tk.Toplevel(self.master)
         self.progress_window.title("同步进度")
-        self.progress_window.geometry("800x60") 
-        
-        # self.progress_var = tk.DoubleVar(value=0)
-        # self.progress_bar = ttk.Progressbar(self.progress_window, variable=self.progress_var, maximum=100)
-        # self.progress_bar.pack(fill=tk.X, padx=5, pady=5)
-        
+        self.progress_window.geometry("800x130")
+        self.progress_window.protocol("WM_DELETE_WINDOW", self.cancel_sync)
+
+        self.progress_var = tk.DoubleVar(value=0)
+        self.progress_bar = ttk.Progressbar(self.progress_window, variable=self.progress_var, maximum=100)
+        self.progress_bar.pack(fill=tk.X, padx=5, pady=5)
+
+        self.progress_label = ttk.Label(self.progress_window, text="正在扫描…")
+        self.progress_label.pack(fill=tk.X, padx=5)
+
         self.current_file_label = ttk.Label(self.progress_window, text="当前文件路径：")
         self.current_file_label.pack(fill=tk.X, padx=5)
-        
-        current_file_count = 0
 
-        try:
-            # 第一步：清理目标目录（仅限default模式）
-            for config in processed_config:
-                if config["mode"] == "default":
-                    self.clean_directory(config["dst"],config["subdir_vars"])
-
-            # 同步逻辑
-            for config in processed_config:
-                if config["mode"] == "default":
-                    current_file_count = self.copy_contents_with_progress(
-                        config["src"], 
-                        config["dst"], 
-                        data_path, 
-                        total_files, 
-                        current_file_count, 
-                        config["subdir_vars"]
-                    )
-                elif config["mode"] == "libs":
-                    current_file_count = self.sync_libs_with_progress(
-                        config["src"], 
-                        config["dst"], 
-                        data_path, 
-                        total_files, 
-                        current_file_count, 
-                        config["subdir_vars"]
-                    )
-
-            messagebox.showinfo("完成", "资源导入完成！")
-        except Exception as e:
-            messagebox.showerror("错误", f"操作失败: {str(e)}")
-        
-        # 完成同步后，重置进度条
-        # self.progress_var.set(0)
-        self.current_file_label.config(text="当前文件路径：")
-        # self.master.update_idletasks()
-        self.progress_window.destroy()
+        self.cancel_btn = ttk.Button(self.progress_window, text="取消", command=self.cancel_sync)
+        self.cancel_btn.pack(pady=5)
 
-    def count_selected_files(self, directory, subdir_vars=None):
-        """计算当前选中的子目录下的文件总数"""
-        count = 0
-        for root, dirs, files in os.walk(directory):
-            # 检查子文件夹是否被选中
-            if subdir_vars:
-                subdirs_to_keep = [d for d in dirs if subdir_vars.get(d, True)]
-                # 更新 dirs 列表以只包含选中的子文件夹
-                dirs[:] = subdirs_to_keep
-            
-            count += len(files)
-        return count
+    def cancel_sync(self):
+        """请求后台同步停止，在途的文件复制完成后退出"""
+        self.cancel_event.set()
+        self.cancel_btn.config(state="disabled")
+        self.progress_label.config(text="正在取消…")
 
-    def copy_contents_with_progress(self, src, dst, data_path, total_files, current_file_count, subdir_vars=None):
-        """复制源目录内容到目标目录，并更新进度条"""
-        if not os.path.exists(src):
-            raise FileNotFoundError(f"源目录不存在: {src}")
+    def poll_progress(self):
+        """定时取出队列中的进度事件，汇总后只刷新一次界面"""
+        state = self.sync_state
+        finished = None
+        while True:
+            try:
+                event = self.progress_queue.get_nowait()
+            except queue.Empty:
+                break
+            if event[0] == "file":
+                state["files"] += 1
+                state["bytes"] += event[2]
+                state["current"] = event[1]
+            elif event[0] == "scanned":
+                state["total_files"], state["total_bytes"] = event[1], event[2]
+            elif event[0] == "snapshot":
+                state["snapshot"] = event[1]
+            elif event[0] == "verifying":
+                # 校验阶段重新计数，总数不变
+                state["files"], state["bytes"], state["current"] = 0, 0, ""
+                state["verifying"], state["start"] = True, time.monotonic()
+            else:
+                finished = event
 
-        os.makedirs(dst, exist_ok=True)
-        
-        for item in os.listdir(src):
-            src_path = os.path.join(src, item)
-            dst_path = os.path.join(dst, item)
+        if finished is None:
+            with self.sync_report.phase("ui"):
+                self.update_progress()
+            self.master.after(PROGRESS_INTERVAL_MS, self.poll_progress)
+        else:
+            self.finish_sync(finished)
 
-            # 检查子文件夹是否被选中
-            if subdir_vars and item in subdir_vars and not subdir_vars[item].get():
-                continue
+    def update_progress(self):
+        """按已处理字节数更新进度条、统计与剩余时间"""
+        state = self.sync_state
+        if state["total_bytes"]:
+            done, total = state["bytes"], state["total_bytes"]
+        else:
+            done, total = state["files"], state["total_files"]
+        if total:
+            self.progress_var.set(done * 100 / total)
+
+        if not self.cancel_event.is_set() and state["total_files"]:
+            elapsed = time.monotonic() - state["start"]
+            eta = "--:--"
+            if done and total:
+                remaining = int(elapsed * (total - done) / done)
+                eta = f"{remaining // 60:02d}:{remaining % 60:02d}"
+            self.progress_label.config(
+                text=("校验 " if state["verifying"] else "")
+                     + f"文件 {state['files']}/{state['total_files']}    "
+                     f"{sync_engine.format_size(state['bytes'])}/{sync_engine.format_size(state['total_bytes'])}    "
+                     f"剩余约 {eta}"
+            )
+        if state["current"]:
+            self.current_file_label.config(text=f"当前文件路径：{self.display_path(state['current'])}")
 
-            relative_path = os.path.relpath(src_path, data_path)  # 计算相对路径
-            
-            if os.path.isdir(src_path):
-                current_file_count = self.copy_contents_with_progress(
-                    src_path, dst_path, data_path, total_files, current_file_count, subdir_vars
+    def finish_sync(self, event):
+        """后台同步结束：关闭进度窗口，写入运行报告并提示结果"""
+        self.progress_window.destroy()
+        self.set_buttons_state("normal")
+        state = self.sync_state
+        action = "快照恢复" if state["restoring"] else "资源导入"
+
+        result = event[1] if event[0] == "done" else None
+        report = self.sync_report.finish(*(result.stats, result.verify) if result is not None else ())
+        try:
+            report_path = report.save(sync_report.log_dir_for("Data"))
+        except OSError as e:
+            report_path = None
+            print(f"[ERROR] 保存运行报告失败: {e}")
+
+        if result is not None:
+            stats, verify_result = result.stats, result.verify
+            summary = str(stats)
+            by_scheme = sync_engine.stats_by_scheme(self.sync_state["tasks"])
+            if len(by_scheme) > 1:
+                summary += "\n" + "\n".join(f"{name}: {scheme_stats}" for name, scheme_stats in by_scheme.items())
+            if result.resumed:
+                summary += f"\n续传：跳过上次已完成的 {result.resumed} 个文件"
+            if result.snapshot is not None:
+                summary += f"\n同步前快照：{result.snapshot.id}（可通过“回滚…”恢复）"
+            summary += "\n\n" + report.summary()
+            if report_path:
+                summary += f"\n报告：{report_path}"
+            if stats.errors:
+                failed = "\n".join(f"{self.display_path(path)}: {msg}" for path, msg in stats.errors[:10])
+                messagebox.showwarning("完成", f"{action}完成，但有文件复制失败！\n{summary}\n{failed}")
+            elif verify_result is not None and not verify_result.ok:
+                failed = "\n".join(
+                    f"{path}: {reason}" for _, _, path, reason in verify_result.mismatches[:10]
                 )
+                messagebox.showwarning("完成", f"{action}完成，但校验发现不一致的文件！\n{summary}\n{failed}")
             else:
-                shutil.copy2(src_path, dst_path)
-                current_file_count += 1
-                # self.update_progress(relative_path, total_files, current_file_count)
-                self.current_file_label.config(text=f"当前文件路径：{relative_path}")
-                self.master.update_idletasks()
-        
-        return current_file_count
+                messagebox.showinfo("完成", f"{action}完成！\n{summary}")
+        elif event[0] == "cancelled":
+            messagebox.showinfo(
+                "已取消",
+                f"同步已取消，已处理 {state['files']}/{state['total_files']} 个文件"
+                + ("" if state["restoring"] else "\n下次同步相同内容时将从中断处继续")
+            )
+        else:
+            messagebox.showerror("错误", f"操作失败: {event[1]}")
+
+    def display_path(self, path):
+        """进度与错误提示中显示的路径：单方案时相对Data路径，批量时显示完整路径"""
+        data_path = self.sync_state["data_path"]
+        if data_path:
+            try:
+                return os.path.relpath(path, data_path)
+            except ValueError:
+                pass  # Windows下不同盘符无法计算相对路径
+        return path
+
+    def toggle_watch(self):
+        """开始/停止监视：先完整同步一次，之后只同步 Data 中变化的文件"""
+        if self.watch_thread is not None:
+            self.watch_stop.set()
+            self.watch_btn.config(state="disabled", text="正在停止…")
+            return
+        tasks = self.build_current_tasks()
+        if not tasks:
+            messagebox.showwarning("提示", "请至少勾选一个同步路径")
+            return
+        self.watch_queue = queue.Queue()
+        self.watch_stop = threading.Event()
+        self.watch_thread = threading.Thread(
+            target=self.watch_worker,
+            args=(tasks, self.use_hash_var.get(), self.get_workers(), self.get_store(), self.get_delta()),
+            daemon=True
+        )
+        self.watch_thread.start()
+        for button in (self.sync_btn, self.preview_btn, self.batch_btn, self.rollback_btn):
+            button.config(state="disabled")
+        self.watch_btn.config(text="停止监视")
+        self.watch_label.config(text="监视中：正在进行首次同步…")
+        self.master.after(PROGRESS_INTERVAL_MS, self.poll_watch)
+
+    def watch_worker(self, tasks, use_hash, workers, store, delta):
+        """后台线程：监视直到 watch_stop 被设置，每批结果经队列交给界面线程"""
+        events = self.watch_queue
+        try:
+            sync_watch.watch(
+                tasks,
+                use_hash,
+                workers,
+                stop=self.watch_stop,
+                store=store,
+                delta=delta,
+                on_batch=lambda stats, changed, seconds, error: events.put(("batch", stats, changed, error))
+            )
+        except Exception as e:
+            events.put(("error", str(e)))
+        events.put(("stopped",))
 
-    def sync_libs_with_progress(self, src, dst, data_path, total_files, current_file_count, subdir_vars=None):
-        """智能同步libs目录，并更新进度条"""
-        for root, dirs, files in os.walk(src):
-            rel_path = os.path.relpath(root, src)
-            dst_root = os.path.join(dst, rel_path)
+    def poll_watch(self):
+        """取出监视线程的结果，在按钮下方显示最近一批的同步情况"""
+        stopped = False
+        while True:
+            try:
+                event = self.watch_queue.get_nowait()
+            except queue.Empty:
+                break
+            now = time.strftime("%H:%M:%S")
+            if event[0] == "batch":
+                _, stats, changed, error = event
+                scope = "整体同步" if changed is None else f"{changed} 处变化"
+                text = f"失败: {error}" if error else str(stats)
+                self.watch_label.config(text=f"监视中：{now} {scope}，{text}")
+            elif event[0] == "error":
+                messagebox.showerror("错误", f"监视失败: {event[1]}")
+            else:
+                stopped = True
+
+        if not stopped:
+            self.master.after(PROGRESS_INTERVAL_MS * 5, self.poll_watch)
+            return
+        self.watch_thread = None
+        for button in (self.sync_btn, self.preview_btn, self.batch_btn, self.rollback_btn):
+            button.config(state="normal")
+        self.watch_btn.config(state="normal", text="开始监视")
+        self.watch_label.config(text="")
+
+    def on_close(self):
+        """关闭窗口前停止监视并保存扫描缓存"""
+        if self.watch_thread is not None:
+            self.watch_stop.set()
+        try:
+            self.scan_cache.save()
+        except OSError as e:
+            print(f"[ERROR] 保存扫描缓存失败: {e}")
+        self.master.destroy()
+
+    def get_store(self):
+        """勾选了“去重对象库”时返回对象库，否则返回 None"""
+        if not self.store_var.get():
+            return None
+        if self.object_store is None:
+            self.object_store = object_store.open_store("Data")
+        return self.object_store
+
+    def get_delta(self):
+        """勾选了“大文件块级更新”时返回块级复制器，阈值取当前方案中的 delta_min_size"""
+        if not self.delta_var.get():
+            return None
+        if self.delta_copier is None:
+            self.delta_copier = delta_copy.open_copier("Data")
+        scheme = self.schemes.get(self.scheme_combo.get(), {})
+        self.delta_copier.min_size = sync_rules.parse_size(scheme.get("delta_min_size", delta_copy.DEFAULT_MIN_SIZE))
+        return self.delta_copier
+
+    def get_snapshots(self):
+        """快照目录，位置与保留数量取当前方案中的 snapshot_dir、snapshot_keep、snapshot_max_days"""
+        return snapshots.open_snapshots("Data", self.schemes.get(self.scheme_combo.get()))
+
+    def open_rollback_dialog(self):
+        """列出已有的快照，选择一个把AS工程中的目标目录恢复为快照中的样子"""
+        store = self.get_snapshots()
+        items = store.list()
+        if not items:
+            messagebox.showwarning("提示", "还没有快照，请勾选“同步前快照”后再导入")
+            return
+        dialog = tk.Toplevel(self.master)
+        dialog.title("回滚")
+        dialog.geometry("640x320")
+
+        ttk.Label(dialog, text="选择要恢复的快照（快照中的目标目录将恢复为导入前的样子）:").pack(anchor="w", padx=10, pady=5)
+        listbox = tk.Listbox(dialog, exportselection=False)
+        for snapshot in items:
+            listbox.insert(tk.END, str(snapshot))
+        listbox.selection_set(0)
+        listbox.pack(fill=tk.BOTH, expand=True, padx=10)
+
+        def confirm():
+            selected = listbox.curselection()
+            if not selected:
+                messagebox.showwarning("提示", "请选择一个快照", parent=dialog)
+                return
+            snapshot = items[selected[0]]
+            targets = "\n".join(entry["dst"] for entry in snapshot.entries)
+            if not messagebox.askyesno("确认", f"以下目录将恢复为快照 {snapshot.id}，之后的改动会被覆盖：\n{targets}",
+                                       parent=dialog):
+                return
+            dialog.destroy()
+            self.run_in_background(store.restore_tasks(snapshot), None, restoring=True)
 
-            # 创建目标目录
-            os.makedirs(dst_root, exist_ok=True)
+        ttk.Button(dialog, text="恢复", command=confirm).pack(pady=10)
 
-            for dir_name in dirs:
-                if subdir_vars and dir_name in subdir_vars and not subdir_vars[dir_name].get():
-                    continue  # 跳过未选中的子文件夹
+    def get_workers(self):
+        """读取线程数输入，非法值回退为默认值"""
+        try:
+            return max(1, int(self.workers_var.get()))
+        except (tk.TclError, ValueError):
+            return sync_engine.DEFAULT_WORKERS
 
-            # 同步文件
-            for file in files:
-                src_file = os.path.join(root, file)
-                dst_file = os.path.join(dst_root, file)
-                if os.path.exists(dst_file):
-                    shutil.copy2(src_file, dst_file)
-                    relative_path = os.path.relpath(src_file, data_path)
-                    current_file_count += 1
-                    # self.update_progress(relative_path, total_files, current_file_count)
-                    self.current_file_label.config(text=f"当前文件路径：{relative_path}")
-                    self.master.update_idletasks()
-
-        return current_file_count
-
-    def update_progress(self, file_path, total_files, current_file_count):
-        """更新进度条和当前文件路径"""
-        self.current_file_label.config(text=f"当前文件路径：{file_path}")
-        # progress = (current_file_count / total_files) * 100
-        # self.progress_var.set(progress)
-        # self.master.update_idletasks()
-
-    def clean_directory(self, path,subdir_vars):
-        """清空目录但保留目录结构"""
-        if os.path.exists(path):
-            for item in os.listdir(path):
-                # 检查子文件夹是否被选中
-                if subdir_vars and item in subdir_vars and not subdir_vars[item].get():
-                    continue
-                item_path = os.path.join(path, item)
-                if os.path.isfile(item_path):
-                    os.unlink(item_path)
-                else:
-                    shutil.rmtree(item_path)
-        else:
-            os.makedirs(path, exist_ok=True)
-        
     def copy_contents(self, src, dst):
         """复制源目录内容到目标目录"""
         if not os.path.exists(src):
@@ -435,37 +856,11 @@ class FileSyncApp:
                         # 添加isShow配置项，默认False
                         item["isShow"] = item.get("isShow", False)
                         item["var"] = tk.BooleanVar(value=item.get("default_value", True))
-                        item["subdir_vars"] = {}  # 新增子文件夹同步状态字典
+                        item["subdir_vars"] = {}  # 子文件夹同步状态：相对路径 -> 是否同步，只记录取消勾选的
                         self.path_config.append(item)
             else:
                 # 配置文件不存在时创建默认配置
-                default_config = [
-                    {
-                        "name": "assets",
-                        "src_rel": ["unityLibrary", "src", "main", "assets"],
-                        "dst_rel": ["app", "src", "main", "assets"],
-                        "mode": "default",
-                        "default_value": True,
-                        "isShow": True
-                    },
-                    {
-                        "name": "jniLibs",
-                        "src_rel": ["unityLibrary", "src", "main", "jniLibs"],
-                        "dst_rel": ["app", "src", "main", "jniLibs"],
-                        "mode": "default",
-                        "default_value": True,
-                        "isShow": False
-                    },
-                    {
-                        "name": "libs (智能同步)",
-                        "src_rel": ["unityLibrary", "libs"],
-                        "dst_rel": ["app", "libs", "main"],
-                        "mode": "libs",
-                        "default_value": True,
-                        "isShow": False
-                    }
-                    # 其他默认配置项...
-                ]
+                default_config = sync_engine.DEFAULT_PATH_CONFIG
                 with open(self.path_config_file, 'w', encoding='utf-8') as f:
                     json.dump(default_config, f, indent=2)
                 self.load_path_config()
@@ -478,34 +873,19 @@ class FileSyncApp:
         """切换子目录显示"""
         if config["var"].get() and config["isShow"]:
             self.load_subdirs(config)
-            config["subdir_frame"].pack(anchor="w", pady=5)
+            config["subdir_frame"].pack(anchor="w", fill=tk.X, pady=5)
         else:
             config["subdir_frame"].pack_forget()
 
     def load_subdirs(self, config):
-        """加载子目录，并显示为可选项"""
+        """在子文件夹面板中显示源目录的子文件夹；源目录未变时只刷新勾选状态"""
         data_path = self.data_entry.get()
         src_path = os.path.join(data_path, *config["src_rel"])
-        schemeConfig = self.schemes[self.scheme_combo.get()]
-
-        # 清空旧数据
-        for widget in config.get("subdir_frame", {}).winfo_children():
-            widget.destroy()
 
         if os.path.exists(src_path):
             try:
-                config["subdir_vars"] = {}   # 用于存储子文件夹的变量
-
-                for entry in os.scandir(src_path):
-                    if entry.is_dir():
-                        var = tk.BooleanVar(value=schemeConfig["subdir_selections"][config["name"]].get(entry.name, True))  # 使用保存的选中状态
-                        subdir_cb = ttk.Checkbutton(
-                            config["subdir_frame"], 
-                            text=entry.name, 
-                            variable=var
-                        )
-                        subdir_cb.pack(anchor="w", padx=10)
-                        config["subdir_vars"][entry.name] = var
+                # 目录未变化时直接使用扫描缓存中的子文件夹列表，下层在展开时才列出
+                config["subdir_browser"].set_root(src_path)
             except Exception as e:
                 error_msg = f"加载子目录失败: {str(e)}"
                 print(f"[ERROR] {error_msg}")  # 错误日志
@@ -0,0 +1,416 @@
+"""复制后端：reflink / 硬链接 / copy_file_range / 普通复制
+
+可在 path_config 的同步项或方案中通过 "copy_backend" 选择：
+    auto             依次尝试 reflink、copy_file_range（或 sendfile）、普通复制
+    reflink          写时复制克隆（Linux FICLONE，btrfs/XFS 等），不支持时回退普通复制
+    hardlink         硬链接，不占额外空间；目标与源共享同一份数据，不支持时回退 auto
+    copy_file_range  在内核中复制，不经过用户态缓冲，不支持时回退普通复制
+    copy             在用户态分块读写（每个线程复用 COPY_CHUNK_SIZE 的缓冲区）
+不支持的文件系统组合会被记住，之后同一组合直接跳过，不再反复尝试；
+只与个别文件有关的错误（EBADF、ETXTBSY）只让这个文件回退，不影响之后的文件。
+覆盖已有目标时都先写入同目录下的临时文件（目标名 + TMP_SUFFIX），完成后再原子地改名为目标，
+中途退出时已有的目标要么是旧文件、要么是完整的新文件；扫描时还不存在的小文件直接新建写入（见 copy_small），
+中途退出留下的不完整文件修改时间与源文件不同，下次同步会重新复制。
+除硬链接外，源文件与临时文件各只打开一次，各方式依次在同一对文件上尝试；元数据与 shutil.copy2 相同：
+访问/修改时间、权限与扩展属性（Linux，源文件有时才写入）在打开的文件上设置，BSD 文件标志（macOS 等）在改名后设置。
+
+不超过 SMALL_FILE_SIZE 的小文件（hardlink 除外）由 copy_small 复制：一次读入线程复用的缓冲区再写入各目标，
+不尝试内核复制，源文件只在打开后 fstat 一次（同时确认与扫描清单一致），元数据同样与 shutil.copy2 相同。
+"""
+import errno
+import os
+import stat
+import sys
+import threading
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+BACKENDS = ("auto", "reflink", "hardlink", "copy_file_range", "copy")
+DEFAULT_BACKEND = "auto"
+
+# Linux FICLONE ioctl 编号：_IOW(0x94, 9, int)
+FICLONE = 0x40049409
+# 内核复制每次调用的最大字节数
+KERNEL_CHUNK_SIZE = 64 * 1024 * 1024
+# 写入中的临时文件后缀，中断后残留的临时文件在下次同步时清理
+TMP_SUFFIX = ".automove-tmp"
+# 按小文件复制的大小上限，也是每个线程复用的读缓冲大小
+SMALL_FILE_SIZE = 64 * 1024
+# 用户态复制时每次读写的字节数
+COPY_CHUNK_SIZE = 1024 * 1024
+
+HAS_REFLINK = fcntl is not None and sys.platform.startswith("linux")
+HAS_COPY_FILE_RANGE = hasattr(os, "copy_file_range")
+HAS_SENDFILE = hasattr(os, "sendfile") and sys.platform.startswith("linux")
+
+# 出现这些错误说明当前文件系统组合不支持该方式，应回退而不是报错，并记住该组合
+_UNSUPPORTED_ERRNOS = {errno.EXDEV, errno.EOPNOTSUPP, errno.EINVAL, errno.ENOSYS, errno.ENOTTY}
+if hasattr(errno, "ENOTSUP"):
+    _UNSUPPORTED_ERRNOS.add(errno.ENOTSUP)
+# 只与单个文件有关的错误（文件正在被执行、个别文件不支持等）：该文件回退，不记住
+_FILE_FALLBACK_ERRNOS = {errno.EBADF, errno.ETXTBSY}
+# 硬链接额外可能遇到：文件系统不支持（FAT 等返回 EPERM）或链接数已满
+_LINK_UNSUPPORTED_ERRNOS = _UNSUPPORTED_ERRNOS | _FILE_FALLBACK_ERRNOS | {errno.EPERM, errno.EMLINK}
+
+# 已确认不支持的 (方式, 源设备号, 目标设备号)
+_unsupported = set()
+_lock = threading.Lock()
+
+_O_BINARY = getattr(os, "O_BINARY", 0)
+_CREATE_FLAGS = os.O_WRONLY | os.O_CREAT | os.O_EXCL | _O_BINARY
+
+
+def _read_umask():
+    """读取进程的 umask，无法读取时返回 None
+
+    不用 os.umask：它只能先改再改回，其他线程在这期间新建的文件权限会出错。
+    Linux 从 /proc/self/status 读取；Windows 上 umask 不影响新建文件（只有只读属性），视为 0。
+    """
+    if sys.platform == "win32":
+        return 0
+    try:
+        with open("/proc/self/status", 'r', encoding='ascii', errors='replace') as f:
+            for line in f:
+                if line.startswith("Umask:"):
+                    return int(line.split()[1], 8)
+    except (OSError, ValueError, IndexError):
+        pass
+    return None
+
+
+# 新建文件的权限为 0o666 去掉 umask，源文件权限与之相同时不再 chmod；umask 未知时总是 chmod
+_UMASK = _read_umask()
+_FD_UTIME = os.utime in os.supports_fd
+_HAS_READV = hasattr(os, "readv")
+_FD_CHMOD = os.chmod in os.supports_fd
+# 平台不支持在打开的文件上设置时间或权限时，关闭后还要按路径设置（Windows）
+_PATH_METADATA = not (_FD_UTIME and _FD_CHMOD)
+# 与 shutil.copy2 相同，只在提供 os.listxattr 的平台（Linux）上复制扩展属性
+_HAS_XATTR = hasattr(os, "listxattr")
+_HAS_CHFLAGS = hasattr(os, "chflags")
+# 与 shutil.copystat 相同：文件系统不支持、无权限的扩展属性与文件标志直接忽略
+_METADATA_IGNORED_ERRNOS = {errno.EPERM, errno.EOPNOTSUPP, errno.EINVAL}
+_METADATA_IGNORED_ERRNOS.update(getattr(errno, name) for name in ("ENOTSUP", "ENODATA") if hasattr(errno, name))
+_buffers = threading.local()
+
+
+def _reflink(fd_src, fd_dst):
+    fcntl.ioctl(fd_dst, FICLONE, fd_src)
+
+
+def _copy_file_range(fd_src, fd_dst):
+    copy = os.copy_file_range if HAS_COPY_FILE_RANGE else _sendfile_chunk
+    while copy(fd_src, fd_dst, KERNEL_CHUNK_SIZE) > 0:
+        pass
+
+
+def _sendfile_chunk(fd_src, fd_dst, count):
+    return os.sendfile(fd_dst, fd_src, None, count)
+
+
+_KERNEL_METHODS = {
+    "reflink": (HAS_REFLINK, _reflink),
+    "copy_file_range": (HAS_COPY_FILE_RANGE or HAS_SENDFILE, _copy_file_range),
+}
+
+_CHAINS = {
+    "auto": ("reflink", "copy_file_range", "copy"),
+    "reflink": ("reflink", "copy"),
+    "copy_file_range": ("copy_file_range", "copy"),
+    "copy": ("copy",),
+}
+
+
+def userspace_only(backend):
+    """该方式在当前平台上是否只能走普通复制（可与其他目标共用一次读取）"""
+    if backend == "copy":
+        return True
+    if backend == "auto":
+        return not any(available for available, _ in _KERNEL_METHODS.values())
+    return False
+
+
+def temp_path(path):
+    return path + TMP_SUFFIX
+
+
+def is_temp(path):
+    return path.endswith(TMP_SUFFIX)
+
+
+def replace_from_temp(tmp_path, path):
+    """把写好的临时文件原子地改名为目标（替换目录项，不会改动旧目标的数据）"""
+    os.replace(tmp_path, path)
+    # 临时文件与目标是同一文件的两个硬链接时 rename 什么也不做，需要手动删掉临时文件
+    if os.path.lexists(tmp_path):
+        os.unlink(tmp_path)
+
+
+def publish_temp(tmp_path, path):
+    """以硬链接把写好的临时文件发布为 path，返回是否发布；临时文件总会被删除
+
+    path 已存在（其他线程同时写入了相同内容）时保留已有的文件：改名替换会让已硬链接到旧文件的目标与 path 脱离。
+    文件系统不支持硬链接时退回为改名，这时也不会有文件硬链接到 path。
+    """
+    try:
+        os.link(tmp_path, path)
+        return True
+    except FileExistsError:
+        return False
+    except OSError as e:
+        if e.errno not in _LINK_UNSUPPORTED_ERRNOS:
+            raise
+        os.replace(tmp_path, path)
+        return True
+    finally:
+        remove_existing(tmp_path)
+
+
+def remove_existing(path):
+    """写入前先删除已有目标：它可能是与源、快照或对象库共享数据的硬链接，原地写入会改坏对方"""
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
+
+
+def _kernel_copy(method, fd_src, fd_dst, key):
+    """用内核方式复制，返回 False 表示当前文件系统组合或这个文件不支持（此时两个文件都回到开头、目标为空）"""
+    available, func = _KERNEL_METHODS[method]
+    key = (method,) + key
+    if not available or key in _unsupported:
+        return False
+    try:
+        func(fd_src, fd_dst)
+    except OSError as e:
+        if e.errno in _UNSUPPORTED_ERRNOS:
+            with _lock:
+                _unsupported.add(key)
+        elif e.errno not in _FILE_FALLBACK_ERRNOS:
+            raise
+        os.lseek(fd_src, 0, os.SEEK_SET)
+        os.lseek(fd_dst, 0, os.SEEK_SET)
+        os.ftruncate(fd_dst, 0)
+        return False
+    return True
+
+
+def _buffer(name, size):
+    """当前线程复用的缓冲区"""
+    buf = getattr(_buffers, name, None)
+    if buf is None:
+        buf = bytearray(size)
+        setattr(_buffers, name, buf)
+    return buf
+
+
+def _write_all(fd, data):
+    written = 0
+    while written < len(data):
+        written += os.write(fd, data[written:])
+
+
+def _userspace_copy(fd_src, fd_dst):
+    buf = _buffer("copy_buf", COPY_CHUNK_SIZE)
+    view = memoryview(buf)
+    with open(fd_src, 'rb', buffering=0, closefd=False) as fsrc:
+        while True:
+            n = fsrc.readinto(buf)
+            if not n:
+                break
+            _write_all(fd_dst, view[:n])
+
+
+def _chmod_mode(st_mode):
+    """需要设置的权限位；与新建文件的默认权限相同时返回 None，省去 chmod"""
+    mode = stat.S_IMODE(st_mode)
+    return None if _UMASK is not None and mode == 0o666 & ~_UMASK else mode
+
+
+def _read_xattrs(fd):
+    """源文件的扩展属性 [(名称, 值)]；没有扩展属性（绝大多数文件）或平台不支持时为空列表"""
+    if not _HAS_XATTR:
+        return []
+    try:
+        names = os.listxattr(fd)
+    except OSError as e:
+        if e.errno not in _METADATA_IGNORED_ERRNOS:
+            raise
+        return []
+    xattrs = []
+    for name in names:
+        try:
+            xattrs.append((name, os.getxattr(fd, name)))
+        except OSError as e:
+            if e.errno not in _METADATA_IGNORED_ERRNOS:
+                raise
+    return xattrs
+
+
+def _set_metadata(fd, times, mode, xattrs=()):
+    """在打开的文件上设置访问/修改时间、扩展属性与权限（mode 为 None 时不改）；平台不支持时由 _set_metadata_path 补上
+
+    与 shutil.copystat 相同，扩展属性在 chmod 之前写入（之后文件可能变为只读）。
+    """
+    for name, value in xattrs:
+        try:
+            os.setxattr(fd, name, value)
+        except OSError as e:
+            if e.errno not in _METADATA_IGNORED_ERRNOS:
+                raise
+    if mode is not None and _FD_CHMOD:
+        os.chmod(fd, mode)
+    # 修改时间最后设置：直接新建的目标中途退出时修改时间与源文件不同，下次同步会重新复制
+    if _FD_UTIME:
+        os.utime(fd, ns=times)
+
+
+def _set_metadata_path(path, times, mode):
+    """文件关闭后按路径设置 _set_metadata 在当前平台上无法设置的部分"""
+    if not _FD_UTIME:
+        os.utime(path, ns=times)
+    if mode is not None and not _FD_CHMOD:
+        os.chmod(path, mode)
+
+
+def _set_flags(path, flags):
+    """设置 BSD 文件标志（st_flags，macOS 等）；改名后才设置，带不可更改标志的临时文件无法改名"""
+    if not flags or not _HAS_CHFLAGS:
+        return
+    try:
+        os.chflags(path, flags)
+    except OSError as e:
+        if e.errno not in _METADATA_IGNORED_ERRNOS:
+            raise
+
+
+def _copy_data(src, dst, chain):
+    """源文件与新建的 dst 各打开一次，按 chain 依次尝试各方式并复制元数据，返回 (实际使用的方式, 源文件的 BSD 文件标志)"""
+    fd_src = os.open(src, os.O_RDONLY | _O_BINARY)
+    try:
+        st = os.fstat(fd_src)
+        fd_dst = _create_temp(dst)
+        try:
+            key = None
+            for method in chain:
+                if method == "copy":
+                    _userspace_copy(fd_src, fd_dst)
+                    break
+                if key is None:
+                    key = (st.st_dev, os.fstat(fd_dst).st_dev)
+                if _kernel_copy(method, fd_src, fd_dst, key):
+                    break
+            times, mode = (st.st_atime_ns, st.st_mtime_ns), _chmod_mode(st.st_mode)
+            _set_metadata(fd_dst, times, mode, _read_xattrs(fd_src))
+        finally:
+            os.close(fd_dst)
+        _set_metadata_path(dst, times, mode)
+    finally:
+        os.close(fd_src)
+    return method, getattr(st, "st_flags", 0)
+
+
+def copy_file(src, dst, backend=DEFAULT_BACKEND):
+    """按指定方式复制单个文件（先写临时文件再改名），返回实际使用的方式"""
+    if backend not in BACKENDS:
+        raise ValueError(f"未知的复制方式: {backend}")
+    tmp = temp_path(dst)
+    try:
+        used, flags = _copy_to(src, tmp, backend)
+        if used == "hardlink":
+            replace_from_temp(tmp, dst)
+        else:
+            os.replace(tmp, dst)
+    except BaseException:
+        remove_existing(tmp)
+        raise
+    _set_flags(dst, flags)
+    return used
+
+
+def _create_temp(path):
+    """新建临时文件；残留的同名临时文件可能是与源共享数据的硬链接，先删除而不是截断"""
+    try:
+        return os.open(path, _CREATE_FLAGS, 0o666)
+    except FileExistsError:
+        remove_existing(path)
+        return os.open(path, _CREATE_FLAGS, 0o666)
+
+
+def _create_new(path):
+    """直接新建目标文件，已存在时返回 None"""
+    try:
+        return os.open(path, _CREATE_FLAGS, 0o666)
+    except FileExistsError:
+        return None
+
+
+def _read_into(fd, buf):
+    if not _HAS_READV:  # Windows
+        with open(fd, 'rb', buffering=0, closefd=False) as f:
+            return f.readinto(buf)
+    return os.readv(fd, [buf])
+
+
+def copy_small(src, dst_paths, size, mtime_ns, new_paths=()):
+    """读取一次小文件写入所有目标，size、mtime_ns 为扫描清单中的源文件属性
+
+    已有的目标先写临时文件再改名；new_paths 中的目标扫描时还不存在，直接以 O_EXCL 新建写入，省去临时文件与改名
+    （中途退出时留下的文件大小或修改时间与源文件不同，下次同步会重新复制；此时已存在则仍走临时文件）。
+
+    源文件的大小或修改时间与清单不同（扫描后被改动）或超过 SMALL_FILE_SIZE 时不写入，返回 False，由调用方按普通方式复制；
+    返回 True 时各目标的大小与修改时间与清单一致。
+    """
+    fd_src = os.open(src, os.O_RDONLY | _O_BINARY)
+    try:
+        st = os.fstat(fd_src)
+        if st.st_size != size or st.st_mtime_ns != mtime_ns or size > SMALL_FILE_SIZE:
+            return False
+        # 多一个字节，用来发现 fstat 之后又变大的文件
+        buf = _buffer("small_buf", SMALL_FILE_SIZE + 1)
+        if _read_into(fd_src, buf) != size:
+            return False
+        xattrs = _read_xattrs(fd_src)
+    finally:
+        os.close(fd_src)
+    data = memoryview(buf)[:size]
+    mode = _chmod_mode(st.st_mode)
+    times = (st.st_atime_ns, st.st_mtime_ns)
+    flags = st.st_flags if _HAS_CHFLAGS else 0
+    for dst in dst_paths:
+        fd = _create_new(dst) if dst in new_paths else None
+        path = dst if fd is not None else temp_path(dst)
+        try:
+            if fd is None:
+                fd = _create_temp(path)
+            try:
+                _write_all(fd, data)
+                _set_metadata(fd, times, mode, xattrs)
+            finally:
+                os.close(fd)
+            if _PATH_METADATA:
+                _set_metadata_path(path, times, mode)
+            if path is not dst:
+                os.replace(path, dst)
+        except BaseException:
+            remove_existing(path)
+            raise
+        if flags:
+            _set_flags(dst, flags)
+    return True
+
+
+def _copy_to(src, dst, backend):
+    if backend == "hardlink":
+        remove_existing(dst)
+        try:
+            os.link(src, dst)
+            return "hardlink", 0
+        except OSError as e:
+            if e.errno not in _LINK_UNSUPPORTED_ERRNOS:
+                raise
+        backend = "auto"
+    return _copy_data(src, dst, _CHAINS[backend])
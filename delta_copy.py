@@ -0,0 +1,125 @@
+"""大文件块级增量更新：只重写与源文件不同的块
+
+目标文件已存在且不小于 min_size 的文件按固定大小的块与源文件比较，只把不同的块写回目标，
+最后截断到源文件大小并复制修改时间，结果与源文件逐字节一致。
+每个目标文件的块哈希缓存在 Data/block_cache.json 中：目标的大小、修改时间、ctime、inode 都未变时
+直接用缓存的哈希与源文件比较，不必再读取目标文件；缓存不可用时逐块读取目标直接比较内容。
+
+以下情况不做增量更新，由调用方整体复制：
+    目标的硬链接数大于 1（与对象库、快照或源文件共用数据，原地写入会改坏对方）
+    目标不是普通文件
+"""
+import hashlib
+import json
+import os
+import shutil
+import stat
+import threading
+
+import sync_engine
+
+BLOCK_SIZE = 1024 * 1024
+DEFAULT_MIN_SIZE = 64 * 1024 * 1024
+CACHE_VERSION = 1
+CACHE_FILE_NAME = "block_cache.json"
+
+
+def _block_hash(block):
+    return hashlib.blake2b(block, digest_size=16).hexdigest()
+
+
+class DeltaCopier:
+    """块级增量复制与目标块哈希缓存，可在复制线程之间共用"""
+
+    def __init__(self, path, min_size=DEFAULT_MIN_SIZE, block_size=BLOCK_SIZE):
+        self.path = path
+        self.min_size = min_size
+        self.block_size = block_size
+        # 目标规范路径 -> {"stat": [大小, mtime_ns, ctime_ns, inode], "block": 块大小, "blocks": [...]}
+        self.files = {}
+        self.blocks_total = 0
+        self.blocks_written = 0
+        self.dirty = False
+        self._lock = threading.Lock()
+
+    def load(self):
+        """读取块哈希缓存，不存在或版本不符时从空缓存开始"""
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get("version") == CACHE_VERSION:
+                self.files = data.get("files", {})
+        except (OSError, ValueError):
+            self.files = {}
+        return self
+
+    def save(self):
+        """有变化时写回缓存（先写临时文件再替换）"""
+        with self._lock:
+            if not self.dirty:
+                return
+            data = {"version": CACHE_VERSION, "files": dict(self.files)}
+            self.dirty = False
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, separators=(',', ':'))
+        os.replace(tmp_path, self.path)
+
+    @staticmethod
+    def _stat_key(st):
+        return [st.st_size, st.st_mtime_ns, st.st_ctime_ns, st.st_ino]
+
+    def applies(self, size, dst_path):
+        """该文件是否走增量更新：足够大、目标已存在、是普通文件且没有其他硬链接"""
+        if not self.min_size or size < self.min_size:
+            return False
+        try:
+            st = os.lstat(dst_path)
+        except OSError:
+            return False
+        return stat.S_ISREG(st.st_mode) and st.st_nlink == 1
+
+    def copy(self, src_path, dst_path):
+        """把目标更新为与源文件一致，只写入不同的块，返回写入的块数"""
+        key = sync_engine.path_key(dst_path)
+        cached = self.files.get(key)
+        dst_st = os.stat(dst_path)
+        old_hashes = None
+        if cached is not None and cached["block"] == self.block_size and cached["stat"] == self._stat_key(dst_st):
+            old_hashes = cached["blocks"]
+
+        hashes, written, size = [], 0, 0
+        with open(src_path, 'rb') as fsrc, open(dst_path, 'r+b') as fdst:
+            for index, block in enumerate(iter(lambda: fsrc.read(self.block_size), b'')):
+                block_hash = _block_hash(block)
+                hashes.append(block_hash)
+                offset = index * self.block_size
+                if old_hashes is not None:
+                    same = index < len(old_hashes) and old_hashes[index] == block_hash
+                else:
+                    fdst.seek(offset)
+                    same = fdst.read(len(block)) == block
+                if not same:
+                    fdst.seek(offset)
+                    fdst.write(block)
+                    written += 1
+                size = offset + len(block)
+            fdst.truncate(size)
+        shutil.copystat(src_path, dst_path)
+
+        st = os.stat(dst_path)
+        with self._lock:
+            self.files[key] = {
+                "stat": self._stat_key(st),
+                "block": self.block_size,
+                "blocks": hashes,
+            }
+            self.blocks_total += len(hashes)
+            self.blocks_written += written
+            self.dirty = True
+        return written
+
+
+def open_copier(config_dir, min_size=DEFAULT_MIN_SIZE):
+    """打开 config_dir 下的块哈希缓存（Data/block_cache.json）"""
+    return DeltaCopier(os.path.join(config_dir, CACHE_FILE_NAME), min_size).load()
@@ -0,0 +1,148 @@
+"""内容寻址对象库：相同内容的文件只保存一份，各方案的目标文件硬链接到库中的对象
+
+对象按内容哈希（与 sync_engine.file_digest 相同的 blake2b）保存在 objects/<前2位>/<哈希>，
+源文件路径 -> (大小, 修改时间, 哈希) 的索引保存在 objects/index.json，
+重新导出后只有新增或变化的文件需要重新计算哈希。
+多个渠道方案共用大部分资源时，磁盘占用与同步耗时只随不重复的内容增长。
+
+目标文件与对象是同一个文件（硬链接），判断目标是否最新只需比较 inode；
+对象库与AS工程不在同一文件系统（或文件系统不支持硬链接）时退回为从对象复制，只有这时才按大小+修改时间判断，
+同一文件系统上已有的普通副本总会改为硬链接到对象，否则对象会被当作无人引用而被 gc 删除。
+同步时写入目标前总会先删除旧文件（copy_backends.remove_existing），不会改坏库中的对象；
+但在AS工程里原地修改这些文件会同时改动对象，需要改动时请先关闭对象库再同步一次。
+"""
+import json
+import os
+import threading
+import uuid
+
+import copy_backends
+import sync_engine
+
+STORE_DIR_NAME = "objects"
+INDEX_FILE_NAME = "index.json"
+INDEX_VERSION = 1
+
+
+class ObjectStore:
+    """对象库与源文件哈希索引，可在复制线程之间共用"""
+
+    def __init__(self, root):
+        self.root = root
+        self.index = {}  # 源文件规范路径 -> [大小, mtime_ns, 哈希]
+        self.hashed = 0
+        self.stored = 0
+        self.dirty = False
+        self._copy_devices = set()  # 硬链接失败、退回为复制的目标设备号
+        self._lock = threading.Lock()
+
+    @property
+    def index_path(self):
+        return os.path.join(self.root, INDEX_FILE_NAME)
+
+    def load(self):
+        """读取哈希索引，不存在或版本不符时从空索引开始"""
+        try:
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get("version") == INDEX_VERSION:
+                self.index = data.get("files", {})
+        except (OSError, ValueError):
+            self.index = {}
+        return self
+
+    def save(self):
+        """有变化时写回索引（先写临时文件再替换）"""
+        with self._lock:
+            if not self.dirty:
+                return
+            data = {"version": INDEX_VERSION, "files": dict(self.index)}
+            self.dirty = False
+        os.makedirs(self.root, exist_ok=True)
+        tmp_path = self.index_path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, separators=(',', ':'))
+        os.replace(tmp_path, self.index_path)
+
+    def object_path(self, digest):
+        return os.path.join(self.root, digest[:2], digest)
+
+    def digest(self, path, entry):
+        """源文件的内容哈希：大小与修改时间未变时直接取索引"""
+        key = sync_engine.path_key(path)
+        cached = self.index.get(key)
+        if cached is not None and cached[0] == entry.size and cached[1] == entry.mtime_ns:
+            return cached[2]
+        digest = sync_engine.file_digest(path)
+        with self._lock:
+            self.index[key] = [entry.size, entry.mtime_ns, digest]
+            self.hashed += 1
+            self.dirty = True
+        return digest
+
+    def put(self, path, entry):
+        """确保源文件的内容已在库中，返回对象路径"""
+        obj = self.object_path(self.digest(path, entry))
+        if os.path.exists(obj):
+            return obj
+        os.makedirs(os.path.dirname(obj), exist_ok=True)
+        # 先写临时文件再以硬链接发布：中途退出不会留下不完整的对象；
+        # 多个线程同时放入相同内容时先发布的为准，不会替换已被目标硬链接的对象
+        tmp_path = f"{obj}.{uuid.uuid4().hex}.tmp"
+        try:
+            copy_backends.copy_file(path, tmp_path, "auto")
+        except BaseException:
+            copy_backends.remove_existing(tmp_path)
+            raise
+        if copy_backends.publish_temp(tmp_path, obj):
+            with self._lock:
+                self.stored += 1
+        return obj
+
+    def link(self, src_path, entry, dst_path, dst_entry):
+        """让目标文件指向源文件内容对应的对象，目标已是该对象时跳过，返回是否更新了目标"""
+        obj = self.put(src_path, entry)
+        if dst_entry is not None:
+            obj_st = os.stat(obj)
+            dst_st = os.stat(dst_path)
+            if (dst_st.st_ino, dst_st.st_dev) == (obj_st.st_ino, obj_st.st_dev):
+                return False
+            # 无法硬链接时目标是对象的副本，复制时保留了对象的修改时间
+            linkable = dst_st.st_dev == obj_st.st_dev and dst_st.st_dev not in self._copy_devices
+            if not linkable and dst_st.st_size == obj_st.st_size and dst_st.st_mtime_ns == obj_st.st_mtime_ns:
+                return False
+        if copy_backends.copy_file(obj, dst_path, "hardlink") != "hardlink":
+            with self._lock:
+                self._copy_devices.add(os.stat(dst_path).st_dev)
+        return True
+
+    def gc(self):
+        """删除没有任何目标引用（硬链接数为 1）的对象，返回 (删除个数, 释放字节数)"""
+        removed = freed = 0
+        for prefix in os.listdir(self.root) if os.path.isdir(self.root) else ():
+            folder = os.path.join(self.root, prefix)
+            if not os.path.isdir(folder):
+                continue
+            for name in os.listdir(folder):
+                path = os.path.join(folder, name)
+                st = os.stat(path)
+                if st.st_nlink == 1:
+                    os.remove(path)
+                    removed += 1
+                    freed += st.st_size
+        return removed, freed
+
+    def usage(self):
+        """库中对象个数与占用字节数"""
+        count = size = 0
+        for dirpath, _, filenames in os.walk(self.root):
+            for name in filenames:
+                if dirpath != self.root:
+                    count += 1
+                    size += os.path.getsize(os.path.join(dirpath, name))
+        return count, size
+
+
+def open_store(config_dir):
+    """打开 config_dir 下的对象库（Data/objects）"""
+    return ObjectStore(os.path.join(config_dir, STORE_DIR_NAME)).load()
@@ -0,0 +1,116 @@
+"""Data 目录扫描缓存：持久化目录列表与文件属性，按目录 mtime 判断是否需要重新扫描
+
+缓存文件默认保存在 Data/scan_cache.json（与 schemes.json 同目录）。
+每次使用缓存的目录只需一次 stat 验证其 mtime，未变化的目录不再 scandir。
+
+目录 mtime 与扫描时间相差不到 RACY_WINDOW_NS 时（与 git 索引的 racy 判断相同），之后在同一时间刻度内
+新增的条目不会再改变目录 mtime，这样的列表只记下供界面显示，不作为有效缓存，下次仍重新扫描。
+
+注意：目录 mtime 只在其中的条目增加、删除、改名时变化，原地改写的文件不会让它变化。
+因此子文件夹列表总是可以放心使用缓存；同步时是否沿用缓存中的文件大小/修改时间
+由方案的 "scan_cache" 选项决定（默认关闭），Data 由导出工具整体重新生成时再开启，
+或同时勾选“内容哈希比对”。
+
+同步后校验（sync_verify.py）算出的源文件内容哈希也记在这里，按文件大小与修改时间确认仍然有效。
+"""
+import json
+import os
+import threading
+import time
+
+import sync_engine
+
+CACHE_VERSION = 1
+CACHE_FILE_NAME = "scan_cache.json"
+# 目录 mtime 距扫描时间不足该值（纳秒）时列表不作为有效缓存：覆盖 FAT 的2秒精度与内核时间戳的刻度
+RACY_WINDOW_NS = 2_000_000_000
+
+
+class ScanCache:
+    """目录元数据缓存，可在界面线程与同步线程之间共用"""
+
+    def __init__(self, path):
+        self.path = path
+        # 目录规范路径 -> [目录mtime_ns, [子目录名], {文件名: [大小, mtime_ns, 权限位]}]；mtime_ns 为 None 表示未经确认
+        self.dirs = {}
+        self.digests = {}  # 文件规范路径 -> [大小, mtime_ns, 内容哈希]
+        self.hits = 0
+        self.misses = 0
+        self.dirty = False
+        self._lock = threading.Lock()
+
+    def load(self):
+        """读取缓存文件，不存在或版本不符时从空缓存开始"""
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get("version") == CACHE_VERSION:
+                self.dirs = data.get("dirs", {})
+                self.digests = data.get("digests", {})
+        except (OSError, ValueError):
+            self.dirs = {}
+            self.digests = {}
+        return self
+
+    def save(self):
+        """有变化时写回缓存文件（先写临时文件再替换，避免中途退出留下损坏的缓存）"""
+        with self._lock:
+            if not self.dirty:
+                return
+            # 界面线程可能同时在 list_dir：在锁内复制，序列化时字典不会再变；条目总是整体替换，浅复制即可
+            data = {"version": CACHE_VERSION, "dirs": dict(self.dirs), "digests": dict(self.digests)}
+            self.dirty = False
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, separators=(',', ':'))
+        os.replace(tmp_path, self.path)
+
+    def list_dir(self, path):
+        """返回 (子目录名列表, {文件名: (大小, mtime_ns, 权限位)})，目录 mtime 未变时直接取缓存"""
+        key = sync_engine.path_key(path)
+        mtime_ns = os.stat(path).st_mtime_ns
+        cached = self.dirs.get(key)
+        if cached is not None and cached[0] == mtime_ns:
+            self.hits += 1
+            return cached[1], cached[2]
+
+        self.misses += 1
+        dirs, files = sync_engine.list_dir(path)
+        if time.time_ns() - mtime_ns < RACY_WINDOW_NS:
+            # 目录刚改动过：之后同一时间刻度内的增删不会再改变它的 mtime，下次仍要重新扫描
+            mtime_ns = None
+        with self._lock:
+            if cached is not None:
+                # 已删除的子目录连同其下的缓存一起清掉
+                for name in set(cached[1]) - set(dirs):
+                    self._forget(os.path.join(key, name))
+            self.dirs[key] = [mtime_ns, dirs, files]
+            self.dirty = True
+        return dirs, files
+
+    def cached_subdirs(self, path):
+        """缓存中记录的子目录名列表，没有记录时返回 None；不访问磁盘，结果可能已过期，只用于界面显示"""
+        cached = self.dirs.get(sync_engine.path_key(path))
+        return cached[1] if cached is not None else None
+
+    def file_digest(self, path, size, mtime_ns):
+        """文件大小与修改时间与记录一致时返回记录的内容哈希，否则返回 None"""
+        cached = self.digests.get(sync_engine.path_key(path))
+        if cached is not None and cached[0] == size and cached[1] == mtime_ns:
+            return cached[2]
+        return None
+
+    def remember_digest(self, path, size, mtime_ns, digest):
+        with self._lock:
+            self.digests[sync_engine.path_key(path)] = [size, mtime_ns, digest]
+            self.dirty = True
+
+    def _forget(self, key):
+        prefix = key + os.sep
+        for cached_key in [k for k in self.dirs if k == key or k.startswith(prefix)]:
+            del self.dirs[cached_key]
+
+
+def open_cache(config_dir):
+    """打开 config_dir 下的扫描缓存"""
+    return ScanCache(os.path.join(config_dir, CACHE_FILE_NAME)).load()
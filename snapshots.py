@@ -0,0 +1,262 @@
+"""同步前快照：改动AS工程之前为各目标目录建立硬链接快照，导入出错时可立即回滚
+
+快照保存在 Data/snapshots/<快照ID>/（方案中的 "snapshot_dir" 可另行指定，应与AS工程在同一磁盘）：
+    snapshot.json   快照信息：创建时间与各目标目录 [{"name", "scheme", "dst", "dir", "files", "bytes"}]
+    0/、1/ ...      各目标目录的硬链接树
+快照中的文件与目标文件是同一份数据，建立快照只需为每个文件建一个硬链接，不复制内容；
+不在同一文件系统时退回 reflink，再不行才整体复制（速度与占用都与完整复制相同）。
+
+同步覆盖已有目标时都是先写临时文件再改名、新文件直接新建（见 copy_backends.py），删除也只删除目录项，
+快照中的文件不会被同步改动；块级更新（delta_copy.py）只原地写入没有其他硬链接的文件，同样不受影响。
+但在AS工程中原地编辑文件会同时改动快照中的同一份数据。
+
+目标目录与最近一个快照相比没有任何变化时不重复建立快照，直接沿用。
+恢复即把快照按 default 模式同步回目标目录：变化的文件改为硬链接回快照中的文件，多余的文件删除，
+只处理有差异的文件，耗时与一次增量同步相当。
+快照按数量（snapshot_keep）与天数（snapshot_max_days）自动清理。
+快照目录可能由用户指定，清理时只删除快照与建立过程中被中断、仍带有 INCOMPLETE_FILE_NAME 标记的快照目录，
+目录中的其他文件与文件夹不受影响。
+"""
+import json
+import os
+import re
+import shutil
+import time
+
+import copy_backends
+import sync_engine
+
+SNAPSHOT_DIR_NAME = "snapshots"
+META_FILE_NAME = "snapshot.json"
+# 建立快照时先写入、完成后删除的标记文件
+INCOMPLETE_FILE_NAME = ".incomplete"
+SNAPSHOT_ID_PATTERN = re.compile(r"\d{8}_\d{6}_\d{3}(_\d+)?$")
+DEFAULT_KEEP = 5
+# 0 表示不按天数清理
+DEFAULT_MAX_DAYS = 0
+
+
+class Snapshot:
+    """一个快照：id、目录、创建时间与其中的目标目录"""
+
+    def __init__(self, path, meta):
+        self.path = path
+        self.id = os.path.basename(path)
+        self.created = meta["created"]
+        self.entries = meta["entries"]
+        self.copied = meta.get("copied", 0)
+
+    @property
+    def files(self):
+        return sum(entry["files"] for entry in self.entries)
+
+    @property
+    def bytes(self):
+        return sum(entry["bytes"] for entry in self.entries)
+
+    def as_dict(self):
+        return {
+            "id": self.id,
+            "created": time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(self.created)),
+            "entries": [
+                {"name": entry["name"], "scheme": entry.get("scheme"), "dst": entry["dst"], "files": entry["files"]}
+                for entry in self.entries
+            ],
+            "files": self.files,
+            "bytes": self.bytes,
+        }
+
+    def __str__(self):
+        names = "，".join(entry["name"] for entry in self.entries)
+        return (f"{self.id}  {time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(self.created))}  {names}  "
+                f"{self.files} 个文件 {sync_engine.format_size(self.bytes)}")
+
+
+def snapshot_roots(tasks):
+    """需要建立快照的目标目录：去掉重复的与包含在其他目标目录中的，只保留已存在的"""
+    roots = {}
+    for task in tasks:
+        roots.setdefault(sync_engine.path_key(task["dst"]), task)
+    keys = sorted(roots)
+    result = []
+    for key in keys:
+        if any(other != key and key.startswith(other.rstrip(os.sep) + os.sep) for other in keys):
+            continue
+        if os.path.isdir(roots[key]["dst"]):
+            result.append(roots[key])
+    return result
+
+
+class SnapshotStore:
+    """快照目录，负责建立、列出、恢复与清理快照"""
+
+    def __init__(self, root, keep=DEFAULT_KEEP, max_days=DEFAULT_MAX_DAYS):
+        self.root = root
+        self.keep = keep
+        self.max_days = max_days
+
+    def list(self):
+        """所有快照，最新的在前"""
+        snapshots = []
+        for name in os.listdir(self.root) if os.path.isdir(self.root) else ():
+            path = os.path.join(self.root, name)
+            try:
+                with open(os.path.join(path, META_FILE_NAME), 'r', encoding='utf-8') as f:
+                    snapshots.append(Snapshot(path, json.load(f)))
+            except (OSError, ValueError, KeyError):
+                continue  # 建立过程中被中断的快照没有 snapshot.json，清理时删除
+        return sorted(snapshots, key=lambda snapshot: snapshot.created, reverse=True)
+
+    def get(self, snapshot_id="latest"):
+        """按 ID 取快照，"latest" 为最新的一个；不存在时抛出 KeyError"""
+        snapshots = self.list()
+        if snapshot_id == "latest" and snapshots:
+            return snapshots[0]
+        for snapshot in snapshots:
+            if snapshot.id == snapshot_id:
+                return snapshot
+        raise KeyError(f"快照不存在: {snapshot_id}")
+
+    def _new_path(self):
+        """新建快照目录并写入未完成标记，返回目录路径"""
+        now = time.time()
+        base = os.path.join(self.root, time.strftime("%Y%m%d_%H%M%S", time.localtime(now)) + f"_{int(now * 1000) % 1000:03d}")
+        os.makedirs(self.root, exist_ok=True)
+        path, n = base, 1
+        while True:
+            try:
+                os.mkdir(path)
+                break
+            except FileExistsError:
+                n += 1
+                path = f"{base}_{n}"
+        with open(os.path.join(path, INCOMPLETE_FILE_NAME), 'w', encoding='utf-8'):
+            pass
+        return path
+
+    @staticmethod
+    def _unchanged(snapshot, roots, manifests):
+        """目标目录与快照中的完全一致（同一组目录、同样的文件、大小与修改时间都相同）"""
+        if snapshot is None:
+            return False
+        by_dst = {sync_engine.path_key(entry["dst"]): entry for entry in snapshot.entries}
+        if set(by_dst) != {sync_engine.path_key(task["dst"]) for task in roots}:
+            return False
+        for task, manifest in zip(roots, manifests):
+            entry = by_dst[sync_engine.path_key(task["dst"])]
+            if entry["files"] != manifest.total_files:
+                return False
+            base = os.path.join(snapshot.path, entry["dir"])
+            for rel, file_entry in manifest.files.items():
+                try:
+                    st = os.stat(os.path.join(base, rel))
+                except OSError:
+                    return False
+                if st.st_size != file_entry.size or st.st_mtime_ns != file_entry.mtime_ns:
+                    return False
+        return True
+
+    def take(self, tasks, cancel=None):
+        """为同步项的目标目录建立快照并清理过旧的快照，返回 Snapshot；没有已存在的目标目录时返回 None"""
+        roots = snapshot_roots(tasks)
+        if not roots:
+            return None
+        manifests = []
+        for task in roots:
+            manifest = sync_engine.scan_tree(task["dst"])
+            for rel in [rel for rel in manifest.files if copy_backends.is_temp(rel)]:
+                manifest.total_bytes -= manifest.files.pop(rel).size
+            manifests.append(manifest)
+        latest = next(iter(self.list()), None)
+        if self._unchanged(latest, roots, manifests):
+            return latest
+
+        path = self._new_path()
+        entries, copied = [], 0
+        try:
+            for index, (task, manifest) in enumerate(zip(roots, manifests)):
+                base = os.path.join(path, str(index))
+                os.makedirs(base)
+                for rel in sorted(manifest.dirs):
+                    os.makedirs(os.path.join(base, rel), exist_ok=True)
+                for rel in manifest.files:
+                    sync_engine.check_cancel(cancel)
+                    src, dst = os.path.join(task["dst"], rel), os.path.join(base, rel)
+                    try:
+                        os.link(src, dst)
+                    except OSError:
+                        # 跨磁盘或文件系统不支持硬链接：退回 reflink / 复制
+                        if copy_backends.copy_file(src, dst, "hardlink") != "hardlink":
+                            copied += 1
+                entries.append({
+                    "name": task["name"],
+                    "scheme": task.get("scheme"),
+                    "dst": task["dst"],
+                    "dir": str(index),
+                    "files": manifest.total_files,
+                    "bytes": manifest.total_bytes,
+                })
+            # snapshot.json 最后写入：没有它的目录视为未完成的快照
+            meta = {"created": time.time(), "entries": entries, "copied": copied}
+            with open(os.path.join(path, META_FILE_NAME), 'w', encoding='utf-8') as f:
+                json.dump(meta, f, ensure_ascii=False, indent=2)
+            os.remove(os.path.join(path, INCOMPLETE_FILE_NAME))
+        except BaseException:
+            shutil.rmtree(path, ignore_errors=True)
+            raise
+        self.prune()
+        return Snapshot(path, meta)
+
+    def restore_tasks(self, snapshot, schemes=None):
+        """把快照恢复到原目标目录的同步项；schemes 不为空时只恢复这些方案的目标目录"""
+        return [
+            {
+                "name": entry["name"],
+                "scheme": entry.get("scheme"),
+                "src": os.path.join(snapshot.path, entry["dir"]),
+                "dst": entry["dst"],
+                "mode": "default",
+                "subdir_vars": {},
+                "copy_backend": "hardlink",
+            }
+            for entry in snapshot.entries
+            if not schemes or entry.get("scheme") in schemes
+        ]
+
+    def restore(self, snapshot, schemes=None, workers=sync_engine.DEFAULT_WORKERS, progress=None, cancel=None):
+        """把目标目录恢复为快照中的样子，返回 SyncStats"""
+        tasks = self.restore_tasks(snapshot, schemes)
+        if not tasks:
+            raise KeyError(f"快照 {snapshot.id} 中没有指定方案的目标目录")
+        return sync_engine.run_sync(tasks, workers=workers, progress=progress, cancel=cancel)
+
+    def remove(self, snapshot_id):
+        shutil.rmtree(os.path.join(self.root, snapshot_id))
+
+    def prune(self):
+        """按数量与天数清理快照，同时删除未完成的快照，返回删除的快照 ID 列表"""
+        snapshots = self.list()
+        listed = {snapshot.id for snapshot in snapshots}
+        removed = []
+        for index, snapshot in enumerate(snapshots):
+            too_many = self.keep and index >= self.keep
+            too_old = self.max_days and time.time() - snapshot.created > self.max_days * 86400
+            # 最新的快照总是保留
+            if index and (too_many or too_old):
+                removed.append(snapshot.id)
+        for name in os.listdir(self.root) if os.path.isdir(self.root) else ():
+            path = os.path.join(self.root, name)
+            if (name not in listed and SNAPSHOT_ID_PATTERN.match(name)
+                    and os.path.isfile(os.path.join(path, INCOMPLETE_FILE_NAME))):
+                removed.append(name)
+        for name in removed:
+            shutil.rmtree(os.path.join(self.root, name), ignore_errors=True)
+        return removed
+
+
+def open_snapshots(config_dir, scheme=None):
+    """打开快照目录：默认 Data/snapshots，方案中的 snapshot_dir、snapshot_keep、snapshot_max_days 可覆盖"""
+    scheme = scheme or {}
+    root = scheme.get("snapshot_dir") or os.path.join(config_dir, SNAPSHOT_DIR_NAME)
+    return SnapshotStore(root, scheme.get("snapshot_keep", DEFAULT_KEEP),
+                         scheme.get("snapshot_max_days", DEFAULT_MAX_DAYS))
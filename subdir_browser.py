@@ -0,0 +1,221 @@
+"""子文件夹选择器：基于 ttk.Treeview 按需加载的子文件夹树
+
+选择状态保存在普通字典 selection 中（相对于源目录、以 / 分隔的路径 -> 是否同步），
+不为每个文件夹创建 Tk 变量；没有记录的文件夹默认同步，取消勾选的文件夹连同其下所有内容都不同步。
+字典可直接作为同步项的 subdir_vars 与方案中的 subdir_selections 保存（见 sync_rules.RuleSet）。
+
+为了让上万个子文件夹也能快速打开：
+    面板显示时才列出第一层，每层只插入前 PAGE_SIZE 个，其余放在末尾的“显示更多”条目后，点击时再插入下一页，
+    Treeview 中的条目数只随用户实际查看的数量增长
+    下一层在展开时才列出（同样分页）；扫描缓存中已知没有子文件夹的条目不显示展开标记
+    切换方案只替换选择字典并刷新勾选标记，不重新列出目录
+过滤框按名称（不区分大小写）筛选第一层，“全选”/“全不选”作用于当前筛选出的文件夹。
+"""
+import os
+import tkinter as tk
+from tkinter import ttk
+
+CHECKED = "☑"
+UNCHECKED = "☐"
+# 每层一次插入的条目数，其余在“显示更多”条目后
+PAGE_SIZE = 500
+FILTER_DELAY_MS = 200
+# 尚未展开的条目下的占位子项
+_PLACEHOLDER = "//placeholder"
+# 每层末尾“显示更多”条目
+_MORE = "//more"
+
+
+class SubdirBrowser:
+    """一个同步项的子文件夹选择面板，frame 由调用方摆放"""
+
+    def __init__(self, parent, cache, selection=None, height=8):
+        self.cache = cache  # scan_cache.ScanCache，列目录与判断是否有子文件夹
+        self.selection = selection if selection is not None else {}
+        self.root = None
+        self.names = []  # 第一层子文件夹名称
+        self._pending = {}  # 上级条目（第一层为 ""）-> 尚未插入的下层路径，倒序
+        self._filter_job = None
+
+        self.frame = ttk.Frame(parent)
+        bar = ttk.Frame(self.frame)
+        bar.pack(fill=tk.X)
+        ttk.Label(bar, text="过滤:").pack(side=tk.LEFT)
+        self.filter_var = tk.StringVar()
+        self.filter_var.trace_add("write", lambda *_: self._schedule_filter())
+        ttk.Entry(bar, textvariable=self.filter_var, width=16).pack(side=tk.LEFT, padx=2)
+        ttk.Button(bar, text="全选", width=5, command=lambda: self.select_visible(True)).pack(side=tk.LEFT, padx=2)
+        ttk.Button(bar, text="全不选", width=6, command=lambda: self.select_visible(False)).pack(side=tk.LEFT, padx=2)
+
+        body = ttk.Frame(self.frame)
+        body.pack(fill=tk.BOTH, expand=True)
+        self.tree = ttk.Treeview(body, height=height, columns=("check",), selectmode="browse")
+        self.tree.heading("#0", text="子文件夹名称")
+        self.tree.heading("check", text="同步")
+        self.tree.column("#0", width=220, anchor="w")
+        self.tree.column("check", width=40, anchor="center", stretch=False)
+        self.tree.tag_configure("inherited", foreground="gray")
+        scroll = ttk.Scrollbar(body, orient="vertical", command=self.tree.yview)
+        self.tree.configure(yscrollcommand=scroll.set)
+        scroll.pack(side="right", fill="y")
+        self.tree.pack(side="left", fill="both", expand=True)
+        self.tree.bind("<<TreeviewOpen>>", self._on_open)
+        self.tree.bind("<Button-1>", self._on_click)
+        self.tree.bind("<space>", self._on_space)
+
+        self.status = ttk.Label(self.frame, text="")
+        self.status.pack(anchor="w")
+
+    # 选择状态
+
+    def is_selected(self, rel):
+        """该文件夹及其所有上级都未被取消勾选"""
+        parts = rel.split("/")
+        return all(self.selection.get("/".join(parts[:i]), True) for i in range(1, len(parts) + 1))
+
+    def set_selection(self, selection):
+        """换成另一份选择（切换方案），保持字典对象不变，只刷新勾选标记"""
+        self.selection.clear()
+        self.selection.update(selection)
+        self.refresh()
+
+    def _set(self, rel, value):
+        # 默认即为同步，勾选时删掉记录，字典中只留取消勾选的文件夹
+        if value:
+            self.selection.pop(rel, None)
+        else:
+            self.selection[rel] = False
+
+    def toggle(self, rel):
+        self._set(rel, not self.selection.get(rel, True))
+        self.refresh(rel)
+
+    def select_visible(self, value):
+        """全选/全不选当前筛选出的第一层文件夹；未筛选时全选会清除所有取消勾选的记录"""
+        if value and not self.filter_var.get():
+            self.selection.clear()
+        else:
+            for name in self._filtered():
+                self._set(name, value)
+        self.refresh()
+
+    # 树的加载与显示
+
+    def set_root(self, path):
+        """显示 path 下的子文件夹；与当前显示的目录相同时只刷新勾选标记"""
+        if path == self.root:
+            self.refresh()
+            return
+        self.root = path
+        try:
+            dirs, _ = self.cache.list_dir(path)
+        except OSError as e:
+            self.names = []
+            self._rebuild()
+            self.status.config(text=f"无法列出子文件夹: {e}")
+            raise
+        self.names = sorted(dirs, key=str.lower)
+        self._rebuild()
+
+    def _filtered(self):
+        """符合过滤条件的第一层文件夹（包括尚未插入树中的）"""
+        text = self.filter_var.get().lower()
+        return [name for name in self.names if text in name.lower()] if text else self.names
+
+    def _rebuild(self):
+        """按过滤条件重新插入第一层，已展开的下层随之收起（选择状态不受影响）"""
+        self.tree.delete(*self.tree.get_children(""))
+        self._pending = {"": list(reversed(self._filtered()))}
+        self._insert_page("")
+        self._update_status()
+
+    def _insert_page(self, parent):
+        """在 parent 下插入下一页，还有剩余时在末尾放“显示更多”条目"""
+        more = parent + _MORE
+        if self.tree.exists(more):
+            self.tree.delete(more)
+        pending = self._pending.get(parent, [])
+        for _ in range(min(PAGE_SIZE, len(pending))):
+            self._insert(parent, pending.pop())
+        if pending:
+            self.tree.insert(parent, tk.END, iid=more, text=f"显示更多（还有 {len(pending)} 个）…")
+        else:
+            self._pending.pop(parent, None)
+
+    def _insert(self, parent, rel):
+        name = rel.rsplit("/", 1)[-1]
+        self.tree.insert(parent, tk.END, iid=rel, text=name, values=(self._mark(rel),), tags=self._tags(rel))
+        # 扫描缓存中记录过的目录可以直接知道有没有下一层，其余先放一个占位子项
+        known = self.cache.cached_subdirs(os.path.join(self.root, *rel.split("/")))
+        if known is None or known:
+            self.tree.insert(rel, tk.END, iid=rel + _PLACEHOLDER, text="…")
+
+    def _on_open(self, event):
+        rel = self.tree.focus()
+        if not self.tree.exists(rel + _PLACEHOLDER):
+            return
+        self.tree.delete(rel + _PLACEHOLDER)
+        try:
+            dirs, _ = self.cache.list_dir(os.path.join(self.root, *rel.split("/")))
+        except OSError as e:
+            self.status.config(text=f"无法列出子文件夹: {e}")
+            return
+        self._pending[rel] = [f"{rel}/{name}" for name in sorted(dirs, key=str.lower, reverse=True)]
+        self._insert_page(rel)
+
+    def _on_click(self, event):
+        row = self.tree.identify_row(event.y)
+        if row.endswith(_MORE):
+            return self._activate(row)
+        if self.tree.identify_region(event.x, event.y) != "cell" or self.tree.identify_column(event.x) != "#1":
+            return None
+        return self._activate(self.tree.identify_row(event.y))
+
+    def _on_space(self, event):
+        return self._activate(self.tree.focus())
+
+    def _activate(self, rel):
+        """切换勾选；“显示更多”条目插入下一页"""
+        if rel.endswith(_MORE):
+            self._insert_page(rel[:-len(_MORE)])
+        elif rel and not rel.endswith(_PLACEHOLDER):
+            self.toggle(rel)
+        return "break"
+
+    def _mark(self, rel):
+        return CHECKED if self.is_selected(rel) else UNCHECKED
+
+    def _tags(self, rel):
+        # 自身勾选但上级被取消勾选：显示为灰色的未勾选
+        return ("inherited",) if self.selection.get(rel, True) and not self.is_selected(rel) else ()
+
+    def refresh(self, rel=""):
+        """刷新 rel（为空时为全部）及其已加载的下层的勾选标记"""
+        stack = [rel] if rel else list(self.tree.get_children(""))
+        while stack:
+            item = stack.pop()
+            if item.endswith(_PLACEHOLDER) or item.endswith(_MORE):
+                continue
+            self.tree.item(item, values=(self._mark(item),), tags=self._tags(item))
+            stack.extend(self.tree.get_children(item))
+        self._update_status()
+
+    def _update_status(self):
+        if self.root is None:
+            return
+        unselected = sum(1 for name in self.names if self.selection.get(name, True) is False)
+        nested = sum(1 for rel, value in self.selection.items() if not value and "/" in rel)
+        text = f"共 {len(self.names)} 个子文件夹，未选 {unselected} 个"
+        if nested:
+            text += f"，另有 {nested} 个下层文件夹未选"
+        self.status.config(text=text)
+
+    def _schedule_filter(self):
+        if self._filter_job is not None:
+            self.tree.after_cancel(self._filter_job)
+        self._filter_job = self.tree.after(FILTER_DELAY_MS, self._apply_filter)
+
+    def _apply_filter(self):
+        self._filter_job = None
+        if self.root is not None:
+            self._rebuild()
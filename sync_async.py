@@ -0,0 +1,307 @@
+"""asyncio 接口：供构建系统等 asyncio 服务嵌入调用，同步在线程池中执行，不阻塞事件循环
+
+    service = sync_async.SyncService(max_jobs=2, log_dir="Data/logs")
+    job = service.submit(tasks, use_hash=True, verify="hash")   # 在事件循环中调用，立即返回任务句柄
+    async for event in job.events():                            # 可选：接收进度事件
+        print(event)
+    result = await job                                          # sync_job.JobResult；被取消时抛出 SyncCancelled
+    job.cancel()                                                # 请求取消，在途的文件写完后停止
+    plan = await service.plan(tasks)                           # 只生成同步计划（sync_plan.SyncPlan），不改动磁盘
+    await service.close()
+
+tasks 的格式与 sync_engine.run_sync 相同，可由 sync_engine.build_tasks(path_config, scheme) 生成；
+submit 的其余关键字参数与 sync_job.run_job 相同（emit、cancel、report 由本模块提供）。
+
+每个任务在线程池中执行 sync_job.run_job（复制与校验再由 workers 个线程并行），事件循环只负责调度与转发事件：
+    同时执行的任务不超过 max_jobs 个，其余排队；目标目录与执行中或排在前面的任务重叠时等它们结束
+    进度按 EVENT_INTERVAL 合并后才交给事件循环，几万个文件也只产生少量事件
+    job.cancel() 或事件循环关闭时设置取消标志，线程在途的文件写完后结束
+同一个同步日志（sync_journal.SyncJournal）不能同时用于多个任务；扫描缓存、对象库与块级复制器可以共用。
+兼容 Python 3.8。
+
+事件为字典，"job" 为任务 ID，"type" 为：
+    queued      排队等待
+    started     开始执行
+    snapshot    同步前快照已建立，"id" 为快照 ID
+    scanned     扫描完成，"files"、"bytes" 为总量
+    progress    "phase" 为 sync 或 verify，"files"、"bytes" 为该阶段已处理的数量，"current" 为最近处理的源文件
+    verifying   开始同步后校验，已处理数量重新计数
+    done        完成，"result" 为 JobResult.as_dict()
+    cancelled   已取消
+    error       出错，"error" 为错误信息
+done、cancelled、error 之后不再有事件。
+"""
+import asyncio
+import functools
+import itertools
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import sync_engine
+import sync_job
+import sync_plan
+import sync_report
+
+DEFAULT_MAX_JOBS = 2
+# 进度事件的最短间隔（秒）
+EVENT_INTERVAL = 0.1
+FINAL_EVENTS = ("done", "cancelled", "error")
+
+_job_ids = itertools.count(1)
+
+
+class SyncJob:
+    """已提交的同步任务：await 得到 sync_job.JobResult，events() 接收事件，cancel() 取消"""
+
+    def __init__(self, tasks, options, on_event=None):
+        self.id = next(_job_ids)
+        self.tasks = tasks
+        self.options = options
+        self.on_event = on_event  # 每个事件在事件循环线程中调用一次
+        self.state = "queued"  # queued/running/done/cancelled/error
+        self.progress = {"phase": None, "files": 0, "bytes": 0, "total_files": 0, "total_bytes": 0, "current": ""}
+        # 报告文件名带上任务 ID，并行任务共用 log_dir 时各自保存
+        self.report = sync_report.RunReport(label=f"job{self.id}")
+        self.report_path = None
+        self.final = None  # 最后一个事件（done/cancelled/error）
+        self.cancel_event = threading.Event()
+        self._loop = None
+        self._task = None
+        self._subscribers = []
+
+    def __await__(self):
+        # 等待方自己被取消时不影响任务，取消任务用 cancel()
+        return asyncio.shield(self._task).__await__()
+
+    def done(self):
+        return self.final is not None
+
+    def cancel(self):
+        """请求取消，可在任意线程调用；排队中的任务直接结束"""
+        self.cancel_event.set()
+        try:
+            self._loop.call_soon_threadsafe(self._cancel_queued)
+        except RuntimeError:
+            pass  # 事件循环已关闭
+
+    def _cancel_queued(self):
+        if self.state == "queued":
+            self._task.cancel()
+
+    async def events(self):
+        """异步迭代之后的事件直到 done/cancelled/error；只收到订阅之后的事件，当前进度见 progress"""
+        if self.final is not None:
+            yield self.final
+            return
+        queue = asyncio.Queue()
+        self._subscribers.append(queue)
+        try:
+            while True:
+                event = await queue.get()
+                yield event
+                if event["type"] in FINAL_EVENTS:
+                    return
+        finally:
+            self._subscribers.remove(queue)
+
+    def _publish(self, event):
+        """在事件循环线程中分发一个事件"""
+        event = dict(event, job=self.id)
+        kind = event["type"]
+        if kind == "scanned":
+            self.progress["total_files"], self.progress["total_bytes"] = event["files"], event["bytes"]
+        elif kind == "progress":
+            self.progress.update(phase=event["phase"], files=event["files"], bytes=event["bytes"],
+                                 current=event["current"])
+        elif kind in FINAL_EVENTS:
+            self.state = kind
+            self.final = event
+        for queue in self._subscribers:
+            queue.put_nowait(event)
+        if self.on_event is not None:
+            self.on_event(event)
+
+
+class _Emitter:
+    """在执行任务的线程中接收 sync_job 的事件，合并进度后交给事件循环"""
+
+    def __init__(self, job, loop):
+        self.job = job
+        self.loop = loop
+        self.phase = "sync"
+        self.files = 0
+        self.bytes = 0
+        self.current = ""
+        self.last = 0.0
+        self.sent = None
+
+    def __call__(self, event):
+        kind = event[0]
+        if kind == "file":
+            self.files += 1
+            self.bytes += event[2]
+            self.current = event[1]
+            now = time.monotonic()
+            if now - self.last >= EVENT_INTERVAL:
+                self.flush(now)
+            return
+        self.flush()
+        if kind == "scanned":
+            self.send({"type": "scanned", "files": event[1], "bytes": event[2]})
+        elif kind == "snapshot":
+            self.send({"type": "snapshot", "id": event[1].id})
+        elif kind == "verifying":
+            self.phase, self.files, self.bytes, self.current = "verify", 0, 0, ""
+            self.send({"type": "verifying"})
+
+    def flush(self, now=None):
+        self.last = now or time.monotonic()
+        state = (self.phase, self.files)
+        if self.files and state != self.sent:
+            self.sent = state
+            self.send({"type": "progress", "phase": self.phase, "files": self.files, "bytes": self.bytes,
+                       "current": self.current})
+
+    def send(self, event):
+        try:
+            self.loop.call_soon_threadsafe(self.job._publish, event)
+        except RuntimeError:
+            pass  # 事件循环已关闭
+
+
+def _retrieve_exception(future):
+    # 没有人 await 的任务出错或被取消时不打印 “exception was never retrieved”
+    if not future.cancelled():
+        future.exception()
+
+
+class SyncService:
+    """在一个事件循环中调度多个同步任务；log_dir 不为 None 时每个任务的运行报告保存到该目录（如 Data/logs）"""
+
+    def __init__(self, max_jobs=DEFAULT_MAX_JOBS, log_dir=None, executor=None):
+        self.max_jobs = max(1, max_jobs)
+        self.log_dir = log_dir
+        self.jobs = {}  # 未结束的任务：ID -> SyncJob
+        self._executor = executor or ThreadPoolExecutor(max_workers=self.max_jobs,
+                                                        thread_name_prefix="automove-job")
+        self._own_executor = executor is None
+        self._queued = []
+        self._running = []
+        self._condition = None
+
+    def submit(self, tasks, on_event=None, **options):
+        """提交同步任务并立即返回 SyncJob；须在事件循环中调用"""
+        loop = asyncio.get_running_loop()
+        if self._condition is None:
+            # Python 3.8 的 Condition 在创建时绑定事件循环，放到第一次提交时创建
+            self._condition = asyncio.Condition()
+        job = SyncJob(tasks, options, on_event)
+        job._loop = loop
+        self.jobs[job.id] = job
+        self._queued.append(job)
+        job._task = loop.create_task(self._run(job))
+        job._task.add_done_callback(_retrieve_exception)
+        return job
+
+    async def plan(self, tasks, use_hash=False, cache=None):
+        """扫描并生成同步计划（不改动磁盘），返回 sync_plan.SyncPlan，确认后可 submit(plan.tasks, plan=plan)"""
+        loop = asyncio.get_running_loop()
+        build = functools.partial(sync_plan.build_plan, tasks, use_hash, cache, log_dir=self.log_dir)
+        plan = await loop.run_in_executor(self._executor, build)
+        if cache is not None:
+            await loop.run_in_executor(self._executor, cache.save)
+        return plan
+
+    async def close(self, cancel=False):
+        """等待（cancel 为 True 时先取消）所有未结束的任务，再关闭自己创建的线程池"""
+        jobs = list(self.jobs.values())
+        if cancel:
+            for job in jobs:
+                job.cancel()
+        if jobs:
+            await asyncio.wait([job._task for job in jobs])
+        if self._own_executor:
+            self._executor.shutdown(wait=False)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close(cancel=exc[0] is not None)
+
+    def _can_start(self, job):
+        if job.cancel_event.is_set():
+            return True  # 直接结束
+        if len(self._running) >= self.max_jobs:
+            return False
+        keys = [sync_engine.path_key(task["dst"]) for task in job.tasks]
+        ahead = self._queued[:self._queued.index(job)]
+        for other in self._running + ahead:
+            for task in other.tasks:
+                other_key = sync_engine.path_key(task["dst"])
+                if any(sync_engine.paths_overlap(key, other_key) for key in keys):
+                    return False
+        return True
+
+    async def _run(self, job):
+        loop = asyncio.get_running_loop()
+        interrupted = False
+        job._publish({"type": "queued"})
+        try:
+            async with self._condition:
+                try:
+                    await self._condition.wait_for(lambda: self._can_start(job))
+                finally:
+                    self._queued.remove(job)
+                    self._condition.notify_all()
+                sync_engine.check_cancel(job.cancel_event)
+                self._running.append(job)
+            job.state = "running"
+            job._publish({"type": "started"})
+            future = loop.run_in_executor(self._executor, self._execute, job, _Emitter(job, loop))
+            try:
+                result = await asyncio.shield(future)
+            except asyncio.CancelledError:
+                # 事件循环正在关闭：让线程在途的文件写完后再退出
+                interrupted = True
+                job.cancel_event.set()
+                await asyncio.wait([future])
+                _retrieve_exception(future)
+                raise
+            finally:
+                async with self._condition:
+                    self._running.remove(job)
+                    self._condition.notify_all()
+        except asyncio.CancelledError:
+            job._publish({"type": "cancelled"})
+            # 排队中被 cancel() 取消时与执行中取消一样抛出 SyncCancelled，事件循环关闭时照常传递
+            if interrupted or not job.cancel_event.is_set():
+                raise
+            raise sync_engine.SyncCancelled("同步已取消")
+        except sync_engine.SyncCancelled:
+            job._publish({"type": "cancelled"})
+            raise
+        except Exception as e:
+            job._publish({"type": "error", "error": str(e)})
+            raise
+        finally:
+            self.jobs.pop(job.id, None)
+        job._publish({"type": "done", "result": result.as_dict()})
+        return result
+
+    def _execute(self, job, emitter):
+        """线程池中执行：运行同步任务并保存运行报告"""
+        result = None
+        try:
+            result = sync_job.run_job(job.tasks, emit=emitter, cancel=job.cancel_event, report=job.report,
+                                      log_dir=self.log_dir, **job.options)
+            return result
+        finally:
+            emitter.flush()
+            job.report.finish(*(result.stats, result.verify) if result is not None else ())
+            if self.log_dir is not None:
+                try:
+                    job.report_path = job.report.save(self.log_dir)
+                except OSError:
+                    job.report_path = None
@@ -0,0 +1,862 @@
+"""同步引擎：与界面无关的目录比较与复制逻辑"""
+import os
+import json
+import stat
+import shutil
+import hashlib
+import time
+from collections import namedtuple
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+import copy_backends
+import sync_rules
+
+# 文件系统保存修改时间的常见精度（纳秒，从粗到细，每个都能整除前一个）：
+# FAT 2秒，HFS+/ext3/部分 NFS 与 SMB 服务器1秒，exFAT 10毫秒，毫秒，微秒，NTFS（含 ntfs3/fuseblk）100纳秒
+MTIME_RESOLUTIONS = (2_000_000_000, 1_000_000_000, 10_000_000, 1_000_000, 1_000, 100)
+# 计算文件哈希时每次读取的字节数
+HASH_CHUNK_SIZE = 1024 * 1024
+# 一次读取源文件写入多个目标时的块大小
+COPY_CHUNK_SIZE = 1024 * 1024
+# 默认复制线程数，方案中的 "workers" 可覆盖
+DEFAULT_WORKERS = 4
+# 同一源目录下的小文件（见 copy_backends.SMALL_FILE_SIZE）合成一批交给一个线程，每批最多的文件数
+SMALL_BATCH_FILES = 256
+
+
+# path_config.json 不存在时使用的默认路径配置
+DEFAULT_PATH_CONFIG = [
+    {
+        "name": "assets",
+        "src_rel": ["unityLibrary", "src", "main", "assets"],
+        "dst_rel": ["app", "src", "main", "assets"],
+        "mode": "default",
+        "default_value": True,
+        "isShow": True
+    },
+    {
+        "name": "jniLibs",
+        "src_rel": ["unityLibrary", "src", "main", "jniLibs"],
+        "dst_rel": ["app", "src", "main", "jniLibs"],
+        "mode": "default",
+        "default_value": True,
+        "isShow": False
+    },
+    {
+        "name": "libs (智能同步)",
+        "src_rel": ["unityLibrary", "libs"],
+        "dst_rel": ["app", "libs", "main"],
+        "mode": "libs",
+        "default_value": True,
+        "isShow": False
+    }
+    # 其他默认配置项...
+]
+
+# 文件清单中的一项：相对路径、大小、修改时间（纳秒）、权限位
+FileEntry = namedtuple("FileEntry", "rel size mtime_ns mode")
+
+
+class Manifest:
+    """一次扫描得到的目录清单，计数、进度、清理与复制共用"""
+
+    def __init__(self, root):
+        self.root = root
+        self.files = {}   # 相对路径 -> FileEntry
+        self.dirs = set()  # 子目录相对路径
+        self.excluded = set()  # 只因大小限制被排除的文件，目标中的同名文件不应当作多余文件删除
+        self.total_bytes = 0
+
+    def add(self, entry):
+        self.files[entry.rel] = entry
+        self.total_bytes += entry.size
+
+    @property
+    def total_files(self):
+        return len(self.files)
+
+    def subset(self, rules):
+        """按同步规则（sync_rules.RuleSet）从已有清单中筛选，不再访问磁盘"""
+        manifest = Manifest(self.root)
+        allowed = {"": True}
+
+        def dir_allowed(rel):
+            if rel not in allowed:
+                parent, name = os.path.split(rel)
+                allowed[rel] = dir_allowed(parent) and rules.dir_allowed(rel, name)
+            return allowed[rel]
+
+        for rel, entry in self.files.items():
+            parent, name = os.path.split(rel)
+            if not dir_allowed(parent) or not rules.file_allowed(rel, name):
+                continue
+            if rules.size_allowed(entry.size):
+                manifest.add(entry)
+            else:
+                manifest.excluded.add(rel)
+        manifest.dirs = {rel for rel in self.dirs if dir_allowed(rel)}
+        manifest.excluded.update(
+            rel for rel in self.excluded
+            if dir_allowed(os.path.dirname(rel)) and rules.file_allowed(rel, os.path.basename(rel))
+        )
+        return manifest
+
+
+class SyncCancelled(Exception):
+    """同步被用户取消"""
+
+
+def check_cancel(cancel):
+    """cancel 为 threading.Event，已被设置时抛出 SyncCancelled"""
+    if cancel is not None and cancel.is_set():
+        raise SyncCancelled("同步已取消")
+
+
+def format_size(size):
+    """字节数转为便于阅读的文本"""
+    for unit in ("B", "KB", "MB", "GB"):
+        if size < 1024 or unit == "GB":
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
+
+
+class PhaseTimer:
+    """按阶段（scan/clean/copy）累计耗时：with timer.phase("scan"): ...
+
+    record / record_file 供 sync_report.RunReport 记录各同步项与单个文件的明细，这里不做处理。
+    """
+
+    def __init__(self):
+        self.phases = {}
+
+    @contextmanager
+    def phase(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_phase(name, time.perf_counter() - start)
+
+    def add_phase(self, name, seconds):
+        self.phases[name] = self.phases.get(name, 0.0) + seconds
+
+    def record(self, task, phase, seconds, files=0, size=0):
+        """记录某个同步项在某阶段的耗时、文件数与字节数"""
+
+    def record_file(self, task, path, size, seconds):
+        """记录单个文件的处理耗时"""
+
+
+class SyncStats:
+    """记录一次同步中复制、跳过、删除的文件数量"""
+
+    def __init__(self, copied=0, skipped=0, deleted=0):
+        self.copied = copied
+        self.skipped = skipped
+        self.deleted = deleted
+        self.errors = []  # [(源文件路径, 错误信息)]
+
+    def merge(self, other):
+        """累加另一份统计结果"""
+        self.copied += other.copied
+        self.skipped += other.skipped
+        self.deleted += other.deleted
+        self.errors.extend(other.errors)
+        return self
+
+    def as_dict(self):
+        return {
+            "copied": self.copied,
+            "skipped": self.skipped,
+            "deleted": self.deleted,
+            "errors": [{"path": path, "error": msg} for path, msg in self.errors],
+        }
+
+    def __str__(self):
+        text = f"复制 {self.copied} 个，跳过 {self.skipped} 个，删除 {self.deleted} 个"
+        if self.errors:
+            text += f"，失败 {len(self.errors)} 个"
+        return text
+
+
+def load_schemes(config_file):
+    """读取 schemes.json，文件不存在时返回空字典"""
+    if not os.path.exists(config_file):
+        return {}
+    with open(config_file, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def load_path_config(path_config_file):
+    """读取 path_config.json，文件不存在时返回默认配置"""
+    if not os.path.exists(path_config_file):
+        return [dict(item) for item in DEFAULT_PATH_CONFIG]
+    with open(path_config_file, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def build_tasks(path_config, scheme):
+    """按方案中保存的勾选状态生成同步项，与界面上点击"开始导入"得到的同步项一致
+
+    复制方式优先使用同步项自己的 "copy_backend"，其次是方案中的设置。
+    """
+    selections = scheme.get("selections", {})
+    subdir_selections = scheme.get("subdir_selections", {})
+    tasks = []
+    for item in path_config:
+        if not selections.get(item["name"], False):
+            continue
+        tasks.append({
+            "name": item["name"],
+            "src": os.path.join(scheme["data_path"], *item["src_rel"]),
+            "dst": os.path.join(scheme["as_path"], *item["dst_rel"]),
+            "mode": item["mode"],
+            "subdir_vars": dict(subdir_selections.get(item["name"], {})),
+            "rules": item.get("rules"),
+            "copy_backend": item.get("copy_backend") or scheme.get("copy_backend", copy_backends.DEFAULT_BACKEND)
+        })
+    return tasks
+
+
+def file_digest(path):
+    """分块读取文件并计算内容哈希"""
+    h = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def list_dir(path):
+    """列出单个目录：返回 (子目录名列表, {文件名: (大小, mtime_ns, 权限位)})"""
+    dirs, files = [], {}
+    with os.scandir(path) as it:
+        for entry in it:
+            if entry.is_dir():
+                dirs.append(entry.name)
+            else:
+                st = entry.stat()
+                files[entry.name] = (st.st_size, st.st_mtime_ns, st.st_mode)
+    return dirs, files
+
+
+def scan_tree(root, rules=None, cache=None, start="", sizes=True):
+    """用 os.scandir 单次遍历目录，生成文件清单
+
+    rules 为 sync_rules.RuleSet 时被排除的文件夹直接剪掉、不再进入，被排除的文件不计入清单；
+    sizes 为 False 时不检查大小限制（扫描目标目录时使用，大小以源文件为准）。
+    start 为 root 下的相对路径时只扫描该子目录，清单中的路径仍相对于 root。
+    cache 为 scan_cache.ScanCache 时，目录 mtime 未变化的子树直接取缓存内容。
+    """
+    manifest = Manifest(root)
+    if not os.path.isdir(os.path.join(root, start)):
+        return manifest
+    if rules is not None and rules.empty:
+        rules = None
+    check_size = sizes and rules is not None and rules.has_size_limits
+
+    stack = [start]
+    while stack:
+        rel_dir = stack.pop()
+        path = os.path.join(root, rel_dir)
+        dirs, files = cache.list_dir(path) if cache is not None else list_dir(path)
+        for name in dirs:
+            rel = os.path.join(rel_dir, name) if rel_dir else name
+            if rules is None or rules.dir_allowed(rel, name):
+                manifest.dirs.add(rel)
+                stack.append(rel)
+        for name, (size, mtime_ns, mode) in files.items():
+            rel = os.path.join(rel_dir, name) if rel_dir else name
+            if rules is not None and not rules.file_allowed(rel, name):
+                continue
+            if check_size and not rules.size_allowed(size):
+                manifest.excluded.add(rel)
+                continue
+            manifest.add(FileEntry(rel, size, mtime_ns, mode))
+    return manifest
+
+
+def path_key(path):
+    """规范化路径，用于判断两个路径是否指向同一位置"""
+    return os.path.normcase(os.path.abspath(path))
+
+
+def paths_overlap(a, b):
+    """两个规范化路径相同或互为上下级目录"""
+    return a == b or a.startswith(b.rstrip(os.sep) + os.sep) or b.startswith(a.rstrip(os.sep) + os.sep)
+
+
+def check_sources(tasks):
+    """default模式的源目录必须存在"""
+    for task in tasks:
+        if task["mode"] == "default" and not os.path.exists(task["src"]):
+            raise FileNotFoundError(f"源目录不存在: {task['src']}")
+
+
+def scan_libs(task, dst_manifest=None):
+    """libs模式：先索引目标目录，再只查看源目录中对应的路径
+
+    被同步规则排除的文件夹在遍历目标目录时直接剪掉；工作量只与目标目录大小有关。
+    dst_manifest 为已扫描好的（部分）目标清单时直接使用，监视模式只传入变化的路径。
+    源目录清单写入 "manifest"，目标目录清单写入 "dst_manifest"；
+    只读取不改动磁盘，上次中断时残留的临时文件记入 "temp_files"，执行时在清理阶段删除。
+    """
+    rules = sync_rules.compile_task(task)
+    if dst_manifest is None:
+        dst_manifest = scan_tree(task["dst"], rules, sizes=False)
+    manifest = Manifest(task["src"])
+    task["temp_files"] = []
+    for rel in list(dst_manifest.files):
+        if copy_backends.is_temp(rel):
+            dst_manifest.total_bytes -= dst_manifest.files.pop(rel).size
+            task["temp_files"].append(rel)
+            continue
+        try:
+            st = os.stat(os.path.join(task["src"], rel))
+        except (FileNotFoundError, NotADirectoryError):
+            continue  # 源目录中没有对应文件，保持目标文件不变
+        if stat.S_ISDIR(st.st_mode):
+            continue
+        if rules.size_allowed(st.st_size):
+            manifest.add(FileEntry(rel, st.st_size, st.st_mtime_ns, st.st_mode))
+        else:
+            manifest.excluded.add(rel)
+    task["manifest"] = manifest
+    task["dst_manifest"] = dst_manifest
+    return task
+
+
+def scan_sources(tasks, cache=None, timer=None):
+    """为所有同步项生成源目录清单，每个源目录只扫描一次
+
+    同一源目录的多个同步项（包括不同方案）规则或子文件夹选择不同时，
+    扫描时只剪掉所有同步项都排除的部分，其余按各自的规则从共享清单中筛选。
+    libs模式的同步项由 scan_libs 按目标目录索引生成清单。
+    cache 为扫描缓存时源目录经缓存扫描（目标目录总是实际扫描）。
+    扫描结果写入每个同步项的 "manifest" 字段；共享扫描的耗时计入每个相关的同步项。
+    """
+    timer = timer or PhaseTimer()
+    check_sources(tasks)
+    groups = {}
+    for task in tasks:
+        sync_rules.compile_task(task)
+        # 上一次（监视模式的部分同步）留下的目标清单作废，default模式在清理阶段重新扫描
+        task.pop("dst_manifest", None)
+        if task["mode"] == "libs":
+            start = time.perf_counter()
+            scan_libs(task)
+            timer.record(task, "scan", time.perf_counter() - start,
+                         task["manifest"].total_files, task["manifest"].total_bytes)
+        else:
+            groups.setdefault(path_key(task["src"]), []).append(task)
+
+    for group in groups.values():
+        start = time.perf_counter()
+        common = sync_rules.RuleSet.common([task["ruleset"] for task in group])
+        shared = scan_tree(group[0]["src"], common, cache)
+        for task in group:
+            task["manifest"] = shared if task["ruleset"].key == common.key else shared.subset(task["ruleset"])
+        seconds = time.perf_counter() - start
+        for task in group:
+            timer.record(task, "scan", seconds, task["manifest"].total_files, task["manifest"].total_bytes)
+    return tasks
+
+
+def changed_rels(task, paths):
+    """把变化的路径换算为同步项源目录下的相对路径，被规则剪掉的文件夹中的路径忽略
+
+    源目录本身发生变化（被删除、整体替换）时返回 None，表示整个同步项需要重新扫描。
+    """
+    root, src = path_key(task["src"]), os.path.abspath(task["src"])
+    rels = set()
+    for path in paths:
+        key = path_key(path)
+        if key == root:
+            return None
+        if not key.startswith(root + os.sep):
+            continue
+        # 只用规范化路径判断归属，相对路径保留原大小写，避免在目标目录中建出小写文件名
+        rel = os.path.abspath(path)[len(src) + 1:]
+        if sync_rules.compile_task(task).path_allowed(rel):
+            rels.add(rel)
+    return rels
+
+
+def _outermost(rels):
+    """去掉已被其上级目录覆盖的相对路径"""
+    kept = set()
+    for rel in sorted(rels, key=lambda r: r.count(os.sep)):
+        parts = rel.split(os.sep)
+        if not any(os.sep.join(parts[:i]) in kept for i in range(1, len(parts))):
+            kept.add(rel)
+    return kept
+
+
+def _scan_path(manifest, rel, rules, sizes=True):
+    """按规则把 manifest.root 下的单个路径（文件或整个子目录）加入清单，路径不存在或被排除时忽略"""
+    try:
+        st = os.stat(os.path.join(manifest.root, rel))
+    except (FileNotFoundError, NotADirectoryError):
+        return
+    name = os.path.basename(rel)
+    if not stat.S_ISDIR(st.st_mode):
+        if not rules.file_allowed(rel, name):
+            return
+        if sizes and not rules.size_allowed(st.st_size):
+            manifest.excluded.add(rel)
+            return
+        manifest.add(FileEntry(rel, st.st_size, st.st_mtime_ns, st.st_mode))
+        return
+    if not rules.dir_allowed(rel, name):
+        return
+    sub = scan_tree(manifest.root, rules, start=rel, sizes=sizes)
+    manifest.dirs.add(rel)
+    manifest.dirs.update(sub.dirs)
+    manifest.excluded.update(sub.excluded)
+    for entry in sub.files.values():
+        manifest.add(entry)
+
+
+def scan_changes(tasks, paths, timer=None):
+    """监视模式：只扫描变化的路径，返回需要同步的同步项
+
+    部分扫描的同步项是原同步项的副本，"manifest"/"dst_manifest" 只包含变化的路径及其子树，
+    同步时只会复制、删除这些路径；源目录本身变化的同步项整体重新扫描。
+    """
+    timer = timer or PhaseTimer()
+    check_sources(tasks)
+    changed, full = [], []
+    for task in tasks:
+        rels = changed_rels(task, paths)
+        if rels is None:
+            full.append(task)
+            continue
+        if not rels:
+            continue
+        start = time.perf_counter()
+        task = dict(task)
+        rules = sync_rules.compile_task(task)
+        dst_manifest = Manifest(task["dst"])
+        if task["mode"] == "libs":
+            for rel in _outermost(rels):
+                _scan_path(dst_manifest, rel, rules, sizes=False)
+            scan_libs(task, dst_manifest)
+        else:
+            manifest = Manifest(task["src"])
+            for rel in _outermost(rels):
+                _scan_path(manifest, rel, rules)
+                _scan_path(dst_manifest, rel, rules, sizes=False)
+                # 上级目录在目标中可能还不存在，交给清理阶段一并建好
+                parent = os.path.dirname(rel)
+                while parent:
+                    manifest.dirs.add(parent)
+                    parent = os.path.dirname(parent)
+            task["manifest"], task["dst_manifest"] = manifest, dst_manifest
+        timer.record(task, "scan", time.perf_counter() - start,
+                     task["manifest"].total_files, task["manifest"].total_bytes)
+        changed.append(task)
+    scan_sources(full, timer=timer)
+    return changed + full
+
+
+def split_waves(tasks):
+    """按目标目录是否重叠分批
+
+    同一批内的同步项目标互不重叠，可以并行写入；
+    与前面某项重叠的同步项放到其后的批次，保持原有的先后顺序。
+    """
+    waves = []
+    placed = []  # [(批次序号, 目标路径)]
+    for task in tasks:
+        key = path_key(task["dst"])
+        index = 0
+        for wave_index, other in placed:
+            if paths_overlap(key, other):
+                index = max(index, wave_index + 1)
+        if index == len(waves):
+            waves.append([])
+        waves[index].append(task)
+        placed.append((index, key))
+    return waves
+
+
+def run_parallel(func, items, workers=DEFAULT_WORKERS, on_done=None, cancel=None):
+    """用有界线程池执行 func(item)
+
+    同时在途的任务数不超过 workers 的 4 倍，避免一次性为几万个文件创建任务；
+    on_done(item, result, error) 总是在调用线程中回调，便于直接更新界面。
+    workers <= 1 时在当前线程顺序执行，结果与并行一致。
+    cancel 被设置后不再提交新任务，等在途任务结束后抛出 SyncCancelled。
+    """
+    if workers <= 1:
+        for item in items:
+            check_cancel(cancel)
+            try:
+                result, error = func(item), None
+            except Exception as e:
+                result, error = None, e
+            if on_done:
+                on_done(item, result, error)
+        return
+
+    items = iter(items)
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        pending = {}
+
+        def fill():
+            if cancel is not None and cancel.is_set():
+                return
+            for item in items:
+                pending[pool.submit(func, item)] = item
+                if len(pending) >= workers * 4:
+                    break
+
+        fill()
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                item = pending.pop(future)
+                error = future.exception()
+                if on_done:
+                    on_done(item, None if error else future.result(), error)
+            fill()
+    check_cancel(cancel)
+
+
+def mtime_resolution(mtimes):
+    """由目标文件的修改时间推断目标文件系统保存修改时间的精度（纳秒）
+
+    取 MTIME_RESOLUTIONS 中能整除全部修改时间的最粗精度，都不能整除时为 1（精确到纳秒）；
+    只读取已扫描的清单，不写入探测文件，预演计划时同样可用。
+    """
+    candidates = iter(MTIME_RESOLUTIONS)
+    resolution = next(candidates)
+    for mtime_ns in mtimes:
+        while mtime_ns % resolution:
+            resolution = next(candidates, 1)
+            if resolution == 1:
+                return 1
+    return resolution
+
+
+def mtime_window(task):
+    """同步项目标的修改时间误差（纳秒）：目标清单推断出的精度（见 mtime_resolution），精确到纳秒时为 0，结果记在同步项中
+
+    复制时保留的源文件修改时间在目标上按该精度截断或舍入，差值小于一个精度单位即视为相同；
+    没有目标清单时要求完全相同。
+    """
+    window = task.get("mtime_window")
+    if window is None:
+        dst_manifest = task.get("dst_manifest")
+        resolution = 1 if dst_manifest is None else mtime_resolution(
+            entry.mtime_ns for entry in dst_manifest.files.values())
+        window = task["mtime_window"] = resolution - 1
+    return window
+
+
+def files_match(src_path, src_entry, dst_path, dst_entry, use_hash=False, src_digest=None, window=0):
+    """按大小+修改时间（可选内容哈希）判断目标文件是否已是最新
+
+    复制时会保留源文件的修改时间，window 为允许的误差（纳秒，见 mtime_window），默认要求完全相同。
+    """
+    if src_entry.size != dst_entry.size:
+        return False
+    if use_hash:
+        return (src_digest or file_digest(src_path)) == file_digest(dst_path)
+    return abs(src_entry.mtime_ns - dst_entry.mtime_ns) <= window
+
+
+def copy_to_many(src_path, dst_paths):
+    """读取一次源文件，同时写入多个目标文件并复制元数据（先写临时文件，全部完成后再改名）"""
+    if len(dst_paths) == 1:
+        copy_backends.copy_file(src_path, dst_paths[0], "copy")
+        return
+    tmp_paths = [copy_backends.temp_path(path) for path in dst_paths]
+    outputs = []
+    try:
+        try:
+            with open(src_path, 'rb') as fsrc:
+                for tmp_path in tmp_paths:
+                    outputs.append(open(tmp_path, 'wb'))
+                for chunk in iter(lambda: fsrc.read(COPY_CHUNK_SIZE), b''):
+                    for fdst in outputs:
+                        fdst.write(chunk)
+        finally:
+            for fdst in outputs:
+                fdst.close()
+        for tmp_path, path in zip(tmp_paths, dst_paths):
+            shutil.copystat(src_path, tmp_path)
+            copy_backends.replace_from_temp(tmp_path, path)
+    except BaseException:
+        for tmp_path in tmp_paths:
+            copy_backends.remove_existing(tmp_path)
+        raise
+
+
+def scan_destination(task):
+    """default模式的目标目录清单：task 中已有 "dst_manifest"（监视模式的部分清单、同步计划扫描的清单）时直接使用"""
+    if not task.get("dst_manifest"):
+        task["dst_manifest"] = scan_tree(task["dst"], sync_rules.compile_task(task), sizes=False)
+    return task["dst_manifest"]
+
+
+def destination_changes(task):
+    """default模式下目标目录需要的改动，不访问磁盘：返回 (要删除的文件, 要删除的目录, 要新建的目录)
+
+    同名但类型不同的条目也会被删除；只因大小限制未同步的文件保留目标中的旧版本。
+    """
+    manifest, dst_manifest = task["manifest"], scan_destination(task)
+    delete_files = sorted(set(dst_manifest.files) - set(manifest.files) - manifest.excluded)
+    delete_dirs = sorted(dst_manifest.dirs - manifest.dirs, key=len, reverse=True)
+    make_dirs = sorted(manifest.dirs - dst_manifest.dirs)
+    return delete_files, delete_dirs, make_dirs
+
+
+def _prepare_destination(task):
+    """default模式：删除多余的文件和目录并建好全部子目录，返回目标目录清单"""
+    dst, stats = task["dst"], task["stats"]
+    delete_files, delete_dirs, make_dirs = destination_changes(task)
+    for rel in delete_files:
+        # 按事先扫描的清单执行时文件可能已被删除
+        copy_backends.remove_existing(os.path.join(dst, rel))
+        # 上次中断时残留的临时文件不计入删除数量
+        if not copy_backends.is_temp(rel):
+            stats.deleted += 1
+    for rel in delete_dirs:
+        path = os.path.join(dst, rel)
+        if os.path.isdir(path):
+            shutil.rmtree(path)
+
+    os.makedirs(dst, exist_ok=True)
+    for rel in make_dirs:
+        os.makedirs(os.path.join(dst, rel), exist_ok=True)
+    return task["dst_manifest"]
+
+
+def _build_jobs(wave, dst_files_list):
+    """把一批同步项合并成按源文件分组的复制任务：(源文件, 清单项, [(同步项, 目标文件, 目标清单项)])"""
+    jobs = {}
+    for task, dst_files in zip(wave, dst_files_list):
+        # rel 是扫描得到的相对路径，直接拼接与 os.path.join 结果相同，几万个文件时省下不少时间
+        src_key = os.path.join(path_key(task["manifest"].root), "")
+        src_root = os.path.join(task["manifest"].root, "")
+        dst_root = os.path.join(task["dst"], "")
+        for rel, entry in task["manifest"].files.items():
+            key = src_key + rel
+            if key not in jobs:
+                jobs[key] = (src_root + rel, entry, [])
+            jobs[key][2].append((task, dst_root + rel, dst_files.get(rel)))
+    return jobs.values()
+
+
+def _batch_jobs(jobs):
+    """把复制任务分批：同一源目录下的小文件合成一批，在一个线程中连续处理，省去逐个文件提交与回调的开销；
+    大文件各自一批"""
+    batches = {}
+    for job in jobs:
+        if job[1].size > copy_backends.SMALL_FILE_SIZE:
+            yield [job]
+            continue
+        key = job[0].rpartition(os.sep)[0]
+        batch = batches.setdefault(key, [])
+        batch.append(job)
+        if len(batch) >= SMALL_BATCH_FILES:
+            yield batches.pop(key)
+    yield from batches.values()
+
+
+def _sync_file(job, use_hash, store=None, delta=None, journal=None):
+    """复制线程中执行：逐个目标比对，需要更新的目标一起写入，返回每个目标是否发生了复制"""
+    src_path, entry, targets = job
+    # 中断前已写入完成、之后源与目标都没有变化的目标直接跳过
+    if journal is None:
+        resumed = [False] * len(targets)
+    else:
+        resumed = [dst_entry is not None and journal.completed(entry, dst_path) for _, dst_path, dst_entry in targets]
+    written = False
+    if store is not None:
+        # 对象库：内容只存一份，目标硬链接到对象，按 inode 判断是否最新
+        outcomes = [
+            not done and store.link(src_path, entry, dst_path, dst_entry)
+            for (_, dst_path, dst_entry), done in zip(targets, resumed)
+        ]
+    else:
+        outcomes, written = _copy_targets(src_path, entry, targets, resumed, use_hash, delta)
+    if journal is not None:
+        for (_, dst_path, _), copied, done in zip(targets, outcomes, resumed):
+            # 内容哈希比对过的目标也记下，续传时省去再次读取
+            if copied or (use_hash and not done):
+                # 按清单属性写入的小文件不必再 stat
+                journal.record(entry, dst_path, [entry.size, entry.mtime_ns] if copied and written else None)
+    return outcomes
+
+
+def _copy_targets(src_path, entry, targets, resumed, use_hash, delta):
+    """返回 (每个目标是否复制, 需要复制的普通目标是否都由 copy_backends.copy_small 按清单属性写入)"""
+    src_digest = None
+    outcomes = []
+    for (task, dst_path, dst_entry), done in zip(targets, resumed):
+        if done or dst_entry is None:
+            outcomes.append(not done)
+            continue
+        # libs模式的目标都来自目标目录索引，内容相同的同样跳过；源文件哈希只在有目标需要比对时计算一次
+        if use_hash and src_digest is None:
+            src_digest = file_digest(src_path)
+        outcomes.append(not files_match(src_path, entry, dst_path, dst_entry, use_hash, src_digest, mtime_window(task)))
+    # 普通复制的目标共用一次读取；reflink/硬链接等内核方式逐个目标执行，小文件只有硬链接单独执行
+    small = entry.size <= copy_backends.SMALL_FILE_SIZE
+    shared, new = [], []
+    for (task, dst_path, dst_entry), copy in zip(targets, outcomes):
+        if not copy:
+            continue
+        # 大文件只改了少数区域时按块更新，不整体重写
+        if delta is not None and dst_entry is not None and delta.applies(entry.size, dst_path):
+            delta.copy(src_path, dst_path)
+            continue
+        backend = task.get("copy_backend", copy_backends.DEFAULT_BACKEND)
+        if (small and backend != "hardlink") or copy_backends.userspace_only(backend):
+            shared.append(dst_path)
+            if dst_entry is None:
+                new.append(dst_path)
+        else:
+            copy_backends.copy_file(src_path, dst_path, backend)
+            small = False
+    written = small and bool(shared) and copy_backends.copy_small(src_path, shared, entry.size, entry.mtime_ns, new)
+    if shared and not written:
+        copy_to_many(src_path, shared)
+    return outcomes, written
+
+
+def stats_by_scheme(tasks):
+    """按同步项的 "scheme" 字段汇总统计结果"""
+    result = {}
+    for task in tasks:
+        result.setdefault(task.get("scheme"), SyncStats()).merge(task["stats"])
+    return result
+
+
+def run_sync(tasks, use_hash=False, workers=DEFAULT_WORKERS, progress=None, cancel=None, on_scanned=None,
+             cache=None, timer=None, store=None, delta=None, journal=None):
+    """扫描并同步所有同步项，返回汇总后的 SyncStats
+
+    tasks 中每项包含 src、dst、mode、subdir_vars 与可选的 rules（见 sync_rules.py），可以来自多个方案（以 "scheme" 字段区分）：
+    每个源目录只扫描一次，每个源文件只读取一次，再写入所有需要它的目标；
+    目标目录互不重叠的同步项在同一批内并行执行。
+    default模式增量同步，只复制变化的文件并删除多余文件；libs模式只更新目标中已存在且内容有变化的文件。
+    各同步项自己的统计写入 task["stats"]；progress(src_file, size) 每处理完一个目标文件调用一次，
+    on_scanned(total_files, total_bytes) 在扫描完成、开始复制前调用；
+    cache 为扫描缓存（scan_cache.ScanCache）时源目录经缓存扫描，由调用方负责保存；
+    timer 为 PhaseTimer（或 sync_report.RunReport）时记录 scan（扫描）、clean（删除多余文件并建目录）、
+    copy（比对与复制）各阶段耗时，以及每个同步项、每个文件的明细；
+    store 为 object_store.ObjectStore 时目标文件改为硬链接到对象库（忽略 copy_backend），由调用方负责保存索引；
+    delta 为 delta_copy.DeltaCopier 时已存在的大文件只重写变化的块，由调用方负责保存块哈希缓存；
+    journal 为 sync_journal.SyncJournal 时记录每个完成的写入，中断后下次同步跳过已完成的文件，正常结束时删除日志。
+    """
+    timer = timer or PhaseTimer()
+    with timer.phase("scan"):
+        scan_sources(tasks, cache, timer)
+    return _execute(tasks, use_hash, workers, progress, cancel, on_scanned, timer, store, delta, journal)
+
+
+def sync_changes(tasks, paths, use_hash=False, workers=DEFAULT_WORKERS, progress=None, cancel=None, timer=None,
+                 store=None, delta=None):
+    """监视模式：只同步 paths（源目录中变化的文件或目录）涉及的路径，返回汇总后的 SyncStats
+
+    新增、修改的文件按 default/libs 模式的规则复制，源中已删除的路径从 default 模式的目标中删除；
+    未选中的子文件夹中的变化忽略。各同步项的统计写入 scan_changes 返回的同步项副本中。
+    """
+    timer = timer or PhaseTimer()
+    with timer.phase("scan"):
+        tasks = scan_changes(tasks, paths, timer)
+    return _execute(tasks, use_hash, workers, progress, cancel, None, timer, store, delta)
+
+
+def run_plan(plan, use_hash=False, workers=DEFAULT_WORKERS, progress=None, cancel=None, on_scanned=None,
+             timer=None, store=None, delta=None, journal=None):
+    """执行 sync_plan.SyncPlan：沿用计划中扫描好的源目录与目标目录清单，不再重新扫描，返回汇总后的 SyncStats
+
+    其余参数与 run_sync 相同。
+    """
+    return _execute(plan.tasks, use_hash, workers, progress, cancel, on_scanned, timer or PhaseTimer(), store, delta,
+                    journal)
+
+
+def _execute(tasks, use_hash, workers, progress, cancel, on_scanned, timer, store=None, delta=None, journal=None):
+    """对已扫描好的同步项执行清理与复制"""
+    for task in tasks:
+        task["stats"] = SyncStats()
+    if on_scanned:
+        on_scanned(
+            sum(task["manifest"].total_files for task in tasks),
+            sum(task["manifest"].total_bytes for task in tasks),
+        )
+
+    def timed_sync_batch(batch):
+        # 一批中的文件各自计时、各自出错，不影响同批的其他文件；取消时不再处理余下的文件
+        results = []
+        for job in batch:
+            if cancel is not None and cancel.is_set():
+                break
+            start = time.perf_counter()
+            try:
+                outcomes, error = _sync_file(job, use_hash, store, delta, journal), None
+            except Exception as e:
+                outcomes, error = None, e
+            results.append((outcomes, error, time.perf_counter() - start))
+        return results
+
+    def on_done(batch, results, batch_error):
+        if results is None:
+            results = [(None, batch_error, 0.0)] * len(batch)
+        # 取消时 results 只包含已处理的文件
+        for job, (outcomes, error, seconds) in zip(batch, results):
+            src_path, entry, targets = job
+            for index, (task, _, _) in enumerate(targets):
+                copied = error is None and outcomes[index]
+                if error is not None:
+                    task["stats"].errors.append((src_path, str(error)))
+                elif copied:
+                    task["stats"].copied += 1
+                else:
+                    task["stats"].skipped += 1
+                # copy 阶段：文件数按处理过的文件计，字节数只计实际写入的
+                timer.record(task, "copy", seconds, 1, entry.size if copied else 0)
+                if progress:
+                    progress(src_path, entry.size)
+            if error is None:
+                timer.record_file(targets[0][0], src_path, entry.size, seconds)
+
+    if journal is not None:
+        journal.begin(tasks)
+    try:
+        for wave in split_waves(tasks):
+            check_cancel(cancel)
+            with timer.phase("clean"):
+                dst_files_list = []
+                for task in wave:
+                    if task["mode"] == "default":
+                        start = time.perf_counter()
+                        dst_files_list.append(_prepare_destination(task).files)
+                        timer.record(task, "clean", time.perf_counter() - start, task["stats"].deleted)
+                        if journal is not None:
+                            journal.cleaned(task, task["stats"].deleted)
+                    else:
+                        for rel in task.get("temp_files", ()):
+                            copy_backends.remove_existing(os.path.join(task["dst"], rel))
+                        dst_files_list.append(task["dst_manifest"].files)
+            with timer.phase("copy"):
+                batches = _batch_jobs(_build_jobs(wave, dst_files_list))
+                run_parallel(timed_sync_batch, batches, workers, on_done, cancel)
+    except BaseException:
+        # 取消、出错或被中断：保留日志，下次同步从这里继续
+        if journal is not None:
+            journal.close()
+        raise
+    if journal is not None:
+        journal.finish()
+
+    stats = SyncStats()
+    for task in tasks:
+        stats.merge(task["stats"])
+    return stats
@@ -0,0 +1,97 @@
+"""同步任务：一次完整的导入流程，与界面无关
+
+    同步前快照 → 扫描并同步（或执行预览生成的计划）→ 同步后校验 → 保存扫描缓存、对象库索引与块哈希缓存
+
+界面（codes.py）、命令行（cli.py）与 asyncio 接口（sync_async.py）都通过 run_job 执行同步，
+过程中的进度以事件元组交给 emit，emit 总是在执行 run_job 的线程中调用：
+    ("snapshot", Snapshot)        同步前快照已建立（与最近的快照相同而直接沿用时也会发出）
+    ("scanned", 文件数, 字节数)    扫描完成，开始清理与复制
+    ("file", 源文件, 字节数)       处理完一个目标文件；校验阶段为校验完一个源文件
+    ("verifying",)                开始同步后校验，之后的 file 事件重新计数
+"""
+from contextlib import nullcontext
+
+import sync_engine
+import sync_report
+import sync_verify
+
+
+class JobResult:
+    """一次同步任务的结果"""
+
+    def __init__(self, stats, verify=None, snapshot=None, resumed=0):
+        self.stats = stats  # 汇总后的 SyncStats，各同步项自己的统计在 task["stats"] 中
+        self.verify = verify  # sync_verify.VerifyResult，未校验时为 None
+        self.snapshot = snapshot  # 同步前快照 snapshots.Snapshot，未建立时为 None
+        self.resumed = resumed  # 续传时跳过的上次已完成的文件数
+
+    @property
+    def ok(self):
+        return not self.stats.errors and (self.verify is None or self.verify.ok)
+
+    def as_dict(self):
+        return {
+            "ok": self.ok,
+            "stats": self.stats.as_dict(),
+            "verify": self.verify.as_dict() if self.verify is not None else None,
+            "snapshot": self.snapshot.id if self.snapshot is not None else None,
+            "resumed": self.resumed,
+        }
+
+
+def run_job(tasks, use_hash=False, workers=sync_engine.DEFAULT_WORKERS, cache=None, store=None, delta=None,
+            journal=None, verify=None, digest_cache=None, snapshot_store=None, plan=None, emit=None, cancel=None,
+            report=None, log_dir=None, profile=None):
+    """执行一次同步任务，返回 JobResult
+
+    use_hash、workers、cache、store、delta、journal 与 sync_engine.run_sync 相同；
+    verify 为校验方式（见 sync_verify.VERIFY_MODES），None 表示不校验；
+    digest_cache 为校验时沿用与记录源文件哈希的扫描缓存，默认为 cache（未开启扫描缓存时可单独传入）；
+    snapshot_store 为 snapshots.SnapshotStore 时同步前建立快照；
+    plan 为 sync_plan.SyncPlan 时直接执行该计划，不再扫描（tasks 应为 plan.tasks）；
+    cancel 为 threading.Event，被设置时抛出 sync_engine.SyncCancelled；
+    report 为 sync_report.RunReport 时记录各阶段耗时，由调用方 finish 并保存；
+    log_dir 不为 None 时按 profile（None 时看环境变量 AUTOMOVE_PROFILE）用 cProfile 分析，结果保存在该目录。
+    正常结束时保存用到的缓存与索引；取消或出错时异常原样抛出，不保存。
+    """
+    emit = emit or (lambda event: None)
+    report = report or sync_report.RunReport()
+    digest_cache = digest_cache if digest_cache is not None else cache
+
+    def on_file(path, size):
+        emit(("file", path, size))
+
+    snapshot = None
+    if snapshot_store is not None:
+        with report.phase("snapshot"):
+            snapshot = snapshot_store.take(tasks, cancel)
+        if snapshot is not None:
+            emit(("snapshot", snapshot))
+    options = dict(
+        progress=on_file,
+        cancel=cancel,
+        on_scanned=lambda files, size: emit(("scanned", files, size)),
+        timer=report,
+        store=store,
+        delta=delta,
+        journal=journal
+    )
+    verify_result = None
+    with report.profile(log_dir, profile) if log_dir is not None else nullcontext():
+        if plan is not None:
+            # 扫描耗时沿用生成计划时的记录
+            report.add_phase("scan", plan.scan_seconds)
+            stats = sync_engine.run_plan(plan, use_hash, workers, **options)
+        else:
+            stats = sync_engine.run_sync(tasks, use_hash, workers, cache=cache, **options)
+        if verify is not None:
+            emit(("verifying",))
+            verify_result = sync_verify.verify(tasks, verify, workers, progress=on_file, cancel=cancel, timer=report,
+                                               cache=digest_cache, store=store)
+    saved = [cache, store, delta]
+    if digest_cache is not cache:
+        saved.append(digest_cache)
+    for obj in saved:
+        if obj is not None:
+            obj.save()
+    return JobResult(stats, verify_result, snapshot, journal.resumed if journal is not None else 0)
@@ -0,0 +1,166 @@
+"""同步日志：记录同步计划与每个已完成的写入，中断后下次同步从中断处继续
+
+日志为 Data/sync_journal.jsonl，每行一个 JSON：
+    {"op": "begin", "key": [...], "tasks": [...]}           同步项（源/目标/模式）
+    {"op": "plan", "task": "assets", "files": N, "bytes": B}  扫描得到的各同步项规模
+    {"op": "cleaned", "task": "assets", "deleted": N}        该同步项的多余文件已删除
+    {"d": 目标文件, "s": [源大小, 源mtime_ns], "t": [目标大小, 目标mtime_ns]}   一个目标写入完成
+    {"op": "resume"}                                        从中断处继续
+    {"op": "end"}                                           同步完成（随后删除日志）
+同步正常结束后删除日志；被取消、出错或程序被关闭时日志保留。
+下次同步的同步项与日志相同时，源文件未变、目标仍是当时写入的样子的文件直接跳过，
+不再比对（勾选内容哈希比对时省去两次读取）；同步项不同时丢弃旧日志重新开始。
+
+已有的目标由 copy_backends 先写临时文件再改名，不会出现写了一半的文件；直接新建的小文件写了一半时
+修改时间与源文件不同，也不在日志中，续传时重新复制；
+日志每 FLUSH_EVERY 行或 FLUSH_INTERVAL 秒写出一次，丢失的最后几行只会让这些文件在续传时重新比对。
+"""
+import json
+import os
+import threading
+import time
+
+import sync_engine
+
+JOURNAL_FILE_NAME = "sync_journal.jsonl"
+FLUSH_EVERY = 200
+FLUSH_INTERVAL = 0.5
+
+
+def journal_key(tasks):
+    """同步项的标识：源、目标与模式都相同时才能续传"""
+    return sorted(
+        [sync_engine.path_key(task["src"]), sync_engine.path_key(task["dst"]), task["mode"]] for task in tasks
+    )
+
+
+class SyncJournal:
+    """一次同步的日志，可在复制线程之间共用"""
+
+    def __init__(self, path):
+        self.path = path
+        self.previous_key = None
+        self.interrupted = False  # 上一次同步没有正常结束
+        self.done = {}  # 目标规范路径 -> {"s": [...], "t": [...]}
+        self.resumed = 0
+        self._file = None
+        self._unflushed = 0
+        self._last_flush = 0.0
+        self._lock = threading.Lock()
+
+    def load(self):
+        """读取上一次同步留下的日志，不存在时视为上一次已正常结束"""
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                lines = f.readlines()
+        except OSError:
+            return self
+        for line in lines:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue  # 中断时写了一半的最后一行
+            op = record.get("op")
+            if op == "begin":
+                self.previous_key = record["key"]
+                self.done = {}
+                self.interrupted = True
+            elif op == "end":
+                self.interrupted = False
+            elif op is None and "d" in record:
+                self.done[sync_engine.path_key(record["d"])] = record
+        return self
+
+    def begin(self, tasks):
+        """开始记录本次同步；同步项与中断的日志相同时在其后继续，否则重新开始"""
+        key = journal_key(tasks)
+        resume = self.interrupted and self.previous_key == key and bool(self.done)
+        if not resume:
+            self.done = {}
+        self._file = open(self.path, 'a' if resume else 'w', encoding='utf-8')
+        if resume:
+            self._write({"op": "resume"})
+        else:
+            self._write({
+                "op": "begin",
+                "key": key,
+                "tasks": [{"name": task["name"], "src": task["src"], "dst": task["dst"], "mode": task["mode"]}
+                          for task in tasks],
+            })
+        for task in tasks:
+            self._write({"op": "plan", "task": task["name"], "files": task["manifest"].total_files,
+                         "bytes": task["manifest"].total_bytes})
+        self.flush()
+        return resume
+
+    def completed(self, entry, dst_path):
+        """源文件与日志中记录的一致、目标也仍是当时写入的样子时返回 True"""
+        record = self.done.get(sync_engine.path_key(dst_path))
+        if record is None or record["s"] != [entry.size, entry.mtime_ns]:
+            return False
+        try:
+            st = os.stat(dst_path)
+        except OSError:
+            return False
+        if record["t"] != [st.st_size, st.st_mtime_ns]:
+            return False
+        with self._lock:
+            self.resumed += 1
+        return True
+
+    def record(self, entry, dst_path, target=None):
+        """记录一个目标写入完成；target 为已知的目标 [大小, mtime_ns]（小文件按清单写入时），没有时 stat 目标"""
+        if target is None:
+            st = os.stat(dst_path)
+            target = [st.st_size, st.st_mtime_ns]
+        self._write({"d": dst_path, "s": [entry.size, entry.mtime_ns], "t": target})
+
+    def cleaned(self, task, deleted):
+        self._write({"op": "cleaned", "task": task["name"], "deleted": deleted})
+
+    def _write(self, record):
+        line = json.dumps(record, ensure_ascii=False) + "\n"
+        with self._lock:
+            self._file.write(line)
+            self._unflushed += 1
+            now = time.monotonic()
+            if self._unflushed >= FLUSH_EVERY or now - self._last_flush >= FLUSH_INTERVAL:
+                self._file.flush()
+                self._unflushed = 0
+                self._last_flush = now
+
+    def flush(self):
+        with self._lock:
+            self._file.flush()
+            self._unflushed = 0
+            self._last_flush = time.monotonic()
+
+    def close(self):
+        """同步中断：写出并关闭日志，保留到下次同步续传"""
+        if self._file is None:
+            return
+        with self._lock:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._file.close()
+            self._file = None
+        self.interrupted = True
+
+    def finish(self):
+        """同步完成：删除日志"""
+        if self._file is not None:
+            self._write({"op": "end"})
+            with self._lock:
+                self._file.close()
+                self._file = None
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+        self.interrupted = False
+        self.done = {}
+
+
+def open_journal(config_dir):
+    """打开 config_dir 下的同步日志（Data/sync_journal.jsonl）"""
+    return SyncJournal(os.path.join(config_dir, JOURNAL_FILE_NAME)).load()
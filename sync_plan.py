@@ -0,0 +1,225 @@
+"""同步计划（预演）：在改动磁盘之前列出本次同步将执行的全部操作，并按以往的吞吐估计耗时
+
+build_plan 扫描源目录与目标目录（只读），把每个目标文件归为一种操作：
+    copy       目标中没有，新复制
+    overwrite  目标已存在但大小或修改时间不同，覆盖
+    skip       目标已是最新，跳过
+    delete     default模式下源中已没有的目标文件，删除
+上次中断时残留在目标中的临时文件（*.automove-tmp）不列为操作，只在摘要中给出个数，执行时删除。
+比对方式与同步时相同（大小+修改时间）。勾选内容哈希比对或使用对象库时，同步时会按内容或 inode 重新判断，
+计划中的 skip/overwrite 只是估计；copy 与 delete 总是准确的。
+
+预计耗时按 Data/logs 中最近 HISTORY_RUNS 次运行报告拟合：复制阶段耗时 ≈ a × 处理的文件数 + b × 写入的字节数，
+清理阶段按每个删除文件的平均耗时估计；没有历史报告时不给出估计。
+
+计划确认后交给 sync_engine.run_plan 执行，沿用计划中扫描好的清单，不再重新扫描。
+目标目录与前面的同步项重叠、需要等前一批写完的同步项（见 sync_engine.split_waves）执行时仍会重新扫描目标目录。
+"""
+import json
+import os
+import time
+from collections import namedtuple
+
+import copy_backends
+import sync_engine
+import sync_report
+
+COPY = "copy"
+OVERWRITE = "overwrite"
+SKIP = "skip"
+DELETE = "delete"
+ACTIONS = (COPY, OVERWRITE, SKIP, DELETE)
+ACTION_NAMES = {COPY: "复制", OVERWRITE: "覆盖", SKIP: "跳过", DELETE: "删除"}
+# 估计耗时时参考的最近运行报告数
+HISTORY_RUNS = 10
+# 输出与界面中最多列出的操作数（跳过的文件不列出）
+MAX_LISTED = 2000
+
+# 计划中的一项操作：delete 时 src 为 None，size 为被删除的目标文件大小
+PlanOp = namedtuple("PlanOp", "action task src dst size")
+
+
+def format_duration(seconds):
+    """秒数转为“1分05秒”这样的文本"""
+    seconds = int(round(seconds))
+    if seconds < 60:
+        return f"{seconds}秒"
+    if seconds < 3600:
+        return f"{seconds // 60}分{seconds % 60:02d}秒"
+    return f"{seconds // 3600}小时{seconds % 3600 // 60:02d}分"
+
+
+class SyncPlan:
+    """一次同步的完整操作清单，tasks 为已扫描好的同步项，可直接交给 sync_engine.run_plan 执行"""
+
+    def __init__(self, tasks, use_hash=False):
+        self.tasks = tasks
+        self.use_hash = use_hash
+        self.ops = []
+        self.created = time.time()
+        self.scan_seconds = 0.0
+        self.estimate = None  # 预计的清理+复制耗时（秒），没有历史报告时为 None
+        self.temp_files = 0  # 执行时将删除的残留临时文件数
+        self.history_runs = 0
+
+    def totals(self, task=None):
+        """各操作的 [文件数, 字节数]；task 不为 None 时只统计该同步项"""
+        totals = {action: [0, 0] for action in ACTIONS}
+        for op in self.ops:
+            if task is None or op.task is task:
+                totals[op.action][0] += 1
+                totals[op.action][1] += op.size
+        return totals
+
+    @property
+    def changes(self):
+        """会改动磁盘的操作（不含 skip）"""
+        return [op for op in self.ops if op.action != SKIP]
+
+    def as_dict(self, limit=MAX_LISTED):
+        changes = self.changes
+        return {
+            "totals": {action: {"files": files, "bytes": size} for action, (files, size) in self.totals().items()},
+            "entries": {
+                sync_report.entry_key(task): {
+                    action: {"files": files, "bytes": size} for action, (files, size) in self.totals(task).items()
+                }
+                for task in self.tasks
+            },
+            "scan_seconds": round(self.scan_seconds, 3),
+            "temp_files": self.temp_files,
+            "estimate_seconds": round(self.estimate, 1) if self.estimate is not None else None,
+            "history_runs": self.history_runs,
+            "approximate": self.use_hash,
+            "ops": [
+                {"action": op.action, "entry": sync_report.entry_key(op.task), "src": op.src, "dst": op.dst,
+                 "bytes": op.size}
+                for op in changes[:limit]
+            ],
+            "ops_truncated": max(0, len(changes) - limit),
+        }
+
+    def summary(self):
+        """界面与命令行显示用的摘要"""
+        totals = self.totals()
+        parts = []
+        for action in ACTIONS:
+            files, size = totals[action]
+            parts.append(f"{ACTION_NAMES[action]} {files} 个" + (f"（{sync_engine.format_size(size)}）" if files else ""))
+        lines = ["，".join(parts)]
+        if self.temp_files:
+            lines.append(f"另有上次中断残留的临时文件 {self.temp_files} 个，执行时删除")
+        if self.estimate is not None:
+            lines.append(f"预计耗时：约 {format_duration(self.estimate)}（按最近 {self.history_runs} 次同步的吞吐估计）")
+        else:
+            lines.append("预计耗时：暂无历史运行报告，无法估计")
+        if self.use_hash:
+            lines.append("已勾选内容哈希比对：跳过/覆盖按大小与修改时间估计，执行时以内容比对为准")
+        return "\n".join(lines)
+
+
+def _classify(task, dst_files):
+    manifest = task["manifest"]
+    for rel, entry in manifest.files.items():
+        src_path, dst_path = os.path.join(manifest.root, rel), os.path.join(task["dst"], rel)
+        dst_entry = dst_files.get(rel)
+        if dst_entry is None:
+            action = COPY
+        elif sync_engine.files_match(src_path, entry, dst_path, dst_entry, window=sync_engine.mtime_window(task)):
+            action = SKIP
+        else:
+            action = OVERWRITE
+        yield PlanOp(action, task, src_path, dst_path, entry.size)
+
+
+def build_plan(tasks, use_hash=False, cache=None, timer=None, log_dir=None):
+    """扫描源目录与目标目录并生成同步计划，不改动磁盘
+
+    cache 为扫描缓存时源目录经缓存扫描；timer 记录 scan 阶段耗时；
+    log_dir 为运行报告目录（Data/logs）时按其中的历史报告估计耗时。
+    """
+    timer = timer or sync_engine.PhaseTimer()
+    plan = SyncPlan(tasks, use_hash)
+    start = time.perf_counter()
+    with timer.phase("scan"):
+        sync_engine.scan_sources(tasks, cache, timer)
+        for index, wave in enumerate(sync_engine.split_waves(tasks)):
+            for task in wave:
+                if task["mode"] != "default":
+                    continue
+                # 后面批次的目标目录会被前一批改动，执行时重新扫描，这里的清单只用于展示
+                target = task if index == 0 else dict(task, dst_manifest=None)
+                delete_files, _, _ = sync_engine.destination_changes(target)
+                dst_files = target["dst_manifest"].files
+                for rel in delete_files:
+                    if copy_backends.is_temp(rel):
+                        plan.temp_files += 1
+                    else:
+                        plan.ops.append(PlanOp(DELETE, task, None, os.path.join(task["dst"], rel), dst_files[rel].size))
+                plan.ops.extend(_classify(task, dst_files))
+    for task in tasks:
+        if task["mode"] != "default":
+            plan.temp_files += len(task["temp_files"])
+            plan.ops.extend(_classify(task, task["dst_manifest"].files))
+    plan.scan_seconds = time.perf_counter() - start
+    if log_dir is not None:
+        plan.estimate, plan.history_runs = estimate_seconds(plan, load_history(log_dir))
+    return plan
+
+
+def load_history(log_dir, runs=HISTORY_RUNS):
+    """读取最近 runs 份运行报告中的 (处理的文件数, 写入的字节数, 复制耗时, 删除数, 清理耗时)"""
+    try:
+        names = sorted(name for name in os.listdir(log_dir) if name.startswith("sync_") and name.endswith(".json"))
+    except OSError:
+        return []
+    history = []
+    for name in reversed(names):
+        try:
+            with open(os.path.join(log_dir, name), 'r', encoding='utf-8') as f:
+                report = json.load(f)
+            stats, phases = report["stats"], report["phases"]
+        except (OSError, ValueError, KeyError):
+            continue
+        if not stats or not phases.get("copy"):
+            continue  # 被取消或出错的运行
+        written = sum(phases_of_entry.get("copy", {}).get("bytes", 0) for phases_of_entry in report["entries"].values())
+        history.append((stats["copied"] + stats["skipped"], written, phases["copy"],
+                        stats["deleted"], phases.get("clean", 0.0)))
+        if len(history) >= runs:
+            break
+    return history
+
+
+def _fit(samples):
+    """最小二乘拟合 t ≈ a × 文件数 + b × 字节数（a、b 不小于 0），样本不足时退回按文件数的平均耗时"""
+    s11 = sum(files * files for files, _, _ in samples)
+    s12 = sum(files * size for files, size, _ in samples)
+    s22 = sum(size * size for _, size, _ in samples)
+    t1 = sum(files * seconds for files, _, seconds in samples)
+    t2 = sum(size * seconds for _, size, seconds in samples)
+    det = s11 * s22 - s12 * s12
+    if det > 1e-9 * s11 * s22:
+        a = (t1 * s22 - t2 * s12) / det
+        b = (s11 * t2 - s12 * t1) / det
+        if a >= 0 and b >= 0:
+            return a, b
+    total_files = sum(files for files, _, _ in samples)
+    return (sum(seconds for _, _, seconds in samples) / total_files if total_files else 0.0), 0.0
+
+
+def estimate_seconds(plan, history):
+    """按历史报告估计计划的清理+复制耗时，返回 (秒数, 参考的报告数)；没有可用的报告时秒数为 None"""
+    samples = [(files, size, seconds) for files, size, seconds, _, _ in history if files]
+    if not samples:
+        return None, 0
+    per_file, per_byte = _fit(samples)
+    totals = plan.totals()
+    processed = sum(totals[action][0] for action in (COPY, OVERWRITE, SKIP))
+    written = totals[COPY][1] + totals[OVERWRITE][1]
+    seconds = per_file * processed + per_byte * written
+
+    deleted = sum(count for _, _, _, count, _ in history)
+    if deleted:
+        seconds += totals[DELETE][0] * sum(clean for _, _, _, _, clean in history) / deleted
+    return seconds, len(samples)
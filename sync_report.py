@@ -0,0 +1,194 @@
+"""同步运行报告：按同步项和阶段统计耗时、文件数、字节数与吞吐，记录最慢的文件
+
+每次同步结束后写入 Data/logs/sync_<时间>_<微秒>[_<label>].json，只保留最近 MAX_REPORTS 份；
+文件以独占方式新建，同一时刻开始的多次运行（如 sync_async 中并行的任务）名称相同时加序号，不会互相覆盖。
+界面的刷新耗时以 "ui" 阶段单独记录，便于区分慢在扫描、清理、复制还是界面刷新。
+
+报告内容：
+    phases         各阶段的实际耗时（scan / clean / copy / ui）
+    entries        每个同步项各阶段的耗时、文件数、字节数与吞吐；
+                   scan 为扫描到的文件，clean 的文件数为删除的文件，copy 的文件数为比对过的文件、字节数为实际写入的字节，
+                   copy 耗时是各文件处理耗时之和（多线程时大于实际耗时）
+    slowest_files  处理最慢的若干个文件
+    verify         开启同步后校验时的结果与不一致的文件（见 sync_verify.py），verify 阶段耗时同样计入 phases/entries
+
+深入分析时可开启 cProfile（命令行 --profile，或设置环境变量 AUTOMOVE_PROFILE=1），
+在报告旁边另存 .prof 原始数据与按累计耗时排序的 .txt 摘要。
+只分析同步线程本身，复制线程池中的调用不会出现在结果中；需要完整调用栈时把线程数设为 1。
+"""
+import cProfile
+import heapq
+import io
+import itertools
+import json
+import marshal
+import os
+import pstats
+import threading
+import time
+from contextlib import contextmanager
+
+import sync_engine
+
+LOG_DIR_NAME = "logs"
+MAX_REPORTS = 50
+SLOWEST_FILES = 10
+PROFILE_ENV = "AUTOMOVE_PROFILE"
+
+
+def entry_key(task):
+    """报告中同步项的名称，批量导入时带上方案名"""
+    return f"{task['scheme']}/{task['name']}" if task.get("scheme") else task["name"]
+
+
+def _throughput(seconds, files, size):
+    return {
+        "seconds": round(seconds, 4),
+        "files": files,
+        "bytes": size,
+        "files_per_s": round(files / seconds, 1) if seconds else None,
+        "mb_per_s": round(size / 1024 / 1024 / seconds, 2) if seconds else None,
+    }
+
+
+class RunReport(sync_engine.PhaseTimer):
+    """一次同步的运行报告，可直接作为 run_sync 的 timer 传入"""
+
+    def __init__(self, slowest=SLOWEST_FILES, label=None):
+        super().__init__()
+        self.label = label  # 附加在文件名中，区分同时进行的多次运行
+        self.entries = {}  # 同步项 -> {阶段: [耗时, 文件数, 字节数]}
+        self.slowest = slowest
+        self.slow_files = []  # 小顶堆 (耗时, 路径, 大小, 同步项)
+        self.started = time.time()
+        self.elapsed = None
+        self.stats = None
+        self.verify = None
+        self.profile_path = None
+        self._base = None  # 已占用的文件名（不含扩展名），报告与 cProfile 文件共用
+        self._start = time.perf_counter()
+        self._lock = threading.Lock()
+
+    def record(self, task, phase, seconds, files=0, size=0):
+        with self._lock:
+            totals = self.entries.setdefault(entry_key(task), {}).setdefault(phase, [0.0, 0, 0])
+            totals[0] += seconds
+            totals[1] += files
+            totals[2] += size
+
+    def record_file(self, task, path, size, seconds):
+        item = (seconds, path, size, entry_key(task))
+        with self._lock:
+            if len(self.slow_files) < self.slowest:
+                heapq.heappush(self.slow_files, item)
+            elif seconds > self.slow_files[0][0]:
+                heapq.heapreplace(self.slow_files, item)
+
+    def finish(self, stats=None, verify=None):
+        """同步结束（含取消、出错）时调用，记录总耗时、统计结果与校验结果（sync_verify.VerifyResult）"""
+        self.elapsed = time.perf_counter() - self._start
+        self.stats = stats
+        self.verify = verify
+        return self
+
+    def to_dict(self):
+        elapsed = self.elapsed if self.elapsed is not None else time.perf_counter() - self._start
+        entries = {
+            name: {phase: _throughput(*totals) for phase, totals in phases.items()}
+            for name, phases in self.entries.items()
+        }
+        return {
+            "started": time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(self.started)),
+            "elapsed": round(elapsed, 4),
+            "phases": {name: round(seconds, 4) for name, seconds in self.phases.items()},
+            "entries": entries,
+            "slowest_files": [
+                {"path": path, "entry": entry, "bytes": size, "seconds": round(seconds, 4)}
+                for seconds, path, size, entry in sorted(self.slow_files, reverse=True)
+            ],
+            "stats": self.stats.as_dict() if self.stats is not None else None,
+            "verify": self.verify.as_dict() if self.verify is not None else None,
+            "profile": self.profile_path,
+        }
+
+    def summary(self):
+        """界面显示用的简短摘要：各阶段耗时、复制吞吐与最慢的文件"""
+        lines = ["耗时：" + "，".join(f"{name} {seconds:.2f}s" for name, seconds in self.phases.items())]
+        copy_seconds = sum(phases.get("copy", [0.0])[0] for phases in self.entries.values())
+        copy_files = sum(phases.get("copy", [0, 0])[1] for phases in self.entries.values())
+        copy_bytes = sum(phases.get("copy", [0, 0, 0])[2] for phases in self.entries.values())
+        if copy_seconds:
+            lines.append(f"比对/复制：{copy_files / copy_seconds:.0f} 文件/s，"
+                         f"写入 {sync_engine.format_size(copy_bytes)}（{copy_bytes / 1024 / 1024 / copy_seconds:.1f} MB/s）")
+        if self.verify is not None:
+            lines.append(str(self.verify))
+        if self.slow_files:
+            seconds, path, _, _ = max(self.slow_files)
+            lines.append(f"最慢文件：{os.path.basename(path)} {seconds:.2f}s")
+        return "\n".join(lines)
+
+    def _create(self, log_dir, ext, binary=False):
+        """在 log_dir 中独占地新建本次运行的 <文件名><ext>，已存在时换一个序号，返回 (文件对象, 路径)"""
+        os.makedirs(log_dir, exist_ok=True)
+        stamp = time.strftime("sync_%Y%m%d_%H%M%S", time.localtime(self.started))
+        stamp = os.path.join(log_dir, f"{stamp}_{int(self.started * 1e6) % 1000000:06d}")
+        if self.label:
+            stamp += f"_{self.label}"
+        # 先用 cProfile 文件已占用的名称，报告与之同名
+        reserved = [self._base] if self._base and os.path.dirname(self._base) == log_dir else []
+        for base in itertools.chain(reserved, [stamp], (f"{stamp}_{index}" for index in itertools.count(2))):
+            try:
+                f = open(base + ext, 'xb' if binary else 'x', **({} if binary else {"encoding": "utf-8"}))
+            except FileExistsError:
+                continue
+            self._base = base
+            return f, base + ext
+
+    def save(self, log_dir):
+        """写入 log_dir 中新建的报告文件并清理过旧的报告，返回报告路径"""
+        f, path = self._create(log_dir, ".json")
+        with f:
+            json.dump(self.to_dict(), f, ensure_ascii=False, indent=2)
+        prune_reports(log_dir)
+        return path
+
+    @contextmanager
+    def profile(self, log_dir, enabled=None):
+        """enabled 为 None 时由环境变量 AUTOMOVE_PROFILE 决定是否开启 cProfile"""
+        if enabled is None:
+            enabled = bool(os.environ.get(PROFILE_ENV))
+        if not enabled:
+            yield
+            return
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            yield
+        finally:
+            profiler.disable()
+            # 与 Profile.dump_stats 相同的格式，但以独占方式新建文件
+            f, self.profile_path = self._create(log_dir, ".prof", binary=True)
+            with f:
+                profiler.create_stats()
+                marshal.dump(profiler.stats, f)
+            text = io.StringIO()
+            pstats.Stats(profiler, stream=text).sort_stats("cumulative").print_stats(40)
+            with open(self._base + ".txt", 'w', encoding='utf-8') as f:
+                f.write(text.getvalue())
+
+
+def log_dir_for(config_dir):
+    """报告目录：Data/logs"""
+    return os.path.join(config_dir, LOG_DIR_NAME)
+
+
+def prune_reports(log_dir, keep=MAX_REPORTS):
+    """只保留最近 keep 份报告（连同同名的 cProfile 文件）"""
+    names = sorted(name for name in os.listdir(log_dir) if name.startswith("sync_") and name.endswith(".json"))
+    for name in names[:-keep] if keep else names:
+        base = os.path.join(log_dir, name[:-len(".json")])
+        for ext in (".json", ".prof", ".txt"):
+            try:
+                os.remove(base + ext)
+            except FileNotFoundError:
+                pass
@@ -0,0 +1,198 @@
+"""同步规则：path_config.json 同步项中的 "rules" 与子文件夹选择，编译后在扫描时使用
+
+规则格式（所有字段都可省略）：
+    "rules": {
+        "include": ["Textures/**", "*.bundle"],      只同步匹配的文件（不影响目录遍历）
+        "exclude": ["*.meta", "Editor/", "/Temp", "re:\\.bak\\d*$"],
+        "extensions": [".png", ".bundle"],           只同步这些扩展名（不区分大小写）
+        "exclude_extensions": [".tmp"],
+        "min_size": 1,                               字节数，或 "512KB"、"10MB"、"1GB"
+        "max_size": "200MB"
+    }
+
+模式写法与 .gitignore 相近，匹配相对于同步项源目录、以 / 分隔的路径：
+    不含 /（结尾的 / 除外）      匹配任意深度的文件或文件夹名，如 "*.meta"、"Editor"
+    含 /                        从同步项根目录开始匹配整个路径，如 "/Temp"、"Art/*/Raw"
+    结尾 /                       只匹配文件夹
+    * 与 ? 不跨越 /，** 可跨越多级目录；"re:" 开头的按正则表达式在路径中搜索
+被排除的文件夹在扫描时整个剪掉，不会进入遍历。
+
+子文件夹选择（subdir_vars）的键是相对于源目录的文件夹路径，取消勾选的文件夹只在该位置被剪掉，
+其他层级中的同名文件夹不受影响。
+
+所有模式在编译时合并：不含通配符的名称与路径放入集合，其余合并为一个正则表达式，
+匹配开销不随模式数量成倍增长。
+"""
+import json
+import os
+import re
+
+_SIZE_UNITS = {"B": 1, "KB": 1024, "MB": 1024 ** 2, "GB": 1024 ** 3}
+_SIZE_PATTERN = re.compile(r"^\s*(\d+(?:\.\d+)?)\s*([KMG]?B)?\s*$", re.IGNORECASE)
+_REGEX_PREFIX = "re:"
+
+
+def parse_size(value):
+    """把 1024、"512KB"、"10MB" 这类写法换算为字节数"""
+    if value is None or isinstance(value, int):
+        return value
+    match = _SIZE_PATTERN.match(str(value))
+    if not match:
+        raise ValueError(f"无法识别的大小: {value}")
+    return int(float(match.group(1)) * _SIZE_UNITS[(match.group(2) or "B").upper()])
+
+
+def glob_to_regex(pattern):
+    """把 glob 模式转为正则表达式片段：* 与 ? 不跨越 /，** 跨越多级目录"""
+    out = []
+    i, n = 0, len(pattern)
+    while i < n:
+        if pattern.startswith("**/", i):
+            out.append("(?:.*/)?")
+            i += 3
+            continue
+        if pattern.startswith("**", i):
+            out.append(".*")
+            i += 2
+            continue
+        c = pattern[i]
+        if c == "*":
+            out.append("[^/]*")
+        elif c == "?":
+            out.append("[^/]")
+        elif c == "[" and "]" in pattern[i + 2:]:
+            j = pattern.index("]", i + 2)
+            body = pattern[i + 1:j]
+            if body.startswith("!"):
+                body = "^" + body[1:]
+            out.append("[" + body.replace("\\", "\\\\") + "]")
+            i = j + 1
+            continue
+        else:
+            out.append(re.escape(c))
+        i += 1
+    return "".join(out)
+
+
+def _combine(pieces, anchored=True):
+    if not pieces:
+        return None
+    body = "|".join(f"(?:{piece})" for piece in pieces)
+    return re.compile(rf"\A(?:{body})\Z" if anchored else body)
+
+
+class Matcher:
+    """一组模式编译后的匹配器：名称与路径的字面量走集合，通配符与正则各合并为一个表达式"""
+
+    def __init__(self, patterns):
+        names, paths, name_globs, path_globs, regexes = set(), set(), [], [], []
+        for pattern in patterns:
+            if pattern.startswith(_REGEX_PREFIX):
+                regexes.append(pattern[len(_REGEX_PREFIX):])
+                continue
+            body = pattern.rstrip("/")
+            anchored = "/" in body
+            body = body.lstrip("/")
+            literal = not any(ch in body for ch in "*?[")
+            if anchored:
+                (paths.add(body) if literal else path_globs.append(glob_to_regex(body)))
+            else:
+                (names.add(body) if literal else name_globs.append(glob_to_regex(body)))
+        self.names = frozenset(names)
+        self.paths = frozenset(paths)
+        self.name_re = _combine(name_globs)
+        self.path_re = _combine(path_globs)
+        try:
+            self.search_re = _combine(regexes, anchored=False)
+        except re.error as e:
+            raise ValueError(f"同步规则中的正则表达式有误: {e}")
+        self.empty = not (names or paths or name_globs or path_globs or regexes)
+
+    def match(self, rel, name):
+        """rel 为以 / 分隔的相对路径，name 为最后一级名称"""
+        return (
+            name in self.names
+            or rel in self.paths
+            or (self.name_re is not None and self.name_re.match(name) is not None)
+            or (self.path_re is not None and self.path_re.match(rel) is not None)
+            or (self.search_re is not None and self.search_re.search(rel) is not None)
+        )
+
+
+def _extensions(values):
+    return frozenset(ext.lower() if ext.startswith(".") else "." + ext.lower() for ext in values or ())
+
+
+class RuleSet:
+    """一个同步项编译后的规则：dir_allowed 决定是否进入文件夹，file_allowed/size_allowed 决定文件是否参与同步"""
+
+    def __init__(self, rules=None, subdir_vars=None):
+        self.rules = rules or {}
+        unknown = set(self.rules) - {"include", "exclude", "extensions", "exclude_extensions", "min_size", "max_size"}
+        if unknown:
+            raise ValueError(f"未知的同步规则: {', '.join(sorted(unknown))}")
+        self.excluded_dirs = frozenset(
+            rel.replace("\\", "/").strip("/") for rel, value in (subdir_vars or {}).items() if not value
+        )
+        exclude = self.rules.get("exclude", [])
+        self.exclude_dirs = Matcher(exclude)
+        self.exclude_files = Matcher([pattern for pattern in exclude if not pattern.endswith("/")])
+        self.include = Matcher(self.rules.get("include", []))
+        self.extensions = _extensions(self.rules.get("extensions"))
+        self.exclude_extensions = _extensions(self.rules.get("exclude_extensions"))
+        self.min_size = parse_size(self.rules.get("min_size"))
+        self.max_size = parse_size(self.rules.get("max_size"))
+        self.key = (json.dumps(self.rules, sort_keys=True), self.excluded_dirs)
+        self.has_size_limits = self.min_size is not None or self.max_size is not None
+        self.empty = not (self.excluded_dirs or self.rules)
+
+    @staticmethod
+    def _posix(rel):
+        return rel.replace(os.sep, "/") if os.sep != "/" else rel
+
+    def dir_allowed(self, rel, name):
+        """是否进入该文件夹；返回 False 时整个子树被剪掉"""
+        rel = self._posix(rel)
+        return rel not in self.excluded_dirs and not self.exclude_dirs.match(rel, name)
+
+    def file_allowed(self, rel, name):
+        """按路径、名称与扩展名判断文件是否参与同步（不含大小限制）"""
+        rel = self._posix(rel)
+        if self.exclude_files.match(rel, name):
+            return False
+        if self.extensions or self.exclude_extensions:
+            ext = os.path.splitext(name)[1].lower()
+            if ext in self.exclude_extensions or (self.extensions and ext not in self.extensions):
+                return False
+        return self.include.empty or self.include.match(rel, name)
+
+    def size_allowed(self, size):
+        return (self.min_size is None or size >= self.min_size) and (self.max_size is None or size <= self.max_size)
+
+    def path_allowed(self, rel):
+        """rel 的每一级上级文件夹都未被剪掉"""
+        parts = rel.split(os.sep)
+        for i in range(1, len(parts)):
+            if not self.dir_allowed(os.sep.join(parts[:i]), parts[i - 1]):
+                return False
+        return True
+
+    @classmethod
+    def common(cls, rulesets):
+        """多个同步项共用一次扫描时的规则：只保留所有同步项都会剪掉的文件夹，以及完全相同的规则"""
+        first = rulesets[0]
+        if all(ruleset.key == first.key for ruleset in rulesets):
+            return first
+        rules = first.rules if all(ruleset.rules == first.rules for ruleset in rulesets) else None
+        excluded = frozenset.intersection(*(ruleset.excluded_dirs for ruleset in rulesets))
+        return cls(rules, {rel: False for rel in excluded})
+
+
+def compile_task(task):
+    """编译同步项的规则并保存在 task["ruleset"]，同一次同步中只编译一次"""
+    if "ruleset" not in task:
+        try:
+            task["ruleset"] = RuleSet(task.get("rules"), task.get("subdir_vars"))
+        except ValueError as e:
+            raise ValueError(f"{task['name']}: {e}")
+    return task["ruleset"]
@@ -0,0 +1,223 @@
+"""同步后校验：逐个比较目标文件与源文件，找出缺失、截断或内容不一致的文件
+
+校验范围是刚同步过的同步项（run_sync 之后 task["manifest"] 中的源文件及其在目标中的对应文件）：
+    size  只比较大小，几乎不读磁盘，能发现缺失与截断
+    hash  大小相同的再比较内容哈希（与 sync_engine.file_digest 相同的 blake2b）
+
+为了让几 GB 的目录在几秒内校验完：
+    大小不同的文件直接判定不一致，不再读取
+    多个线程并行计算哈希，每个线程复用一块固定大小的读缓冲，内存占用为 线程数 × VERIFY_CHUNK_SIZE
+    同一源文件写入多个目标时源文件只计算一次
+    目标与源文件（硬链接复制方式）或对象库中的对象是同一个文件时无需读取
+    源文件大小与修改时间未变时沿用已知的哈希：扫描缓存（scan_cache.py）与对象库索引中的记录；
+    本次算出的源文件哈希写回扫描缓存，下次校验只需读取目标
+目标文件总是重新读取（包括块级更新原地写入的文件），以便发现写坏的块与磁盘上的损坏。
+"""
+import hashlib
+import os
+import threading
+import time
+
+import sync_engine
+
+# 校验时每次读取的字节数
+VERIFY_CHUNK_SIZE = 4 * 1024 * 1024
+VERIFY_MODES = ("size", "hash")
+# 报告与界面中最多列出的不一致文件数
+MAX_LISTED = 200
+
+_buffers = threading.local()
+
+
+def fast_digest(path):
+    """分块读取文件计算哈希，结果与 sync_engine.file_digest 相同；每个线程复用同一块缓冲区"""
+    buf = getattr(_buffers, "buf", None)
+    if buf is None:
+        buf = _buffers.buf = bytearray(VERIFY_CHUNK_SIZE)
+    view = memoryview(buf)
+    h = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb', buffering=0) as f:
+        while True:
+            n = f.readinto(buf)
+            if not n:
+                break
+            h.update(view[:n])
+    return h.hexdigest()
+
+
+class VerifyResult:
+    """一次校验的结果：mismatches 为 [(方案, 同步项, 目标文件, 原因)]"""
+
+    def __init__(self, mode):
+        self.mode = mode
+        self.checked = 0
+        self.hashed = 0  # 实际读取计算哈希的文件数（源与目标分别计）
+        self.hashed_bytes = 0
+        self.reused = 0  # 沿用已知哈希或确认为同一文件而免去读取的次数
+        self.mismatches = []
+        self.seconds = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def ok(self):
+        return not self.mismatches
+
+    def add_hashed(self, size):
+        with self._lock:
+            self.hashed += 1
+            self.hashed_bytes += size
+
+    def add_reused(self):
+        with self._lock:
+            self.reused += 1
+
+    def as_dict(self):
+        return {
+            "mode": self.mode,
+            "ok": self.ok,
+            "checked": self.checked,
+            "hashed": self.hashed,
+            "hashed_bytes": self.hashed_bytes,
+            "reused": self.reused,
+            "seconds": round(self.seconds, 3),
+            "mismatch_count": len(self.mismatches),
+            "mismatches": [
+                {"scheme": scheme, "entry": name, "path": path, "reason": reason}
+                for scheme, name, path, reason in self.mismatches[:MAX_LISTED]
+            ],
+        }
+
+    def __str__(self):
+        text = f"校验 {self.checked} 个文件，不一致 {len(self.mismatches)} 个，耗时 {self.seconds:.2f}s"
+        if self.mode == "hash":
+            text += f"（读取 {self.hashed} 个 {sync_engine.format_size(self.hashed_bytes)}，免读 {self.reused} 次）"
+        return text
+
+
+class _Verifier:
+    def __init__(self, mode, result, cache=None, store=None):
+        self.mode = mode
+        self.result = result
+        self.cache = cache
+        self.store = store
+
+    def known_source_digest(self, path, entry):
+        """源文件大小与修改时间未变时已知的哈希，没有时返回 None"""
+        if self.cache is not None:
+            digest = self.cache.file_digest(path, entry.size, entry.mtime_ns)
+            if digest is not None:
+                return digest
+        if self.store is not None:
+            cached = self.store.index.get(sync_engine.path_key(path))
+            if cached is not None and cached[0] == entry.size and cached[1] == entry.mtime_ns:
+                return cached[2]
+        return None
+
+    def source_digest(self, path, entry):
+        digest = self.known_source_digest(path, entry)
+        if digest is not None:
+            self.result.add_reused()
+            return digest
+        digest = fast_digest(path)
+        self.result.add_hashed(entry.size)
+        if self.cache is not None:
+            self.cache.remember_digest(path, entry.size, entry.mtime_ns, digest)
+        return digest
+
+    @staticmethod
+    def same_file(path, st):
+        """目标与该路径（源文件或对象库中的对象）是同一个文件"""
+        try:
+            other = os.stat(path)
+        except OSError:
+            return False
+        return (other.st_ino, other.st_dev) == (st.st_ino, st.st_dev)
+
+    def check(self, job):
+        """校验一个源文件对应的所有目标，返回 [(同步项, 目标文件, 原因)]"""
+        src_path, entry, targets = job
+        problems = []
+        hashing = []
+        for task, dst_path in targets:
+            try:
+                st = os.stat(dst_path)
+            except FileNotFoundError:
+                problems.append((task, dst_path, "目标文件缺失"))
+                continue
+            if st.st_size != entry.size:
+                problems.append((task, dst_path, f"大小不同：源 {entry.size}，目标 {st.st_size}"))
+            elif self.mode == "hash":
+                hashing.append((task, dst_path, st))
+        if not hashing:
+            return problems
+
+        src_digest = None
+        for task, dst_path, st in hashing:
+            if self.same_file(src_path, st):
+                self.result.add_reused()
+                continue
+            if src_digest is None:
+                src_digest = self.source_digest(src_path, entry)
+            if self.store is not None and self.same_file(self.store.object_path(src_digest), st):
+                self.result.add_reused()
+                continue
+            dst_digest = fast_digest(dst_path)
+            self.result.add_hashed(st.st_size)
+            if dst_digest != src_digest:
+                problems.append((task, dst_path, "内容不同"))
+        return problems
+
+
+def _build_jobs(tasks):
+    """按源文件分组：(源文件, 清单项, [(同步项, 目标文件)])，同一源文件的多个目标只计算一次源文件哈希"""
+    jobs = {}
+    for task in tasks:
+        manifest = task["manifest"]
+        src_root = sync_engine.path_key(manifest.root)
+        for rel, entry in manifest.files.items():
+            key = os.path.join(src_root, rel)
+            if key not in jobs:
+                jobs[key] = (os.path.join(manifest.root, rel), entry, [])
+            jobs[key][2].append((task, os.path.join(task["dst"], rel)))
+    # 大文件先开始，避免最后只剩一个线程在读大文件
+    return sorted(jobs.values(), key=lambda job: job[1].size, reverse=True)
+
+
+def verify(tasks, mode="hash", workers=sync_engine.DEFAULT_WORKERS, progress=None, cancel=None, timer=None,
+           cache=None, store=None):
+    """校验已同步的同步项（需已由 run_sync 扫描，含 task["manifest"]），返回 VerifyResult
+
+    mode 为 "size" 时只比较大小，"hash" 时大小相同的再比较内容哈希；
+    progress(src_file, size) 每校验完一个源文件调用一次，cancel 被设置时抛出 sync_engine.SyncCancelled；
+    timer 为 PhaseTimer（或 sync_report.RunReport）时记录 verify 阶段及各同步项的耗时；
+    cache、store 分别为扫描缓存与对象库，用于沿用已知的源文件哈希，由调用方负责保存扫描缓存。
+    """
+    if mode not in VERIFY_MODES:
+        raise ValueError(f"未知的校验方式: {mode}")
+    timer = timer or sync_engine.PhaseTimer()
+    result = VerifyResult(mode)
+    verifier = _Verifier(mode, result, cache, store)
+    start = time.perf_counter()
+
+    def timed_check(job):
+        job_start = time.perf_counter()
+        return verifier.check(job), time.perf_counter() - job_start
+
+    def on_done(job, outcome, error):
+        src_path, entry, targets = job
+        result.checked += len(targets)
+        if error is not None:
+            problems, seconds = [(task, dst_path, f"读取失败：{error}") for task, dst_path in targets], 0.0
+        else:
+            problems, seconds = outcome
+        for task, dst_path, reason in problems:
+            result.mismatches.append((task.get("scheme"), task["name"], dst_path, reason))
+        for task, _ in targets:
+            timer.record(task, "verify", seconds, 1, entry.size)
+        if progress:
+            progress(src_path, entry.size)
+
+    with timer.phase("verify"):
+        sync_engine.run_parallel(timed_check, _build_jobs(tasks), workers, on_done, cancel)
+    result.seconds = time.perf_counter() - start
+    return result
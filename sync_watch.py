@@ -0,0 +1,243 @@
+"""监视模式：Data 目录变化时只把受影响的路径同步到AS工程
+
+Linux 上用 inotify（通过 ctypes 调用 libc，无需第三方库），其他平台或 inotify 不可用时
+（如监视数量达到 fs.inotify.max_user_watches 上限）改为定时扫描比对。
+
+Unity 一次导出会在短时间内写入成千上万个文件：变化的路径先合并去重，
+直到 debounce 秒内没有新的变化（或累计等待超过 MAX_BATCH_WAIT 秒）才作为一批交给
+sync_engine.sync_changes，一批中的文件仍由复制线程池并行处理。
+同步规则与“开始导入”相同：遵循各同步项的 mode、rules 与 subdir_vars，default模式删除源中已删除的路径。
+"""
+import ctypes
+import ctypes.util
+import errno
+import os
+import select
+import struct
+import sys
+import threading
+import time
+
+import sync_engine
+
+DEFAULT_DEBOUNCE = 0.5
+# 持续有变化时最多等待多久就先同步一批，避免长时间导出期间目标一直不更新
+MAX_BATCH_WAIT = 5.0
+POLL_INTERVAL = 2.0
+
+# inotify 事件（<sys/inotify.h>）
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+# 不监听 IN_MODIFY：写入过程中的每次 write 都会产生事件，等 IN_CLOSE_WRITE 即可
+WATCH_MASK = (IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+              | IN_DELETE_SELF | IN_MOVE_SELF)
+EVENT_HEADER = struct.Struct("iIII")
+READ_SIZE = 1024 * 1024
+
+
+def _load_libc():
+    if not sys.platform.startswith("linux"):
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        libc.inotify_init1, libc.inotify_add_watch, libc.inotify_rm_watch
+    except (OSError, AttributeError):
+        return None
+    return libc
+
+
+_libc = _load_libc()
+HAS_INOTIFY = _libc is not None
+
+
+class InotifyWatcher:
+    """递归监视多个源目录，read() 返回这段时间内变化的路径集合；事件队列溢出时返回 None"""
+
+    def __init__(self, roots):
+        self.roots = roots
+        self.fd = _libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 失败")
+        self.watches = {}  # wd -> 目录路径
+        for root in roots:
+            if os.path.isdir(root):
+                self._add_tree(root)
+
+    def _add_watch(self, path):
+        wd = _libc.inotify_add_watch(self.fd, os.fsencode(path), WATCH_MASK)
+        if wd < 0:
+            err = ctypes.get_errno()
+            if err in (errno.ENOENT, errno.ENOTDIR):
+                return  # 遍历过程中已被删除
+            # ENOSPC：监视数量达到上限，由调用方改用轮询
+            raise OSError(err, f"无法监视目录 {path}: {os.strerror(err)}")
+        self.watches[wd] = path
+
+    def _add_tree(self, root):
+        self._add_watch(root)
+        for dirpath, dirnames, _ in os.walk(root):
+            for name in dirnames:
+                self._add_watch(os.path.join(dirpath, name))
+
+    def _forget_tree(self, path):
+        prefix = path + os.sep
+        for wd, watched in list(self.watches.items()):
+            if watched == path or watched.startswith(prefix):
+                _libc.inotify_rm_watch(self.fd, wd)
+                del self.watches[wd]
+
+    def read(self, timeout):
+        changed = set()
+        watched = set(self.watches.values())
+        for root in self.roots:
+            # 源目录被删除后重新出现（整体重新导出）：重新监视并整体同步
+            if root not in watched and os.path.isdir(root):
+                self._add_tree(root)
+                changed.add(root)
+        if not select.select([self.fd], [], [], timeout)[0]:
+            return changed
+        while True:
+            try:
+                data = os.read(self.fd, READ_SIZE)
+            except BlockingIOError:
+                return changed
+            offset = 0
+            while offset < len(data):
+                wd, mask, _, length = EVENT_HEADER.unpack_from(data, offset)
+                offset += EVENT_HEADER.size
+                name = data[offset:offset + length].rstrip(b"\0")
+                offset += length
+                if mask & IN_Q_OVERFLOW:
+                    return None
+                parent = self.watches.get(wd)
+                if parent is None:
+                    continue
+                if mask & IN_IGNORED:
+                    del self.watches[wd]
+                    continue
+                path = os.path.join(parent, os.fsdecode(name)) if name else parent
+                changed.add(path)
+                if mask & IN_ISDIR and mask & (IN_CREATE | IN_MOVED_TO):
+                    # 新目录在加上监视之前写入的文件由同步时扫描整个子目录补上
+                    self._add_tree(path)
+                elif mask & IN_ISDIR and mask & IN_MOVED_FROM:
+                    self._forget_tree(path)
+
+    def close(self):
+        os.close(self.fd)
+
+
+class PollingWatcher:
+    """定时扫描源目录并与上一次的清单比对，返回新增、删除、大小或修改时间变化的路径"""
+
+    def __init__(self, roots, interval=POLL_INTERVAL, stop=None):
+        self.roots = roots
+        self.interval = interval
+        self.stop = stop or threading.Event()
+        self.snapshots = {root: (os.path.isdir(root), sync_engine.scan_tree(root)) for root in roots}
+
+    def read(self, timeout):
+        # 轮询间隔与 debounce 无关：扫描本身有开销，不随 debounce 缩短
+        if self.stop.wait(self.interval):
+            return set()
+        changed = set()
+        for root in self.roots:
+            existed, old = self.snapshots[root]
+            try:
+                exists, new = os.path.isdir(root), sync_engine.scan_tree(root)
+            except (FileNotFoundError, NotADirectoryError):
+                continue  # 扫描途中有文件被删除，保留上一次的清单，下次再比对
+            self.snapshots[root] = (exists, new)
+            if exists != existed:
+                changed.add(root)
+                continue
+            for rel in old.files.keys() ^ new.files.keys():
+                changed.add(os.path.join(root, rel))
+            for rel in old.files.keys() & new.files.keys():
+                a, b = old.files[rel], new.files[rel]
+                if a.size != b.size or a.mtime_ns != b.mtime_ns or a.mode != b.mode:
+                    changed.add(os.path.join(root, rel))
+            for rel in old.dirs ^ new.dirs:
+                changed.add(os.path.join(root, rel))
+        return changed
+
+    def close(self):
+        pass
+
+
+def open_watcher(roots, polling=False, interval=POLL_INTERVAL, stop=None):
+    """优先使用 inotify，不可用时退回轮询"""
+    roots = sorted({os.path.abspath(root) for root in roots})
+    if HAS_INOTIFY and not polling:
+        try:
+            return InotifyWatcher(roots)
+        except OSError:
+            pass
+    return PollingWatcher(roots, interval, stop)
+
+
+def watch(tasks, use_hash=False, workers=sync_engine.DEFAULT_WORKERS, debounce=DEFAULT_DEBOUNCE, stop=None,
+          on_batch=None, polling=False, poll_interval=POLL_INTERVAL, initial_sync=True, store=None,
+          delta=None):
+    """持续监视所有同步项的源目录，直到 stop（threading.Event）被设置
+
+    initial_sync 为 True 时先完整同步一次，保证开始监视时目标已是最新。
+    每同步完一批调用 on_batch(stats, changed, seconds, error)：changed 为变化的路径数
+    （None 表示事件丢失后整体重新同步），error 为该批失败时的错误信息。
+    某一批失败（如源目录正被删除重建）后，下一批改为整体同步。
+    store 为 object_store.ObjectStore 时目标硬链接到对象库，delta 为 delta_copy.DeltaCopier 时大文件按块更新，
+    每批结束后保存各自的索引与缓存。
+    """
+    stop = stop or threading.Event()
+    full = ready = initial_sync
+    pending = set()
+    first = last = None
+    watcher = open_watcher([task["src"] for task in tasks], polling, poll_interval, stop)
+    try:
+        while not stop.is_set():
+            if first is not None:
+                now = time.monotonic()
+                ready = ready or now - last >= debounce or now - first >= MAX_BATCH_WAIT
+            if ready:
+                start = time.monotonic()
+                changed = None if full else len(pending)
+                stats, error = None, None
+                try:
+                    if full:
+                        stats = sync_engine.run_sync(tasks, use_hash, workers, cancel=stop, store=store, delta=delta)
+                    else:
+                        stats = sync_engine.sync_changes(tasks, pending, use_hash, workers, cancel=stop, store=store,
+                                                         delta=delta)
+                    for saved in (store, delta):
+                        if saved is not None:
+                            saved.save()
+                except sync_engine.SyncCancelled:
+                    break
+                except Exception as e:
+                    error = str(e)
+                # 失败后（如源目录正被删除重建）等下一次变化时整体同步
+                full = error is not None
+                pending, first, last, ready = set(), None, None, False
+                if on_batch:
+                    on_batch(stats, changed, time.monotonic() - start, error)
+
+            paths = watcher.read(debounce if first is not None else 1.0)
+            if paths is None or paths:
+                # paths 为 None：事件队列溢出，丢失的变化只能靠整体同步补上
+                full = full or paths is None
+                pending |= paths or set()
+                last = time.monotonic()
+                first = last if first is None else first
+    finally:
+        watcher.close()
@@ -0,0 +1,71 @@
+"""命令行入口的回归测试"""
+import contextlib
+import io
+import json
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import cli  # noqa: E402
+
+
+def write(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(data)
+
+
+class CliTest(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp(prefix="automove_test_")
+        self.config_dir = os.path.join(self.root, "Data")
+        data_path = os.path.join(self.root, "Export")
+        self.as_path = os.path.join(self.root, "AS")
+        for i in range(5):
+            write(os.path.join(data_path, "unityLibrary", "src", "main", "assets", f"f{i}.bytes"), os.urandom(100))
+        scheme = {"data_path": data_path, "as_path": self.as_path, "selections": {"assets": True}}
+        write(os.path.join(self.config_dir, "schemes.json"), json.dumps({"A": scheme}).encode())
+
+    def tearDown(self):
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    def run_cli(self, *argv):
+        out = io.StringIO()
+        with contextlib.redirect_stdout(out):
+            code = cli.main(["--config-dir", self.config_dir, *argv])
+        return code, json.loads(out.getvalue())
+
+    def test_run_writes_report(self):
+        code, result = self.run_cli("A")
+        self.assertEqual(code, cli.EXIT_OK)
+        self.assertTrue(os.path.isfile(result["report"]))
+        self.assertIsNone(result["report_error"])
+        self.assertEqual(result["results"][0]["stats"]["copied"], 5)
+
+    def test_unwritable_log_dir_keeps_result(self):
+        # Data/logs 被同名文件占用，报告无法保存，同步结果与退出码照常输出
+        write(os.path.join(self.config_dir, "logs"), b"")
+        code, result = self.run_cli("A")
+        self.assertEqual(code, cli.EXIT_OK)
+        self.assertTrue(result["ok"])
+        self.assertIsNone(result["report"])
+        self.assertTrue(result["report_error"])
+        self.assertEqual(result["results"][0]["stats"]["copied"], 5)
+        self.assertTrue(os.path.isfile(os.path.join(self.as_path, "app", "src", "main", "assets", "f0.bytes")))
+
+        # 同步失败时仍以失败退出
+        os.remove(os.path.join(self.config_dir, "schemes.json"))
+        write(os.path.join(self.config_dir, "schemes.json"),
+              json.dumps({"A": {"data_path": os.path.join(self.root, "missing"), "as_path": self.as_path,
+                                "selections": {"assets": True}}}).encode())
+        code, result = self.run_cli("A")
+        self.assertEqual(code, cli.EXIT_FAILED)
+        self.assertTrue(result["report_error"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,103 @@
+"""复制后端的回归测试"""
+import errno
+import os
+import shutil
+import stat
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import copy_backends  # noqa: E402
+
+
+class CopyBackendsTest(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp(prefix="automove_test_")
+        self.src = os.path.join(self.root, "src.bin")
+        with open(self.src, 'wb') as f:
+            f.write(os.urandom(300 * 1024))
+        copy_backends._unsupported.clear()
+
+    def tearDown(self):
+        copy_backends._unsupported.clear()
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    def copy_with_error(self, code):
+        """copy_file_range 抛出 code 时复制一个文件，返回实际使用的方式"""
+        def fail(fd_src, fd_dst):
+            os.write(fd_dst, b"partial")
+            raise OSError(code, os.strerror(code))
+
+        dst = os.path.join(self.root, "dst.bin")
+        with mock.patch.dict(copy_backends._KERNEL_METHODS, {"copy_file_range": (True, fail)}):
+            used = copy_backends.copy_file(self.src, dst, "copy_file_range")
+        with open(self.src, 'rb') as f1, open(dst, 'rb') as f2:
+            self.assertEqual(f1.read(), f2.read())
+        return used
+
+    def test_per_file_errors_are_not_remembered(self):
+        for code in (errno.EBADF, errno.ETXTBSY):
+            self.assertEqual(self.copy_with_error(code), "copy")
+            self.assertEqual(copy_backends._unsupported, set())
+
+    def test_unsupported_pair_is_remembered(self):
+        self.assertEqual(self.copy_with_error(errno.EXDEV), "copy")
+        self.assertEqual({key[0] for key in copy_backends._unsupported}, {"copy_file_range"})
+
+    def assertMetadata(self, dst):
+        dst_st = os.stat(dst)
+        # 读取会更新源文件的访问时间，目标保留读取前的值
+        self.assertEqual((dst_st.st_atime_ns, dst_st.st_mtime_ns), (1_000_000_123, 2_000_000_456))
+        self.assertEqual(stat.S_IMODE(dst_st.st_mode), 0o640)
+        if hasattr(os, "listxattr"):
+            self.assertEqual(os.getxattr(dst, "user.automove"), b"tag")
+
+    def test_copy2_metadata(self):
+        os.chmod(self.src, 0o640)
+        os.utime(self.src, ns=(1_000_000_123, 2_000_000_456))
+        if hasattr(os, "listxattr"):
+            try:
+                os.setxattr(self.src, "user.automove", b"tag")
+            except OSError:
+                self.skipTest("文件系统不支持用户扩展属性")
+        for backend in ("auto", "copy"):
+            dst = os.path.join(self.root, backend + ".bin")
+            copy_backends.copy_file(self.src, dst, backend)
+            self.assertMetadata(dst)
+            os.utime(self.src, ns=(1_000_000_123, 2_000_000_456))
+
+        small = os.path.join(self.root, "small.bin")
+        with open(self.src, 'r+b') as f:
+            f.truncate(1000)
+        os.utime(self.src, ns=(1_000_000_123, 2_000_000_456))
+        targets = [os.path.join(self.root, "s1.bin"), os.path.join(self.root, "s2.bin")]
+        self.assertFalse(copy_backends.copy_small(self.src, [small], 1000, 2_000_000_000))
+        self.assertTrue(copy_backends.copy_small(self.src, targets, 1000, 2_000_000_456))
+        for dst in targets:
+            self.assertMetadata(dst)
+
+    def test_copy_small_new_target_already_exists(self):
+        # 扫描后才出现、且与其他文件共享数据的目标：改走临时文件+改名，不写入共享的数据
+        other, dst = os.path.join(self.root, "other.bin"), os.path.join(self.root, "new.bin")
+        with open(other, 'wb') as f:
+            f.write(b"keep")
+        os.link(other, dst)
+        with open(self.src, 'wb') as f:
+            f.write(b"new content")
+        st = os.stat(self.src)
+        self.assertTrue(copy_backends.copy_small(self.src, [dst], st.st_size, st.st_mtime_ns, [dst]))
+        with open(dst, 'rb') as f1, open(other, 'rb') as f2:
+            self.assertEqual((f1.read(), f2.read()), (b"new content", b"keep"))
+        self.assertFalse(os.path.exists(copy_backends.temp_path(dst)))
+
+    def test_other_errors_are_raised(self):
+        with self.assertRaises(OSError):
+            self.copy_with_error(errno.EIO)
+        self.assertFalse(os.path.exists(copy_backends.temp_path(os.path.join(self.root, "dst.bin"))))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,70 @@
+"""对象库的回归测试"""
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import copy_backends  # noqa: E402
+import object_store  # noqa: E402
+import sync_engine  # noqa: E402
+
+
+class ObjectStoreTest(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp(prefix="automove_test_")
+        self.store = object_store.ObjectStore(os.path.join(self.root, "objects"))
+        self.data = os.urandom(100 * 1024)
+        self.sources = []
+        for i in range(8):
+            path = os.path.join(self.root, f"src{i}.bin")
+            with open(path, 'wb') as f:
+                f.write(self.data)
+            self.sources.append(path)
+
+    def tearDown(self):
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    def entry(self, path):
+        st = os.stat(path)
+        return sync_engine.FileEntry(os.path.basename(path), st.st_size, st.st_mtime_ns, st.st_mode)
+
+    def stored_files(self):
+        return [name for _, _, files in os.walk(self.store.root) for name in files]
+
+    def test_concurrent_put(self):
+        # 第一个线程放入对象并已硬链接到目标后，第二个线程才发布（它在对象出现之前检查过是否存在）
+        obj = self.store.put(self.sources[0], self.entry(self.sources[0]))
+        dst = os.path.join(self.root, "dst.bin")
+        copy_backends.copy_file(obj, dst, "hardlink")
+        with mock.patch.object(object_store.os.path, "exists", return_value=False):
+            self.assertEqual(self.store.put(self.sources[1], self.entry(self.sources[1])), obj)
+
+        self.assertTrue(os.path.samefile(dst, obj))
+        self.assertEqual(self.store.stored, 1)
+        self.assertEqual(self.store.gc(), (0, 0))
+        self.assertEqual(len(self.stored_files()), 1)
+
+    def test_parallel_puts_share_one_object(self):
+        barrier = threading.Barrier(len(self.sources))
+        copy_file = copy_backends.copy_file
+
+        def slow_copy(*args):
+            # 所有线程都已确认对象不存在、写好临时文件之后再一起发布
+            used = copy_file(*args)
+            barrier.wait()
+            return used
+
+        with mock.patch.object(object_store.copy_backends, "copy_file", side_effect=slow_copy):
+            sync_engine.run_parallel(lambda path: self.store.put(path, self.entry(path)), self.sources,
+                                     workers=len(self.sources))
+        self.assertEqual(self.store.stored, 1)
+        self.assertEqual(len(self.stored_files()), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
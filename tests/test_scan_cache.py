@@ -0,0 +1,54 @@
+"""扫描缓存的回归测试"""
+import os
+import shutil
+import sys
+import tempfile
+import time
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import scan_cache  # noqa: E402
+
+
+class ScanCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp(prefix="automove_test_")
+        self.folder = os.path.join(self.root, "Data")
+        os.makedirs(os.path.join(self.folder, "Pack"))
+        self.cache = scan_cache.ScanCache(os.path.join(self.root, scan_cache.CACHE_FILE_NAME))
+
+    def tearDown(self):
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    def add_file(self, name):
+        """新增文件，并把目录 mtime 恢复原值：模拟与上次扫描落在同一时间刻度内的改动"""
+        st = os.stat(self.folder)
+        with open(os.path.join(self.folder, name), 'wb') as f:
+            f.write(b"x")
+        os.utime(self.folder, ns=(st.st_atime_ns, st.st_mtime_ns))
+
+    def test_recent_directory_is_rescanned(self):
+        self.assertEqual(self.cache.list_dir(self.folder), (["Pack"], {}))
+        self.add_file("new.bytes")
+        dirs, files = self.cache.list_dir(self.folder)
+        self.assertEqual(list(files), ["new.bytes"])
+        self.assertEqual((self.cache.hits, self.cache.misses), (0, 2))
+        # 未经确认的列表仍可供界面显示子文件夹
+        self.assertEqual(self.cache.cached_subdirs(self.folder), ["Pack"])
+
+    def test_old_directory_is_cached(self):
+        old = time.time_ns() - 10 * scan_cache.RACY_WINDOW_NS
+        os.utime(self.folder, ns=(old, old))
+        self.cache.list_dir(self.folder)
+        self.assertEqual(self.cache.list_dir(self.folder), (["Pack"], {}))
+        self.assertEqual((self.cache.hits, self.cache.misses), (1, 1))
+
+        self.cache.save()
+        reloaded = scan_cache.ScanCache(self.cache.path).load()
+        self.assertEqual(reloaded.list_dir(self.folder), (["Pack"], {}))
+        self.assertEqual(reloaded.hits, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
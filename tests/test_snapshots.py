@@ -0,0 +1,101 @@
+"""同步前快照的回归测试"""
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import snapshots  # noqa: E402
+
+
+def write(path, data):
+    """与同步一样先写临时文件再改名，不改动快照中共用的数据"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path + ".new", 'wb') as f:
+        f.write(data)
+    os.replace(path + ".new", path)
+
+
+def tree(root):
+    result = {}
+    for dirpath, _, files in os.walk(root):
+        for name in files:
+            path = os.path.join(dirpath, name)
+            with open(path, 'rb') as f:
+                result[os.path.relpath(path, root)] = f.read()
+    return result
+
+
+class SnapshotStoreTest(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp(prefix="automove_test_")
+        self.dst = os.path.join(self.root, "project", "assets")
+        self.libs = os.path.join(self.root, "project", "libs")
+        for i in range(10):
+            write(os.path.join(self.dst, f"dir_{i % 2}", f"f{i}.bytes"), os.urandom(100 + i))
+        write(os.path.join(self.libs, "arm64", "libgame.so"), os.urandom(5000))
+        self.store = snapshots.SnapshotStore(os.path.join(self.root, "snapshots"), keep=2)
+
+    def tearDown(self):
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    def tasks(self):
+        return [
+            {"name": "assets", "scheme": "A", "src": "unused", "dst": self.dst, "mode": "default"},
+            {"name": "libs", "scheme": "B", "src": "unused", "dst": self.libs, "mode": "libs"},
+        ]
+
+    def test_restore_round_trip(self):
+        before_assets, before_libs = tree(self.dst), tree(self.libs)
+        snapshot = self.store.take(self.tasks())
+        self.assertEqual(snapshot.files, 11)
+        self.assertFalse(os.path.exists(os.path.join(snapshot.path, snapshots.INCOMPLETE_FILE_NAME)))
+        # 目标未变化时沿用上一个快照
+        self.assertEqual(self.store.take(self.tasks()).id, snapshot.id)
+
+        write(os.path.join(self.dst, "dir_0", "f0.bytes"), b"changed")
+        os.remove(os.path.join(self.dst, "dir_1", "f1.bytes"))
+        write(os.path.join(self.dst, "dir_2", "extra.bytes"), b"extra")
+        write(os.path.join(self.libs, "arm64", "libgame.so"), b"rebuilt")
+
+        stats = self.store.restore(self.store.get("latest"), schemes=["A"])
+        self.assertEqual(stats.errors, [])
+        self.assertEqual((stats.copied, stats.deleted), (2, 1))
+        self.assertEqual(tree(self.dst), before_assets)
+        self.assertNotEqual(tree(self.libs), before_libs)
+
+        self.store.restore(snapshot)
+        self.assertEqual(tree(self.libs), before_libs)
+        with self.assertRaises(KeyError):
+            self.store.restore(snapshot, schemes=["C"])
+
+    def test_prune_keeps_newest_and_unmarked_folders(self):
+        first = self.store.take(self.tasks())
+        write(os.path.join(self.dst, "a.bytes"), b"1")
+        second = self.store.take(self.tasks())
+        write(os.path.join(self.dst, "b.bytes"), b"2")
+        third = self.store.take(self.tasks())
+        self.assertEqual([snapshot.id for snapshot in self.store.list()], [third.id, second.id])
+        self.assertFalse(os.path.exists(first.path))
+
+        # 快照目录中的其他内容：名称像快照 ID 但没有未完成标记的文件夹、普通文件夹与文件
+        lookalike = os.path.join(self.store.root, "20200101_000000_000")
+        write(os.path.join(lookalike, "keep.txt"), b"user data")
+        write(os.path.join(self.store.root, "notes", "readme.txt"), b"notes")
+        write(os.path.join(self.store.root, "20200101_000000_001.txt"), b"file")
+        # 建立过程中被中断的快照
+        interrupted = os.path.join(self.store.root, "20200101_000000_002")
+        write(os.path.join(interrupted, "0", "f.bytes"), b"partial")
+        write(os.path.join(interrupted, snapshots.INCOMPLETE_FILE_NAME), b"")
+
+        self.assertEqual(self.store.prune(), ["20200101_000000_002"])
+        self.assertTrue(os.path.isfile(os.path.join(lookalike, "keep.txt")))
+        self.assertTrue(os.path.isdir(os.path.join(self.store.root, "notes")))
+        self.assertTrue(os.path.isfile(os.path.join(self.store.root, "20200101_000000_001.txt")))
+        self.assertEqual(len(self.store.list()), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
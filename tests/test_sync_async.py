@@ -0,0 +1,98 @@
+"""asyncio 接口（sync_async.SyncService）的回归测试"""
+import asyncio
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import sync_async  # noqa: E402
+import sync_engine  # noqa: E402
+
+
+def write(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(data)
+
+
+class GatedService(sync_async.SyncService):
+    """gated 中的任务在线程中先等 gate 打开再执行，用来让任务停在执行中"""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.gate = threading.Event()
+        self.gated = set()
+
+    def _execute(self, job, emitter):
+        if job.id in self.gated:
+            self.gate.wait(10)
+        return super()._execute(job, emitter)
+
+
+class SyncServiceTest(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp(prefix="automove_test_")
+        self.src = os.path.join(self.root, "src")
+        for i in range(6):
+            write(os.path.join(self.src, f"dir_{i % 2}", f"f{i}.bytes"), os.urandom(100 + i))
+
+    def tearDown(self):
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    def tasks(self, *dst):
+        return [{"name": "assets", "src": self.src, "dst": os.path.join(self.root, *dst), "mode": "default",
+                 "subdir_vars": {}}]
+
+    def test_overlapping_jobs_run_in_order(self):
+        events = []
+
+        async def main():
+            service = GatedService(max_jobs=2)
+            first = service.submit(self.tasks("out"), on_event=events.append)
+            service.gated.add(first.id)
+            nested = service.submit(self.tasks("out", "nested"), on_event=events.append)
+            other = service.submit(self.tasks("other"), on_event=events.append)
+            # 不重叠的任务不必等前面的任务结束
+            result = await other
+            self.assertEqual(result.stats.copied, 6)
+            self.assertEqual((first.state, nested.state), ("running", "queued"))
+            service.gate.set()
+            await nested
+            await service.close()
+            return first, nested
+
+        first, nested = asyncio.run(main())
+        order = [(event["job"], event["type"]) for event in events if event["type"] in ("started", "done")]
+        self.assertLess(order.index((first.id, "done")), order.index((nested.id, "started")))
+        self.assertTrue(os.path.isfile(os.path.join(self.root, "out", "nested", "dir_0", "f0.bytes")))
+
+    def test_cancel_running_and_queued_jobs(self):
+        async def main():
+            service = GatedService(max_jobs=1)
+            running = service.submit(self.tasks("out"))
+            service.gated.add(running.id)
+            queued = service.submit(self.tasks("other"))
+            await asyncio.sleep(0.05)
+            self.assertEqual((running.state, queued.state), ("running", "queued"))
+            queued.cancel()
+            with self.assertRaises(sync_engine.SyncCancelled):
+                await queued
+            running.cancel()
+            service.gate.set()
+            with self.assertRaises(sync_engine.SyncCancelled):
+                await running
+            await service.close()
+            return running, queued
+
+        running, queued = asyncio.run(main())
+        self.assertEqual((running.final["type"], queued.final["type"]), ("cancelled", "cancelled"))
+        self.assertFalse(os.path.exists(os.path.join(self.root, "other")))
+        self.assertFalse(os.path.exists(os.path.join(self.root, "out", "dir_0", "f0.bytes")))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,108 @@
+"""同步引擎的回归测试：python -m unittest discover tests（或 pytest）"""
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import object_store  # noqa: E402
+import sync_engine  # noqa: E402
+import sync_journal  # noqa: E402
+
+
+def write(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(data)
+
+
+def read(path):
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+class SyncEngineTest(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp(prefix="automove_test_")
+        self.src = os.path.join(self.root, "src")
+        self.dst = os.path.join(self.root, "dst")
+        for i in range(20):
+            write(os.path.join(self.src, f"dir_{i % 3}", f"f{i}.bytes"), os.urandom(i * 100))
+        write(os.path.join(self.src, "big.so"), os.urandom(200 * 1024))
+
+    def tearDown(self):
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    def tasks(self):
+        return [{"name": "assets", "src": self.src, "dst": self.dst, "mode": "default", "subdir_vars": {}}]
+
+    def assertSynced(self):
+        for dirpath, _, files in os.walk(self.src):
+            for name in files:
+                src_path = os.path.join(dirpath, name)
+                dst_path = os.path.join(self.dst, os.path.relpath(src_path, self.src))
+                self.assertEqual(read(src_path), read(dst_path), dst_path)
+
+    def test_store_with_journal(self):
+        store = object_store.ObjectStore(os.path.join(self.root, "objects")).load()
+        journal = sync_journal.SyncJournal(os.path.join(self.root, "sync_journal.jsonl")).load()
+        stats = sync_engine.run_sync(self.tasks(), store=store, journal=journal)
+        self.assertEqual(stats.errors, [])
+        self.assertEqual(stats.copied, 21)
+        self.assertSynced()
+        # 目标与对象共用 inode
+        self.assertGreater(os.stat(os.path.join(self.dst, "big.so")).st_nlink, 1)
+
+        stats = sync_engine.run_sync(self.tasks(), store=store,
+                                     journal=sync_journal.SyncJournal(journal.path).load())
+        self.assertEqual((stats.copied, stats.skipped), (0, 21))
+
+    def test_same_size_edit_right_after_sync(self):
+        path = os.path.join(self.src, "config.json")
+        write(path, b'{"v":1}')
+        sync_engine.run_sync(self.tasks())
+        st = os.stat(path)
+        write(path, b'{"v":2}')
+        # 同一秒内的修改：大小相同，修改时间只差不到1秒
+        os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 300_000_000))
+        stats = sync_engine.run_sync(self.tasks())
+        self.assertEqual(stats.copied, 1)
+        self.assertEqual(read(os.path.join(self.dst, "config.json")), b'{"v":2}')
+
+    def test_mtime_resolution(self):
+        self.assertEqual(sync_engine.mtime_resolution([4_000_000_000, 1_702_000_000_000_000_000]), 2_000_000_000)
+        self.assertEqual(sync_engine.mtime_resolution([3_000_000_000, 5_120_000_000]), 10_000_000)
+        self.assertEqual(sync_engine.mtime_resolution([1_702_000_000_123_456_700, 3_000_000_000]), 100)
+        self.assertEqual(sync_engine.mtime_resolution([1_702_000_000_000_000_000, 1_702_000_000_123_456_789]), 1)
+
+    def test_coarse_destination_timestamps(self):
+        sync_engine.run_sync(self.tasks())
+        # 模拟只保存整秒修改时间的目标（HFS+、部分 SMB/NFS）：复制保留的修改时间被截断
+        for dirpath, _, files in os.walk(self.dst):
+            for name in files:
+                path = os.path.join(dirpath, name)
+                mtime_ns = os.stat(path).st_mtime_ns
+                os.utime(path, ns=(mtime_ns, mtime_ns - mtime_ns % 1_000_000_000))
+        stats = sync_engine.run_sync(self.tasks())
+        self.assertEqual((stats.copied, stats.skipped), (0, 21))
+
+        path = os.path.join(self.src, "dir_0", "f0.bytes")
+        write(path, b"changed")
+        stats = sync_engine.run_sync(self.tasks())
+        self.assertEqual((stats.copied, stats.skipped), (1, 20))
+
+    def test_store_links_existing_copies(self):
+        sync_engine.run_sync(self.tasks())
+        store = object_store.ObjectStore(os.path.join(self.root, "objects")).load()
+        stats = sync_engine.run_sync(self.tasks(), store=store)
+        self.assertEqual(stats.copied, 21)
+        self.assertGreater(os.stat(os.path.join(self.dst, "big.so")).st_nlink, 1)
+        self.assertEqual(store.gc(), (0, 0))
+        stats = sync_engine.run_sync(self.tasks(), store=store)
+        self.assertEqual((stats.copied, stats.skipped), (0, 21))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,101 @@
+"""中断续传的回归测试"""
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import copy_backends  # noqa: E402
+import sync_engine  # noqa: E402
+import sync_journal  # noqa: E402
+
+
+def write(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(data)
+
+
+def read(path):
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+class SyncJournalTest(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp(prefix="automove_test_")
+        self.src = os.path.join(self.root, "src")
+        self.dst = os.path.join(self.root, "dst")
+        self.journal_path = os.path.join(self.root, sync_journal.JOURNAL_FILE_NAME)
+        for i in range(120):
+            write(os.path.join(self.src, f"dir_{i % 6}", f"f{i}.bytes"), os.urandom(500 + i))
+        write(os.path.join(self.dst, "stale.bytes"), b"stale")
+
+    def tearDown(self):
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    def tasks(self):
+        return [{"name": "assets", "src": self.src, "dst": self.dst, "mode": "default", "subdir_vars": {}}]
+
+    def interrupted_sync(self):
+        """处理完第一批文件后取消，返回留下的日志"""
+        cancel = threading.Event()
+        journal = sync_journal.SyncJournal(self.journal_path).load()
+        with self.assertRaises(sync_engine.SyncCancelled):
+            sync_engine.run_sync(self.tasks(), workers=1, cancel=cancel, journal=journal,
+                                 progress=lambda path, size: cancel.set())
+        self.assertTrue(os.path.exists(self.journal_path))
+        journal = sync_journal.SyncJournal(self.journal_path).load()
+        self.assertTrue(journal.interrupted)
+        return journal
+
+    def test_resume_after_cancel(self):
+        journal = self.interrupted_sync()
+        done = len(journal.done)
+        self.assertTrue(0 < done < 120)
+        self.assertFalse(os.path.exists(os.path.join(self.dst, "stale.bytes")))
+        # 被强制结束的进程留下的临时文件
+        write(copy_backends.temp_path(os.path.join(self.dst, "dir_0", "f0.bytes")), b"junk")
+
+        stats = sync_engine.run_sync(self.tasks(), workers=1, journal=journal)
+        self.assertEqual(stats.errors, [])
+        self.assertEqual((stats.copied, stats.skipped), (120 - done, done))
+        self.assertEqual(journal.resumed, done)
+        self.assertFalse(os.path.exists(self.journal_path))
+        for dirpath, _, files in os.walk(self.src):
+            for name in files:
+                src_path = os.path.join(dirpath, name)
+                self.assertEqual(read(src_path), read(os.path.join(self.dst, os.path.relpath(src_path, self.src))))
+        self.assertEqual([name for _, _, files in os.walk(self.dst) for name in files
+                          if copy_backends.is_temp(name)], [])
+
+    def test_changed_files_are_not_resumed(self):
+        journal = self.interrupted_sync()
+        done = len(journal.done)
+        dst_path = next(iter(journal.done))
+        src_path = os.path.join(self.src, os.path.relpath(dst_path, sync_engine.path_key(self.dst)))
+        write(src_path, b"changed after the interruption")
+        # 目标在中断后被改动的文件同样重新比对
+        other = [path for path in journal.done if path != dst_path][0]
+        write(other, b"edited")
+
+        stats = sync_engine.run_sync(self.tasks(), workers=1, journal=journal)
+        self.assertEqual(journal.resumed, done - 2)
+        self.assertEqual(read(dst_path), b"changed after the interruption")
+        self.assertNotEqual(read(other), b"edited")
+        self.assertEqual(stats.copied + stats.skipped, 120)
+
+    def test_different_tasks_start_over(self):
+        journal = self.interrupted_sync()
+        tasks = self.tasks()
+        tasks[0]["dst"] = os.path.join(self.root, "other")
+        self.assertFalse(journal.begin([dict(tasks[0], manifest=sync_engine.Manifest(self.src))]))
+        journal.finish()
+        self.assertEqual(journal.done, {})
+
+
+if __name__ == "__main__":
+    unittest.main()
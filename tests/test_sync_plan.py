@@ -0,0 +1,86 @@
+"""同步计划（预演）的回归测试"""
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import sync_engine  # noqa: E402
+import sync_plan  # noqa: E402
+
+
+def write(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(data)
+
+
+def disk_state(root):
+    """root 下所有目录与文件的 (路径, 大小, 修改时间)"""
+    state = set()
+    for dirpath, dirs, files in os.walk(root):
+        for name in dirs + files:
+            path = os.path.join(dirpath, name)
+            st = os.stat(path)
+            state.add((path, st.st_size if name in files else 0, st.st_mtime_ns))
+    return state
+
+
+class SyncPlanTest(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp(prefix="automove_test_")
+        self.src = os.path.join(self.root, "src")
+        self.dst = os.path.join(self.root, "dst")
+        for i in range(12):
+            write(os.path.join(self.src, f"dir_{i % 3}", f"f{i}.bytes"), os.urandom(100 + i))
+        sync_engine.run_sync(self.tasks())
+        # 源中新增 2 个、修改 3 个、删除 1 个文件，目标中另有 1 个多余文件
+        for i in range(12, 14):
+            write(os.path.join(self.src, "dir_new", f"f{i}.bytes"), os.urandom(50))
+        for i in range(3):
+            write(os.path.join(self.src, f"dir_{i}", f"f{i}.bytes"), os.urandom(300))
+        os.remove(os.path.join(self.src, "dir_1", "f4.bytes"))
+        write(os.path.join(self.dst, "stale.bytes"), b"stale")
+        # 尚不存在的目标目录
+        self.new_src = os.path.join(self.root, "plugins_src")
+        self.new_dst = os.path.join(self.root, "plugins_dst")
+        write(os.path.join(self.new_src, "arm64", "libgame.so"), os.urandom(4096))
+
+    def tearDown(self):
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    def tasks(self):
+        return [{"name": "assets", "src": self.src, "dst": self.dst, "mode": "default", "subdir_vars": {}}]
+
+    def all_tasks(self):
+        return self.tasks() + [
+            {"name": "plugins", "src": self.new_src, "dst": self.new_dst, "mode": "default", "subdir_vars": {}},
+        ]
+
+    def test_plan_is_read_only_and_matches_run(self):
+        before = disk_state(self.root)
+        plan = sync_plan.build_plan(self.all_tasks(), log_dir=os.path.join(self.root, "logs"))
+        self.assertEqual(disk_state(self.root), before)
+        self.assertFalse(os.path.exists(self.new_dst))
+        self.assertFalse(os.path.exists(os.path.join(self.root, "logs")))
+
+        counts = {action: files for action, (files, _) in plan.totals().items()}
+        self.assertEqual(counts, {sync_plan.COPY: 3, sync_plan.OVERWRITE: 3, sync_plan.SKIP: 8,
+                                  sync_plan.DELETE: 2})
+        self.assertEqual(plan.totals(plan.tasks[1])[sync_plan.COPY], [1, 4096])
+
+        stats = sync_engine.run_plan(plan)
+        self.assertEqual(stats.errors, [])
+        self.assertEqual(
+            (stats.copied, stats.skipped, stats.deleted),
+            (counts[sync_plan.COPY] + counts[sync_plan.OVERWRITE], counts[sync_plan.SKIP], counts[sync_plan.DELETE]),
+        )
+        # 执行后再预演，只剩跳过
+        plan = sync_plan.build_plan(self.all_tasks())
+        self.assertEqual(plan.changes, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
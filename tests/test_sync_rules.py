@@ -0,0 +1,112 @@
+"""同步规则的回归测试"""
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import sync_engine  # noqa: E402
+import sync_rules  # noqa: E402
+
+
+def write(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(data)
+
+
+def files_under(root):
+    return sorted(
+        os.path.relpath(os.path.join(dirpath, name), root).replace(os.sep, "/")
+        for dirpath, _, files in os.walk(root) for name in files
+    )
+
+
+class RuleSetTest(unittest.TestCase):
+    def test_merged_patterns(self):
+        rules = sync_rules.RuleSet({"exclude": [
+            "*.meta", "Editor", "/Temp", "Art/*/Raw", "Cache/", "**/Gen/*.cs", "re:\\.bak\\d*$",
+        ]})
+        # 名称与路径的字面量走集合，通配符与正则各合并为一个表达式
+        self.assertEqual(rules.exclude_files.names, {"Editor"})
+        self.assertEqual(rules.exclude_files.paths, {"Temp"})
+        self.assertIsNotNone(rules.exclude_files.name_re)
+        self.assertIsNotNone(rules.exclude_files.path_re)
+
+        def allowed(rel):
+            return rules.file_allowed(os.path.join(*rel.split("/")), rel.rsplit("/", 1)[-1])
+
+        self.assertFalse(allowed("Art/x.png.meta"))
+        self.assertFalse(allowed("a/b/c.bak12"))
+        self.assertFalse(allowed("Scripts/Gen/Auto.cs"))
+        self.assertFalse(allowed("Gen/Auto.cs"))
+        self.assertTrue(allowed("Scripts/Gen/Sub/Auto.cs"))
+        self.assertTrue(allowed("Art/x.png"))
+        self.assertTrue(allowed("Cache"))  # 结尾 / 的模式只匹配文件夹
+        self.assertFalse(rules.dir_allowed("Cache", "Cache"))
+        self.assertFalse(rules.dir_allowed(os.path.join("Art", "Chars", "Raw"), "Raw"))
+        self.assertTrue(rules.dir_allowed(os.path.join("Chars", "Raw"), "Raw"))
+        self.assertFalse(rules.dir_allowed("Temp", "Temp"))
+        self.assertTrue(rules.dir_allowed(os.path.join("Sub", "Temp"), "Temp"))
+
+    def test_nested_subdir_selection(self):
+        rules = sync_rules.RuleSet(None, {"Art/Raw": False, "Audio\\Voice": False, "Art": True})
+        self.assertFalse(rules.dir_allowed(os.path.join("Art", "Raw"), "Raw"))
+        self.assertFalse(rules.dir_allowed(os.path.join("Audio", "Voice"), "Voice"))
+        # 只作用于所在位置，其他层级的同名文件夹不受影响
+        self.assertTrue(rules.dir_allowed("Raw", "Raw"))
+        self.assertTrue(rules.dir_allowed(os.path.join("Models", "Raw"), "Raw"))
+        self.assertTrue(rules.dir_allowed("Art", "Art"))
+        self.assertFalse(rules.path_allowed(os.path.join("Art", "Raw", "a", "b.png")))
+        self.assertTrue(rules.path_allowed(os.path.join("Models", "Raw", "b.png")))
+
+    def test_extensions_and_include(self):
+        rules = sync_rules.RuleSet({"include": ["Textures/**"], "extensions": ["png", ".TGA"],
+                                    "exclude_extensions": [".tmp"]})
+        self.assertTrue(rules.file_allowed(os.path.join("Textures", "a", "b.PNG"), "b.PNG"))
+        self.assertTrue(rules.file_allowed(os.path.join("Textures", "c.tga"), "c.tga"))
+        self.assertFalse(rules.file_allowed(os.path.join("Textures", "d.jpg"), "d.jpg"))
+        self.assertFalse(rules.file_allowed(os.path.join("Models", "e.png"), "e.png"))
+
+    def test_invalid_rules(self):
+        with self.assertRaises(ValueError):
+            sync_rules.RuleSet({"excludes": ["*.meta"]})
+        with self.assertRaises(ValueError):
+            sync_rules.RuleSet({"exclude": ["re:("]})
+        with self.assertRaises(ValueError):
+            sync_rules.RuleSet({"max_size": "10 parsecs"})
+        self.assertEqual(sync_rules.parse_size("1.5KB"), 1536)
+
+
+class RulesSyncTest(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp(prefix="automove_test_")
+        self.src = os.path.join(self.root, "src")
+        self.dst = os.path.join(self.root, "dst")
+
+    def tearDown(self):
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    def test_size_limits_keep_existing_destination_copies(self):
+        write(os.path.join(self.src, "small.bytes"), b"s" * 10)
+        write(os.path.join(self.src, "Libs", "big.so"), b"b" * 5000)
+        write(os.path.join(self.src, "Libs", "new_big.so"), b"n" * 5000)
+        write(os.path.join(self.src, "x.meta"), b"m")
+        write(os.path.join(self.dst, "Libs", "big.so"), b"old")
+        write(os.path.join(self.dst, "stale.bytes"), b"s")
+        write(os.path.join(self.dst, "x.meta"), b"m")
+        task = {"name": "assets", "src": self.src, "dst": self.dst, "mode": "default", "subdir_vars": {},
+                "rules": {"max_size": "1KB", "exclude": ["*.meta"]}}
+
+        stats = sync_engine.run_sync([task])
+        self.assertEqual((stats.copied, stats.deleted), (1, 1))
+        # 超出大小限制的文件不复制，目标中已有的旧版本保留；被规则排除的文件不参与同步，目标中的也不动
+        self.assertEqual(files_under(self.dst), ["Libs/big.so", "small.bytes", "x.meta"])
+        with open(os.path.join(self.dst, "Libs", "big.so"), 'rb') as f:
+            self.assertEqual(f.read(), b"old")
+
+
+if __name__ == "__main__":
+    unittest.main()
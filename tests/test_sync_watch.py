@@ -0,0 +1,65 @@
+"""监视模式增量同步（sync_engine.sync_changes）的回归测试"""
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import sync_engine  # noqa: E402
+
+
+def write(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(data)
+
+
+def read(path):
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+class SyncChangesTest(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp(prefix="automove_test_")
+        self.src = os.path.join(self.root, "src")
+        self.dst = os.path.join(self.root, "dst")
+        for i in range(9):
+            write(os.path.join(self.src, f"dir_{i % 3}", f"f{i}.bytes"), os.urandom(100 + i))
+        stats = sync_engine.run_sync(self.tasks())
+        self.assertEqual(stats.copied, 9)
+
+    def tearDown(self):
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    def tasks(self):
+        return [{"name": "assets", "src": self.src, "dst": self.dst, "mode": "default", "subdir_vars": {}}]
+
+    def test_deletions_propagate(self):
+        # 目标中不在变化路径内的多余文件不受影响，留给下一次完整同步处理
+        write(os.path.join(self.dst, "dir_2", "extra.bytes"), b"extra")
+        removed_file = os.path.join(self.src, "dir_0", "f0.bytes")
+        removed_dir = os.path.join(self.src, "dir_1")
+        changed = os.path.join(self.src, "dir_0", "f3.bytes")
+        os.remove(removed_file)
+        shutil.rmtree(removed_dir)
+        write(changed, b"changed")
+
+        stats = sync_engine.sync_changes(self.tasks(), [removed_file, removed_dir, changed])
+        self.assertEqual(stats.errors, [])
+        self.assertEqual((stats.copied, stats.deleted), (1, 4))
+        self.assertFalse(os.path.exists(os.path.join(self.dst, "dir_0", "f0.bytes")))
+        self.assertFalse(os.path.exists(os.path.join(self.dst, "dir_1")))
+        self.assertEqual(read(os.path.join(self.dst, "dir_0", "f3.bytes")), b"changed")
+        self.assertEqual(read(os.path.join(self.dst, "dir_0", "f6.bytes")), read(os.path.join(self.src, "dir_0", "f6.bytes")))
+        self.assertTrue(os.path.isfile(os.path.join(self.dst, "dir_2", "extra.bytes")))
+
+    def test_unrelated_paths_are_ignored(self):
+        stats = sync_engine.sync_changes(self.tasks(), [os.path.join(self.root, "elsewhere", "a.bytes")])
+        self.assertEqual((stats.copied, stats.skipped, stats.deleted), (0, 0, 0))
+
+
+if __name__ == "__main__":
+    unittest.main()